@@ -1,56 +1,139 @@
 from __future__ import annotations
 
+import asyncio
 import functools
+import inspect
 import pprint
 import time
-from itertools import accumulate
+import weakref
 from math import ceil
 
 from django.conf import settings
 
 import structlog
-from elasticsearch import BadRequestError, NotFoundError
-from elasticsearch_dsl import Search
+from django_asgi_lifespan.signals import asgi_shutdown
+from elasticsearch import AsyncElasticsearch, BadRequestError, NotFoundError
+from elasticsearch_dsl import AsyncSearch
+from elasticsearch_dsl.response import Response
 
 from api.utils.dead_link_mask import get_query_hash, get_query_mask
+from api.utils.local_cache import LocalCache
+from api.utils.timing import time_stage
 
 
 logger = structlog.get_logger(__name__)
 
 
+_ASYNC_CLIENTS: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, AsyncElasticsearch
+] = weakref.WeakKeyDictionary()
+
+_index_generation_local_cache = LocalCache("index_generation")
+
+
+@asgi_shutdown.connect
+async def _close_async_clients(sender, **kwargs):
+    logger.debug("Closing async Elasticsearch clients on application shutdown")
+
+    while _ASYNC_CLIENTS:
+        loop, client = _ASYNC_CLIENTS.popitem()
+        try:
+            await client.close()
+        except BaseException as exc:
+            logger.error("Error closing async ES client", exc=exc, exc_info=True)
+
+
+def get_async_es() -> AsyncElasticsearch:
+    """
+    Retrieve the shared async Elasticsearch client for the current event loop.
+
+    The client holds an aiohttp session, which is bound to the loop it was
+    created in, so like ``get_aiohttp_session``, this function creates one
+    client per loop.
+    """
+
+    loop = asyncio.get_running_loop()
+    if loop not in _ASYNC_CLIENTS:
+        _ASYNC_CLIENTS[loop] = AsyncElasticsearch(
+            settings.ES_ENDPOINT, **settings.ES_CLIENT_OPTIONS
+        )
+    return _ASYNC_CLIENTS[loop]
+
+
+async def get_index_generation(index: str) -> str:
+    """
+    Get the names of the concrete indexes behind the index and its filtered index.
+
+    The names change whenever the aliases are pointed to newly built indexes,
+    so they identify the generation of the data in use. They are cached in the
+    memory of each worker. Indexes without a filtered index are supported.
+
+    :param index: The Elasticsearch index alias (e.g. 'image')
+    :return: The sorted, comma-separated names of the concrete indexes.
+    """
+
+    if (generation := _index_generation_local_cache.get(index)) is not None:
+        return generation
+
+    aliases = await get_async_es().indices.get_alias(
+        index=f"{index},{index}-filtered", ignore_unavailable=True
+    )
+    generation = ",".join(sorted(aliases.body))
+    _index_generation_local_cache.set(index, generation)
+    return generation
+
+
+def _log_timing(func, start_time, result, es_query):
+    response_time_in_ms = int((time.time() - start_time) * 1000)
+    if hasattr(result, "took"):
+        es_time_in_ms = result.took
+    else:
+        es_time_in_ms = result.get("took")
+    logger.info(
+        "Performed ES query",
+        func=func.__name__,
+        response_time=response_time_in_ms,
+        es_time=es_time_in_ms,
+        es_query=es_query,
+    )
+
+
 def log_timing_info(func):
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, es_query, **kwargs):
+            start_time = time.time()
+            with time_stage("es"):
+                result = await func(*args, **kwargs)
+            _log_timing(func, start_time, result, es_query)
+            return result
+
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, es_query, **kwargs):
         start_time = time.time()
 
         # Call the original function
-        result = func(*args, **kwargs)
-
-        response_time_in_ms = int((time.time() - start_time) * 1000)
-        if hasattr(result, "took"):
-            es_time_in_ms = result.took
-        else:
-            es_time_in_ms = result.get("took")
-        logger.info(
-            "Performed ES query",
-            func=func.__name__,
-            response_time=response_time_in_ms,
-            es_time=es_time_in_ms,
-            es_query=es_query,
-        )
+        with time_stage("es"):
+            result = func(*args, **kwargs)
 
+        _log_timing(func, start_time, result, es_query)
         return result
 
     return wrapper
 
 
 @log_timing_info
-def get_es_response(s, *args, **kwargs):
+async def get_es_response(s: AsyncSearch, *args, **kwargs) -> Response:
+    """Execute the search with the async client of the current event loop."""
+
     if settings.VERBOSE_ES_RESPONSE:
         logger.info(pprint.pprint(s.to_dict()))
 
     try:
-        search_response = s.execute()
+        search_response = await s.using(get_async_es()).execute()
 
         if settings.VERBOSE_ES_RESPONSE:
             logger.info(pprint.pprint(search_response.to_dict()))
@@ -86,8 +169,8 @@ def _unmasked_query_end(page_size, page):
     return ceil(page_size * page / (1 - DEAD_LINK_RATIO))
 
 
-def _paginate_with_dead_link_mask(
-    s: Search, page_size: int, page: int
+async def _paginate_with_dead_link_mask(
+    s: AsyncSearch, page_size: int, page: int
 ) -> tuple[int, int]:
     """
     Return the start and end of the results slice, given the query, page and page size.
@@ -103,18 +186,17 @@ def _paginate_with_dead_link_mask(
     :return: Tuple of start and end.
     """
     query_hash = get_query_hash(s)
-    query_mask = get_query_mask(query_hash)
+    query_mask = await get_query_mask(query_hash)
     if not query_mask:  # branch 1
         start = 0
         end = _unmasked_query_end(page_size, page)
-    elif page_size * (page - 1) > sum(query_mask):  # branch 2
+    elif page_size * (page - 1) > query_mask.live_count:  # branch 2
         start = len(query_mask)
         end = _unmasked_query_end(page_size, page)
     else:  # branch 3
-        # query_mask is a list of 0 and 1 where 0 indicates the result position
-        # for the given query will be an invalid link. If we accumulate a query
-        # mask you end up, at each index, with the number of live results you
-        # will get back when you query that deeply.
+        # query_mask is a bitmap where an unset bit indicates the result position
+        # for the given query will be an invalid link. The position of the N-th
+        # set bit is the depth to which you must query to get back N live results.
         # We then query for the start and end index _of the results_ in ES based
         # on the number of results that we think will be valid based on the query mask.
         # If we're requesting `page=2 page_size=3` and the mask is [0, 1, 0, 1, 0, 1],
@@ -125,39 +207,38 @@ def _paginate_with_dead_link_mask(
         # account for the entire range, then we follow the typical assumption when
         # a mask is not available that the end should be `page * page_size / 0.5`
         # (i.e., double the page size)
-        accu_query_mask = list(accumulate(query_mask))
         start = 0
         if page > 1:
             try:  # branch 3_start_A
                 # find the index at which we can skip N valid results where N = all
                 # the results that would be skipped to arrive at the start of the
                 # requested page
-                # This will effectively be the index at which we have the number of
-                # previous valid results + 1 because we don't want to include the
-                # last valid result from the previous page
-                start = accu_query_mask.index(page_size * (page - 1) + 1)
+                # This will effectively be the index of the previous valid results + 1
+                # because we don't want to include the last valid result from the
+                # previous page
+                start = query_mask.live_position(page_size * (page - 1) + 1)
             except ValueError:  # branch 3_start_B
                 # Cannot fail because of the check on branch 2 which verifies that
                 # the query mask already includes at least enough masked valid
                 # results to fulfill the requested page size
-                start = accu_query_mask.index(page_size * (page - 1)) + 1
+                start = query_mask.live_position(page_size * (page - 1)) + 1
         # else:  branch 3_start_C
         # Always start page=1 queries at 0
 
-        if page_size * page > sum(query_mask):  # branch 3_end_A
+        if page_size * page > query_mask.live_count:  # branch 3_end_A
             end = _unmasked_query_end(page_size, page)
         else:  # branch 3_end_B
-            end = accu_query_mask.index(page_size * page) + 1
+            end = query_mask.live_position(page_size * page) + 1
     return start, end
 
 
-def get_query_slice(
-    s: Search, page_size: int, page: int, filter_dead: bool | None = False
+async def get_query_slice(
+    s: AsyncSearch, page_size: int, page: int, filter_dead: bool | None = False
 ) -> tuple[int, int]:
     """Select the start and end of the search results for this query."""
 
     if filter_dead:
-        start_slice, end_slice = _paginate_with_dead_link_mask(s, page_size, page)
+        start_slice, end_slice = await _paginate_with_dead_link_mask(s, page_size, page)
     else:
         # Paginate search query.
         start_slice = page_size * (page - 1)
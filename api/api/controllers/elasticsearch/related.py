@@ -1,35 +1,100 @@
 from __future__ import annotations
 
-from elasticsearch_dsl import Search
+import hashlib
+import json
+from collections.abc import Awaitable, Callable
+
+from django.conf import settings
+from django.core.cache import cache
+
+import structlog
+from asgiref.sync import sync_to_async
+from elasticsearch_dsl import AsyncSearch
 from elasticsearch_dsl.query import Match, Q, Term
 from elasticsearch_dsl.response import Hit
+from redis.exceptions import ConnectionError
 
-from api.controllers.elasticsearch.helpers import get_es_response, get_query_slice
+from api.controllers.elasticsearch.helpers import (
+    get_es_response,
+    get_index_generation,
+    get_query_slice,
+)
 from api.controllers.search_controller import (
     _post_process_results,
     get_excluded_sources_query,
 )
 
 
-def related_media(uuid: str, index: str, filter_dead: bool) -> list[Hit]:
-    """
-    Given a UUID, finds 10 related search results based on title and tags.
+logger = structlog.get_logger(__name__)
 
-    Uses Match query for title or SimpleQueryString for tags.
-    If the item has no title and no tags, returns items by the same creator.
-    If the item has no title, no tags or no creator, returns empty list.
 
-    :param uuid: The UUID of the item to find related results for.
-    :param index: The Elasticsearch index to search (e.g. 'image')
-    :param filter_dead: Whether dead links should be removed.
-    :return: List of related results.
+RELATED_CACHE_VERSION = 1
+MORE_LIKE_THIS_FIELDS = ["title", "tags.name"]
+
+
+def _get_related_cache_key(
+    uuid: str, generation: str, excluded_sources_query: Q | None
+) -> str:
+    excluded_sources = (
+        excluded_sources_query.to_dict() if excluded_sources_query else {}
+    )
+    excluded_sources_hash = hashlib.blake2b(
+        json.dumps(excluded_sources, sort_keys=True).encode(), digest_size=8
+    ).hexdigest()
+    return f"related:{generation}:{excluded_sources_hash}:{uuid}"
+
+
+def _get_cached_related(key: str) -> list[Hit] | None:
+    try:
+        documents = cache.get(key=key, version=RELATED_CACHE_VERSION)
+    except ConnectionError:
+        logger.warning("Redis connect failed, cannot get cached related results.")
+        return None
+
+    if documents is None:
+        return None
+    return [Hit(document) for document in documents]
+
+
+def _cache_related(key: str, results: list[Hit]) -> None:
+    # Only the documents are cached, as ``Hit`` instances do not pickle their
+    # metadata.
+    documents = [
+        {
+            "_index": hit.meta.index,
+            "_id": hit.meta.id,
+            "_score": getattr(hit.meta, "score", None),
+            "_source": hit.to_dict(),
+        }
+        for hit in results
+    ]
+    try:
+        cache.set(
+            key=key,
+            version=RELATED_CACHE_VERSION,
+            timeout=settings.RELATED_CACHE_TIMEOUT,
+            value=documents,
+        )
+    except ConnectionError:
+        logger.warning("Redis connect failed, cannot cache related results.")
+
+
+async def _build_related_query(uuid: str, index: str) -> dict | None:
+    """
+    Build the related query from the title, tags or creator of the item.
+
+    :return: The clauses of the bool query, or ``None`` if there is nothing
+    to relate the item by.
     """
 
     # Search the default index for the item itself as it might be sensitive.
-    item_search = Search(index=index)
+    item_search = AsyncSearch(index=index)
     # This will raise ``IndexError`` if no hits are found. This error is caught
     # in the viewset handler function.
-    item_hit = item_search.query(Term(identifier=uuid)).execute().hits[0]
+    item_response = await get_es_response(
+        item_search.query(Term(identifier=uuid)), es_query="related_item"
+    )
+    item_hit = item_response.hits[0]
 
     # Match related using title.
     title = getattr(item_hit, "title", None)
@@ -40,7 +105,7 @@ def related_media(uuid: str, index: str, filter_dead: bool) -> list[Hit]:
 
     if not title and not tags:
         if not creator:
-            return []
+            return None
         else:
             # Only use `creator` query if there are no `title` and `tags`
             related_query["should"].append(Term(creator=creator))
@@ -54,8 +119,83 @@ def related_media(uuid: str, index: str, filter_dead: bool) -> list[Hit]:
             tags = [tag["name"] for tag in tags[:10]]
             related_query["should"].append(Q("terms", tags__name__keyword=tags))
 
+    return related_query
+
+
+def _build_more_like_this_query(index: str, item_id: int) -> dict:
+    """
+    Build the related query as a ``more_like_this`` query referencing the item.
+
+    Elasticsearch reads the title and tags from the document of the item in
+    the default index, so the item does not need to be fetched first.
+    """
+
+    return {
+        "must_not": [],
+        "must": [
+            Q(
+                "more_like_this",
+                fields=MORE_LIKE_THIS_FIELDS,
+                like=[{"_index": index, "_id": item_id}],
+                min_term_freq=1,
+            )
+        ],
+        "should": [],
+    }
+
+
+async def related_media(
+    uuid: str,
+    index: str,
+    filter_dead: bool,
+    get_item_id: Callable[[], Awaitable[int | None]] | None = None,
+) -> list[Hit]:
+    """
+    Given a UUID, finds 10 related search results based on title and tags.
+
+    Uses Match query for title or SimpleQueryString for tags.
+    If the item has no title and no tags, returns items by the same creator.
+    If the item has no title, no tags or no creator, returns empty list.
+
+    If ``RELATED_USE_MORE_LIKE_THIS`` is enabled and a way to get the ID of the
+    item's document is given, a single ``more_like_this`` query on the title
+    and tags is used instead.
+
+    The results are cached for ``RELATED_CACHE_TIMEOUT`` seconds, keyed by the
+    concrete indexes in use and the excluded sources. Cached results are not
+    validated again, so links that die in the meantime are served until the
+    entry expires.
+
+    :param uuid: The UUID of the item to find related results for.
+    :param index: The Elasticsearch index to search (e.g. 'image')
+    :param filter_dead: Whether dead links should be removed.
+    :param get_item_id: The coroutine function getting the ID of the item's
+    document in Elasticsearch, or ``None`` if the item does not exist. It is
+    only called if the results are not cached.
+    :return: List of related results.
+    """
+
+    excluded_sources_query = await sync_to_async(get_excluded_sources_query)()
+
+    cache_key = None
+    if settings.RELATED_CACHE_TIMEOUT > 0:
+        generation = await get_index_generation(index)
+        cache_key = _get_related_cache_key(uuid, generation, excluded_sources_query)
+        if (results := await sync_to_async(_get_cached_related)(cache_key)) is not None:
+            return results
+
+    if settings.RELATED_USE_MORE_LIKE_THIS and get_item_id is not None:
+        if (item_id := await get_item_id()) is None:
+            # Like the lookup of the item in ``_build_related_query``.
+            raise IndexError(f"No item with the identifier {uuid}.")
+        related_query = _build_more_like_this_query(index, item_id)
+    else:
+        related_query = await _build_related_query(uuid, index)
+        if related_query is None:
+            return []
+
     # Exclude the dynamically disabled sources.
-    if excluded_sources_query := get_excluded_sources_query():
+    if excluded_sources_query:
         related_query["must_not"].append(excluded_sources_query)
     # Exclude the current item and mature content.
     related_query["must_not"].extend(
@@ -63,13 +203,18 @@ def related_media(uuid: str, index: str, filter_dead: bool) -> list[Hit]:
     )
 
     # Search the filtered index for related items.
-    s = Search(index=f"{index}-filtered")
+    s = AsyncSearch(index=f"{index}-filtered")
     s = s.query("bool", **related_query)
 
     page, page_size = 1, 10
-    start, end = get_query_slice(s, page_size, page, filter_dead)
-    s = s[start:end]
+    start, end = await get_query_slice(s, page_size, page, filter_dead)
+
+    response = await get_es_response(s[start:end], es_query="related_media")
+    results = await _post_process_results(
+        s, start, end, page_size, response, filter_dead
+    )
+    results = results or []
 
-    response = get_es_response(s, es_query="related_media")
-    results = _post_process_results(s, start, end, page_size, response, filter_dead)
-    return results or []
+    if cache_key is not None:
+        await sync_to_async(_cache_related)(cache_key, results)
+    return results
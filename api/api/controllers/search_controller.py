@@ -1,16 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 import re
 from math import ceil
 from typing import TYPE_CHECKING
 
 from django.conf import settings
 from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 import structlog
+from asgiref.sync import sync_to_async
 from decouple import config
+from django_asgi_lifespan.signals import asgi_shutdown
 from elasticsearch.exceptions import NotFoundError
-from elasticsearch_dsl import Q, Search
+from elasticsearch_dsl import AsyncSearch, Q
 from elasticsearch_dsl.query import EMPTY_QUERY
 from elasticsearch_dsl.response import Hit, Response
 from redis.exceptions import ConnectionError
@@ -20,6 +26,7 @@ from api.constants.media_types import OriginIndex, SearchIndex
 from api.constants.search import SearchStrategy
 from api.constants.sorting import INDEXED_ON
 from api.controllers.elasticsearch.helpers import (
+    DEAD_LINK_RATIO,
     ELASTICSEARCH_MAX_RESULT_WINDOW,
     get_es_response,
     get_query_slice,
@@ -28,7 +35,10 @@ from api.controllers.elasticsearch.helpers import (
 from api.utils import tallies
 from api.utils.check_dead_links import check_dead_links
 from api.utils.dead_link_mask import get_query_hash
+from api.utils.local_cache import LocalCache, publish_invalidation
+from api.utils.redis_lock import redis_lock
 from api.utils.search_context import SearchContext
+from api.utils.timing import count, stop_recording, time_stage
 
 
 # Using TYPE_CHECKING to avoid circular imports when importing types
@@ -38,7 +48,7 @@ if TYPE_CHECKING:
 logger = structlog.get_logger(__name__)
 
 
-NESTING_THRESHOLD = config("POST_PROCESS_NESTING_THRESHOLD", cast=int, default=5)
+BACKFILL_ROUND_LIMIT = config("POST_PROCESS_BACKFILL_ROUND_LIMIT", cast=int, default=5)
 SOURCE_CACHE_TIMEOUT = 60 * 60 * 4  # 4 hours
 FILTER_CACHE_TIMEOUT = 30
 FILTERED_SOURCES_CACHE_KEY = "filtered_sources"
@@ -54,6 +64,18 @@ UNUSED_SQS_FLAGS = [
 ]
 
 
+_filtered_sources_local_cache = LocalCache(FILTERED_SOURCES_CACHE_KEY)
+_sources_local_cache = LocalCache("sources")
+
+# Background validations of upcoming pages, keyed by query hash, page and page
+# size so that concurrent requests for the same page only schedule one.
+_prevalidation_tasks: dict[tuple[str, int, int], asyncio.Task] = {}
+
+# In-flight searches, keyed by index, query hash, page, page size and whether
+# dead links are filtered, so that concurrent identical searches share one.
+_inflight_searches: dict[tuple[str, str, int, int, bool], asyncio.Future] = {}
+
+
 def _quote_escape(query_string):
     """Ignore any unmatched quotes in the query supplied by the user."""
 
@@ -64,8 +86,47 @@ def _quote_escape(query_string):
         return query_string
 
 
-def _post_process_results(
-    s, start, end, page_size, search_results, filter_dead, nesting=0
+def _next_backfill_slice(
+    end: int, live_count: int, page_size: int, total_hits: int
+) -> tuple[int, int] | None:
+    """
+    Get the next unseen slice of results to fetch when backfilling a page.
+
+    The slice starts where the previous one ended so that hits which have
+    already been transferred and validated are never requested again. Its size
+    is the number of results still missing from the page, inflated by the
+    ``DEAD_LINK_RATIO`` to account for dead links in the new slice.
+
+    :param end: the end of the last fetched slice
+    :param live_count: the number of live results collected so far
+    :param page_size: the number of results required to fill the page
+    :param total_hits: the total number of hits available for the query
+    :return: the start and end of the next slice, or ``None`` if there is none
+    """
+
+    if end >= total_hits or end >= ELASTICSEARCH_MAX_RESULT_WINDOW:
+        return None
+
+    missing = max(page_size - live_count, 1)
+    size = ceil(missing / (1 - DEAD_LINK_RATIO))
+    return end, min(end + size, total_hits, ELASTICSEARCH_MAX_RESULT_WINDOW)
+
+
+def _discard_task_result(task: asyncio.Task) -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+async def _prefetch_slice(s: AsyncSearch) -> Response:
+    # The query runs concurrently with the validation of the previous slice,
+    # so only the time the request waits for its response, recorded where the
+    # task is awaited, counts towards the ``es`` stage of the request.
+    stop_recording()
+    return await get_es_response(s, es_query="postprocess_search")
+
+
+async def _post_process_results(
+    s, start, end, page_size, search_results, filter_dead
 ) -> list[Hit] | None:
     """
     Perform some steps on results fetched from the backend.
@@ -74,7 +135,11 @@ def _post_process_results(
     results, perform image validation, and route certain thumbnails through our
     proxy.
 
-    Keeps making new query requests until it is able to fill the page size.
+    If dead links leave the page short, backfill it by fetching only the next
+    unseen slice of results after the ones already validated, for at most
+    ``BACKFILL_ROUND_LIMIT`` additional slices. Once backfilling has started,
+    each following slice is fetched speculatively while the links in the
+    current slice are being validated.
 
     :param s: The Elasticsearch Search object.
     :param start: The start of the result slice.
@@ -82,79 +147,119 @@ def _post_process_results(
     :param search_results: The Elasticsearch response object containing search
     results.
     :param filter_dead: Whether images should be validated.
-    :param nesting: the level of nesting at which this function is being called
     :return: List of results.
     """
 
-    if nesting > NESTING_THRESHOLD:
-        logger.info(
-            "Nesting threshold breached",
-            nesting=nesting,
-            start=start,
-            end=end,
-            page_size=page_size,
-        )
-
     results = list(search_results)
 
-    if filter_dead:
-        query_hash = get_query_hash(s)
-        check_dead_links(query_hash, start, results)
-
-        if len(results) == 0:
-            # first page is all dead links
-            return None
-
-        if len(results) < page_size:
-            """
-            The variables in this function get updated in an interesting way.
-            Here is an example of that for a typical query. Note that ``end``
-            increases but start stays the same. This has the effect of slowly
-            increasing the size of the query we send to Elasticsearch with the
-            goal of backfilling the results until we have enough valid (live)
-            results to fulfill the requested page size.
-
-            ```
-            page_size: 20
-            page: 1
-
-            start: 0
-            end: 40 (DEAD_LINK_RATIO applied)
-
-            end gets updated to end + end/2 = 60
-
-            end = 90
-            end = 90 + 45
-            ```
-            """
-            if end >= search_results.hits.total.value:
-                # Total available hits already exhausted in previous iteration
-                return results
-
-            end += int(end / 2)
-            query_size = start + end
-            if query_size > ELASTICSEARCH_MAX_RESULT_WINDOW:
-                return results
-
-            # subtract start to account for the records skipped
-            # and which should not count towards the total
-            # available hits for the query
-            total_available_hits = search_results.hits.total.value - start
-            if query_size > total_available_hits:
-                # Clamp the query size to last available hit. On the next
-                # iteration, if results are still insufficient, the check
-                # to compare previous_query_size and total_available_hits
-                # will prevent further query attempts
-                end = search_results.hits.total.value
-
-            s = s[start:end]
-            search_response = get_es_response(s, es_query="postprocess_search")
-
-            return _post_process_results(
-                s, start, end, page_size, search_response, filter_dead, nesting + 1
+    if not filter_dead:
+        return results[:page_size]
+
+    query_hash = get_query_hash(s)
+    total_hits = search_results.hits.total.value
+
+    live_results = []
+    slice_start, slice_end, slice_results = start, end, results
+    prefetch: asyncio.Task | None = None
+    backfill_round = 0
+
+    try:
+        while True:
+            next_slice = _next_backfill_slice(
+                slice_end, len(live_results), page_size, total_hits
             )
+            if 0 < backfill_round < BACKFILL_ROUND_LIMIT and next_slice is not None:
+                # The first slice fills the page for the vast majority of queries,
+                # so only speculate once backfilling is under way, where further
+                # slices are likely to be needed as well.
+                prefetch = asyncio.create_task(_prefetch_slice(s[slice(*next_slice)]))
+
+            with time_stage("dead_links"):
+                await check_dead_links(query_hash, slice_start, slice_results)
+            live_results.extend(slice_results)
+
+            if len(live_results) >= page_size or next_slice is None:
+                break
+
+            if backfill_round >= BACKFILL_ROUND_LIMIT:
+                logger.info(
+                    "Backfill round limit reached",
+                    backfill_round=backfill_round,
+                    start=start,
+                    end=slice_end,
+                    page_size=page_size,
+                )
+                break
+
+            if prefetch is None:
+                # Size the next slice with the number of live results now known.
+                next_slice = _next_backfill_slice(
+                    slice_end, len(live_results), page_size, total_hits
+                )
+                response = await get_es_response(
+                    s[slice(*next_slice)], es_query="postprocess_search"
+                )
+            else:
+                with time_stage("es"):
+                    response = await prefetch
+                prefetch = None
 
-    return results[:page_size]
+            slice_start, slice_end = next_slice
+            slice_results = list(response)
+            backfill_round += 1
+    finally:
+        if prefetch is not None:
+            # The speculative request turned out to be unnecessary, or the
+            # slice before it failed. Its failure, if any, is not of interest.
+            prefetch.cancel()
+            prefetch.add_done_callback(_discard_task_result)
+
+    if not live_results:
+        # first page is all dead links
+        return None
+
+    return live_results[:page_size]
+
+
+@asgi_shutdown.connect
+async def _cancel_prevalidation_tasks(sender, **kwargs):
+    for task in list(_prevalidation_tasks.values()):
+        task.cancel()
+
+
+async def _prevalidate_page(s: AsyncSearch, page: int, page_size: int) -> None:
+    """
+    Validate the links of a page of results before it is requested.
+
+    This fetches the slice of hits for the page, HEAD-checks the links missing
+    from the link validation cache and extends the query's dead link mask, so
+    that the request for the page itself is served from cache and mask.
+
+    :param s: The unsliced Elasticsearch Search object.
+    :param page: The page to validate.
+    :param page_size: The number of results per page.
+    """
+
+    # The task outlives the request it was scheduled by.
+    stop_recording()
+    try:
+        start, end = await get_query_slice(s, page_size, page, True)
+        response = await get_es_response(s[start:end], es_query="prevalidate_search")
+        await check_dead_links(get_query_hash(s), start, list(response))
+    except Exception as exc:
+        # Nothing awaits this task, so failures can only be logged. The page
+        # will be validated when it is requested.
+        logger.warning("Next page prevalidation failed", page=page, exc=exc)
+
+
+def _schedule_prevalidation(s: AsyncSearch, page: int, page_size: int) -> None:
+    key = (get_query_hash(s), page, page_size)
+    if key in _prevalidation_tasks:
+        return
+
+    task = asyncio.create_task(_prevalidate_page(s, page, page_size))
+    _prevalidation_tasks[key] = task
+    task.add_done_callback(lambda _: _prevalidation_tasks.pop(key, None))
 
 
 def get_excluded_sources_query() -> Q | None:
@@ -162,10 +267,23 @@ def get_excluded_sources_query() -> Q | None:
     Hide data sources from the catalog dynamically.
     To exclude a source, set ``filter_content`` to ``True`` in the
     ``ContentSource`` model in Django admin.
-    The list of ``source_identifier``s is cached in Redis with
-    `:FILTERED_SOURCES_CACHE_VERSION:FILTERED_SOURCES_CACHE_KEY` key.
+    The list of ``source_identifier``s is cached in the memory of each worker
+    and in Redis with
+    `:FILTERED_SOURCES_CACHE_VERSION:FILTERED_SOURCES_CACHE_KEY` key. Both are
+    invalidated when a ``ContentSource`` is changed.
     """
 
+    filtered_sources = _filtered_sources_local_cache.get(FILTERED_SOURCES_CACHE_KEY)
+    if filtered_sources is None:
+        filtered_sources = _get_filtered_sources()
+        _filtered_sources_local_cache.set(FILTERED_SOURCES_CACHE_KEY, filtered_sources)
+
+    if filtered_sources:
+        return Q("terms", source=filtered_sources)
+    return None
+
+
+def _get_filtered_sources() -> list[str]:
     try:
         filtered_sources = cache.get(
             key=FILTERED_SOURCES_CACHE_KEY, version=FILTERED_SOURCES_CACHE_VERSION
@@ -192,9 +310,31 @@ def get_excluded_sources_query() -> Q | None:
         except ConnectionError:
             logger.warning("Redis connect failed, cannot cache filtered sources.")
 
-    if filtered_sources:
-        return Q("terms", source=filtered_sources)
-    return None
+    return filtered_sources
+
+
+@receiver(post_save, sender=models.ContentSource)
+@receiver(post_delete, sender=models.ContentSource)
+def invalidate_filtered_sources(sender, **kwargs):
+    """
+    Drop the cached filtered sources, in Redis and in every worker.
+
+    This waits for the change to be committed. Otherwise, another worker could
+    read the old sources before the commit and cache them again.
+    """
+
+    transaction.on_commit(_invalidate_filtered_sources)
+
+
+def _invalidate_filtered_sources():
+    try:
+        cache.delete(
+            key=FILTERED_SOURCES_CACHE_KEY, version=FILTERED_SOURCES_CACHE_VERSION
+        )
+    except ConnectionError:
+        logger.warning("Redis connect failed, cannot invalidate filtered sources.")
+
+    publish_invalidation(FILTERED_SOURCES_CACHE_KEY)
 
 
 def get_index(
@@ -396,7 +536,7 @@ query_builders = {
 }
 
 
-def query_media(
+async def query_media(
     search_params: MediaSearchRequestSerializer,
     origin_index: OriginIndex,
     exact_index: bool,
@@ -404,6 +544,7 @@ def query_media(
     ip: int,
     filter_dead: bool,
     page: int = 1,
+    tally: bool = True,
 ) -> tuple[list[Hit], int, int, dict]:
     """
     Build the search or collection query, execute it and return
@@ -423,6 +564,7 @@ def query_media(
     Elasticsearch shards.
     :param filter_dead: Whether dead links should be removed.
     :param page: The results page number.
+    :param tally: whether to tally the results
     :return: Tuple with a list of Hits from elasticsearch, the total count of
     pages, the number of results, and the ``SearchContext`` as a dict.
     """
@@ -432,40 +574,43 @@ def query_media(
         "collection" if search_params.validated_data.get("collection") else "search"
     )
 
-    query = query_builders[strategy](search_params)
+    with time_stage("query_build"):
+        # The query builders may read the excluded sources from Redis or the DB.
+        query = await sync_to_async(query_builders[strategy])(search_params)
 
-    s = Search(index=index).query(query)
+        s = AsyncSearch(index=index).query(query)
 
-    if strategy == "search":
-        # Use highlighting to determine which fields contribute to the selection of
-        # top results.
-        s = s.highlight(*DEFAULT_SEARCH_FIELDS)
-        s = s.highlight_options(order="score")
-        s.extra(track_scores=True)
+        if strategy == "search":
+            # Use highlighting to determine which fields contribute to the
+            # selection of top results.
+            s = s.highlight(*DEFAULT_SEARCH_FIELDS)
+            s = s.highlight_options(order="score")
+            s.extra(track_scores=True)
 
-    # Route users to the same Elasticsearch worker node to reduce
-    # pagination inconsistencies and increase cache hits.
-    # TODO: Re-add 7s request_timeout when ES stability is restored
-    s = s.params(preference=str(ip))
+        # Route users to the same Elasticsearch worker node to reduce
+        # pagination inconsistencies and increase cache hits.
+        # TODO: Re-add 7s request_timeout when ES stability is restored
+        s = s.params(preference=str(ip))
 
-    # Sort by `created_on` if the parameter is set or if `strategy` is `collection`.
-    sort_by = search_params.validated_data.get("sort_by")
-    if strategy == "collection" or sort_by == INDEXED_ON:
-        sort_dir = search_params.validated_data.get("sort_dir", "desc")
-        s = s.sort({"created_on": {"order": sort_dir}})
+        # Sort by `created_on` if the parameter is set or if `strategy` is
+        # `collection`.
+        sort_by = search_params.validated_data.get("sort_by")
+        if strategy == "collection" or sort_by == INDEXED_ON:
+            sort_dir = search_params.validated_data.get("sort_dir", "desc")
+            s = s.sort({"created_on": {"order": sort_dir}})
 
     # Execute paginated search and tally results
-    page_count, result_count, results = execute_search(
-        s, page, page_size, filter_dead, index, es_query=strategy
+    page_count, result_count, results = await execute_search(
+        s, page, page_size, filter_dead, index, es_query=strategy, tally=tally
     )
 
     result_ids = [result.identifier for result in results]
-    search_context = SearchContext.build(result_ids, origin_index)
+    search_context = await SearchContext.build(result_ids, origin_index, index)
 
     return results, page_count, result_count, search_context.asdict()
 
 
-def tally_results(
+async def tally_results(
     index: SearchIndex, results: list[Hit] | None, page: int, page_size: int
 ) -> None:
     """
@@ -498,34 +643,109 @@ def tally_results(
         # place we can actually conceivably measure relevancy down the
         # line, it is the only sensible, controlled space we can use to
         # check things like provider density for a set of queries.
-        tallies.count_provider_occurrences(results_to_tally, index)
+        await tallies.count_provider_occurrences(results_to_tally, index)
+
+
+async def _coalesce_search(key: tuple, search) -> tuple[int, int, list[Hit]]:
+    """
+    Share one run of the search between concurrent identical searches.
+
+    Within a worker, later searches await the result of the search in flight.
+    Across workers, if ``SEARCH_COALESCING_ACROSS_WORKERS`` is enabled, later
+    searches wait for the earlier one to finish, so that the links they
+    validate are already in the link validation cache and the dead link mask.
+
+    :param key: the key identifying identical searches
+    :param search: the coroutine function running the search
+    :return: the result of the search
+    """
+
+    if (future := _inflight_searches.get(key)) is None:
+
+        async def run():
+            if not settings.SEARCH_COALESCING_ACROSS_WORKERS:
+                return await search()
+            async with redis_lock(
+                "search_lock:" + ":".join(map(str, key)),
+                settings.SEARCH_COALESCING_LOCK_TIMEOUT_SECONDS,
+            ):
+                return await search()
+
+        future = asyncio.ensure_future(run())
+        _inflight_searches[key] = future
+        future.add_done_callback(lambda _: _inflight_searches.pop(key, None))
+    else:
+        count("search_coalesced")
+
+    # Shielded so that a cancelled request does not cancel the search for the
+    # other requests sharing it.
+    page_count, result_count, results = await asyncio.shield(future)
+    return page_count, result_count, list(results)
+
+
+async def _run_search(
+    s: AsyncSearch, page: int, page_size: int, filter_dead: bool, es_query: str
+) -> tuple[int, int, list[Hit]]:
+    start, end = await get_query_slice(s, page_size, page, filter_dead)
+
+    # Slicing clones the search, so the unsliced one is passed on to share the
+    # query hash memoized while computing the slice.
+    search_response = await get_es_response(s[start:end], es_query=es_query)
+
+    results: list[Hit] = (
+        await _post_process_results(
+            s, start, end, page_size, search_response, filter_dead
+        )
+        or []
+    )
+    result_count, page_count = _get_result_and_page_count(
+        search_response, results, page_size, page
+    )
+
+    if (
+        filter_dead
+        and settings.LINK_VALIDATION_PREVALIDATE_NEXT_PAGE
+        and len(results) == page_size
+        and page < page_count
+    ):
+        # The next page is almost always requested right after this one.
+        _schedule_prevalidation(s, page + 1, page_size)
+
+    return page_count, result_count, results
 
 
-def execute_search(
-    s: Search,
+async def execute_search(
+    s: AsyncSearch,
     page: int,
     page_size: int,
     filter_dead: bool,
     index: SearchIndex,
     es_query: str,
+    tally: bool = True,
 ) -> tuple[int, int, list[Hit]]:
     """
     Execute search for the given query slice, post-processes the results,
     and returns the results and result and page counts.
+
+    If ``SEARCH_COALESCING`` is enabled, concurrent identical searches share
+    one run, but the results are tallied for each of them, unless ``tally``
+    is disabled.
     """
-    start, end = get_query_slice(s, page_size, page, filter_dead)
-    s = s[start:end]
 
-    search_response = get_es_response(s, es_query=es_query)
+    def search():
+        return _run_search(s, page, page_size, filter_dead, es_query)
+
+    if settings.SEARCH_COALESCING:
+        # The index is not part of the query hash.
+        key = (index, get_query_hash(s), page, page_size, filter_dead)
+        page_count, result_count, results = await _coalesce_search(key, search)
+    else:
+        page_count, result_count, results = await search()
+
+    if tally:
+        with time_stage("tallies"):
+            await tally_results(index, results, page, page_size)
 
-    results: list[Hit] = (
-        _post_process_results(s, start, end, page_size, search_response, filter_dead)
-        or []
-    )
-    result_count, page_count = _get_result_and_page_count(
-        search_response, results, page_size, page
-    )
-    tally_results(index, results, page, page_size)
     return page_count, result_count, results
 
 
@@ -533,10 +753,15 @@ def get_sources(index):
     """
     Given an index, find all available data sources and return their counts.
 
+    The counts are cached in the memory of each worker and in Redis.
+
     :param index: An Elasticsearch index, such as `'image'`.
     :return: A dictionary mapping sources to the count of their images.`
     """
     source_cache_name = "sources-" + index
+    if (sources := _sources_local_cache.get(source_cache_name)) is not None:
+        return sources
+
     try:
         sources = cache.get(key=source_cache_name)
     except ConnectionError:
@@ -581,6 +806,7 @@ def get_sources(index):
             logger.warning("Redis connect failed, cannot cache sources.")
 
     sources = {source: int(count) for source, count in sources.items()}
+    _sources_local_cache.set(source_cache_name, sources)
     return sources
 
 
@@ -40,6 +40,7 @@ from api.serializers.audio_serializers import (
 )
 from api.serializers.media_serializers import MediaThumbnailRequestSerializer
 from api.serializers.source_serializers import SourceSerializer
+from api.utils.waveform import WaveformGenerationInProgress
 
 
 serializer = AudioSearchRequestSerializer(context={"media_type": "audio"})
@@ -134,6 +135,7 @@ waveform = custom_extend_schema(
         200: (AudioWaveformSerializer, audio_waveform_200_example),
         401: (AuthenticationFailed, None),
         404: (NotFound, audio_waveform_404_example),
+        503: (WaveformGenerationInProgress, None),
     },
     eg=[audio_waveform_curl],
 )
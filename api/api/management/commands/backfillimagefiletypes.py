@@ -0,0 +1,118 @@
+import asyncio
+
+from django.db.models import Q
+
+from asgiref.sync import async_to_sync
+from django_tqdm import BaseCommand
+
+from api.models import Image
+from api.utils.aiohttp import get_aiohttp_session
+from api.utils.image_proxy import MediaInfo, UpstreamThumbnailException
+from api.utils.image_proxy.extension import get_image_extension
+
+
+PAGE_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = "Resolves the file type of images without one for the thumbnail proxy."
+    """
+    The thumbnail proxy needs the file type of an image to request its
+    thumbnail. For images whose URL has no extension and whose file type is not
+    known to the catalog, the proxy has to send a ``HEAD`` request upstream
+    first. This command resolves these file types ahead of time, in the same
+    way as the proxy, and saves them to the ``image`` table.
+
+    The data refresh replaces the ``image`` table, so this should be run after
+    each refresh. The file types resolved by the proxy and by this command are
+    also kept in Redis, so a second run after a refresh sends few requests.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max_records", help="Limit the number of images to process.", type=int
+        )
+        parser.add_argument(
+            "--concurrency",
+            help="The number of upstream requests to send at once.",
+            type=int,
+            default=4,
+        )
+
+    async def _backfill(self, images, count_to_process, concurrency, progress):
+        semaphore = asyncio.Semaphore(concurrency)
+        errored_identifiers = []
+
+        async def resolve(image):
+            media_info = MediaInfo(
+                media_provider=image.provider,
+                media_identifier=image.identifier,
+                image_url=image.url,
+            )
+            async with semaphore:
+                try:
+                    filetype = await get_image_extension(media_info)
+                except UpstreamThumbnailException as err:
+                    errored_identifiers.append(image.identifier)
+                    self.error(f"Unable to process {image.identifier}: {err}")
+                    return
+                finally:
+                    progress.update(1)
+
+            # Types that could not be determined are cached as "unknown".
+            if filetype and filetype != "unknown":
+                await Image.objects.filter(id=image.id).aupdate(filetype=filetype)
+
+        # Paginate by ID, as images whose type cannot be resolved remain in
+        # the query set.
+        last_id = 0
+        processed = 0
+        while processed < count_to_process:
+            page_size = min(PAGE_SIZE, count_to_process - processed)
+            page = [image async for image in images.filter(id__gt=last_id)[:page_size]]
+            if not page:
+                break
+
+            await asyncio.gather(*(resolve(image) for image in page))
+            last_id = page[-1].id
+            processed += len(page)
+
+        # The session belongs to the event loop of this command.
+        await (await get_aiohttp_session()).close()
+        return errored_identifiers
+
+    def handle(self, *args, **options):
+        images = Image.objects.filter(
+            Q(filetype__isnull=True) | Q(filetype=""), url__isnull=False
+        ).order_by("id")
+
+        max_records = options["max_records"]
+        count = images.count()
+
+        count_to_process = count
+
+        if max_records is not None:
+            count_to_process = max_records if max_records < count else count
+
+        self.info(
+            self.style.NOTICE(f"Resolving file types for {count_to_process:,} records")
+        )
+
+        with self.tqdm(total=count_to_process) as progress:
+            errored_identifiers = async_to_sync(self._backfill)(
+                images, count_to_process, options["concurrency"], progress
+            )
+
+        self.info(self.style.SUCCESS("Finished resolving file types!"))
+
+        if errored_identifiers:
+            errored_identifiers_joined = "\n".join(
+                str(identifier) for identifier in errored_identifiers
+            )
+
+            self.info(
+                self.style.WARNING(
+                    f"The following Image identifiers were unable "
+                    f"to be processed\n\n{errored_identifiers_joined}"
+                )
+            )
@@ -1,39 +1,66 @@
-import subprocess
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from urllib.parse import urlparse
 
+import django_redis
+from asgiref.sync import async_to_sync
 from django_tqdm import BaseCommand
-from limit import limit
+from redis.exceptions import ConnectionError
 
 from api.models.audio import Audio, AudioAddOn
+from api.utils import async_redis
+from api.utils.aiohttp import get_aiohttp_session
 
 
-def paginate_reducing_query(get_query_set, page_size=10):
+PAGE_SIZE = 100
+PROGRESS_KEY = "generatewaveforms:last_id"
+
+
+class HostRateLimiter:
     """
-    Iterate over the given query set yielding a specific number of entries each time.
-
-    We can't use `Paginator` because it can't handle the situation
-    where the query result changes each time a page is accessed.
-    Because the `audios` QuerySet result is naturally getting smaller
-    each time we successfully process waveforms, we can just take
-    the first ten for each "page" until the page comes back empty.
-    This should theoretically be faster/less DB latency inducing
-    anyway as we're never going to have huge OFFSET values to
-    access deep pages.
+    Space out the requests to each host by the given interval, on average.
+
+    Each request reserves the next free slot of its host and waits for it, so
+    requests to other hosts are not held up by a busy one.
     """
-    page = list(get_query_set()[0:page_size])
-    while len(page):
-        yield page
-        page = list(get_query_set()[0:page_size])
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_slots: dict[str, float] = {}
+
+    async def wait(self, url: str) -> None:
+        if self.interval <= 0:
+            return
+
+        host = urlparse(url).hostname
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slots.get(host, now))
+        self._next_slots[host] = slot + self.interval
+        await asyncio.sleep(slot - now)
+
+
+@dataclass
+class _Page:
+    """A page of audio, by the last ID in it and its number of unfinished jobs."""
+
+    last_id: int
+    unfinished: int
 
 
 class Command(BaseCommand):
     help = "Generates waveforms for all audio records to populate the cache."
     """
-    Note: We rely on the file download and waveform generation times
-    taking long enough to prevent us from either making too many requests
-    to the upstream provider or inserting into our database too quickly and
-    causing a slow down. In local tests and in tests run on the staging server
-    it appeared to take on average around 6 to 8 seconds for each audio file.
-    That should be enough latency to not cause any problems.
+    Waveforms are generated by a bounded pool of concurrent jobs, and the audio
+    files are downloaded from each provider host at most once per
+    ``--host_interval`` seconds. Jobs go through ``Audio.aget_or_create_waveform``,
+    so they do not duplicate the work of API requests for the same waveform.
+
+    The audio is walked in pages by ID and, once all the audio up to the end of
+    a page is processed, the last ID of the page is saved to Redis. After an
+    interruption, ``--resume`` continues from there, skipping the audio that
+    failed before it. The IDs change when the data refresh replaces the
+    ``audio`` table, so do not resume across refreshes.
     """
 
     def add_arguments(self, parser):
@@ -43,47 +70,106 @@ class Command(BaseCommand):
         parser.add_argument(
             "--max_records", help="Limit the number of waveforms to create.", type=int
         )
+        parser.add_argument(
+            "--concurrency",
+            help="The number of waveforms to generate at once.",
+            type=int,
+            default=4,
+        )
+        parser.add_argument(
+            "--host_interval",
+            help="The minimum number of seconds between downloads from a host.",
+            type=float,
+            default=2,
+        )
+        parser.add_argument(
+            "--resume",
+            help="Continue after the last page processed by the previous run.",
+            action="store_true",
+        )
 
-    def get_audio_handler(self, options):
-        if options["no_rate_limit"]:
-            return lambda audio: audio.get_or_create_waveform()
-
-        @limit(limit=1, every=2)  # Call once per two seconds maximum
-        def limited(audio):
-            audio.get_or_create_waveform()
-
-        return limited
-
-    def _process_wavelengths(self, audios, audio_handler, count_to_process):
+    async def _save_progress(self, last_id):
+        redis = async_redis.get_async_redis_connection("default")
+        try:
+            await redis.set(PROGRESS_KEY, last_id)
+        except ConnectionError:
+            self.error("Redis connect failed, progress not saved.")
+
+    async def _generate(self, audios, count_to_process, options, progress):
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        # Jobs are started as earlier ones finish rather than page by page, so
+        # the pool stays busy across pages. At most a page of jobs waits for its
+        # turn next to the ones running.
+        window = asyncio.Semaphore(PAGE_SIZE + options["concurrency"])
+        rate_limiter = HostRateLimiter(
+            0 if options["no_rate_limit"] else options["host_interval"]
+        )
         errored_identifiers = []
-        processed = 0
-        with self.tqdm(total=count_to_process) as progress:
-            paginator = paginate_reducing_query(
-                get_query_set=lambda: audios.exclude(identifier__in=errored_identifiers)
-            )
-            for page in paginator:
-                for audio in page:
-                    if processed > count_to_process:
-                        return errored_identifiers
+        pending_pages: deque[_Page] = deque()
+        jobs = set()
+
+        async def generate(audio, page):
+            try:
+                await rate_limiter.wait(audio.url)
+                async with semaphore:
                     try:
-                        processed += 1
-                        audio_handler(audio)
-                    except subprocess.CalledProcessError as err:
-                        errored_identifiers.append(audio.identifier)
-                        self.error(
-                            f"Unable to process {audio.identifier}: "
-                            f"{err.stderr.decode().strip()}"
-                        )
-                    except KeyboardInterrupt:
-                        errored_identifiers.append(audio.identifier)
-                        return errored_identifiers
-                    except BaseException as err:
+                        await audio.aget_or_create_waveform(wait=True)
+                    except Exception as err:
                         errored_identifiers.append(audio.identifier)
                         self.error(f"Unable to process {audio.identifier}: {err}")
-                    progress.update(1)
-
+                    finally:
+                        progress.update(1)
+            finally:
+                page.unfinished -= 1
+                window.release()
+
+        async def save_finished_pages():
+            # Only pages whose audio, and that of all earlier pages, is done can
+            # be skipped when resuming.
+            last_id = None
+            while pending_pages and pending_pages[0].unfinished == 0:
+                last_id = pending_pages.popleft().last_id
+            if last_id is not None:
+                await self._save_progress(last_id)
+
+        # Paginate by ID, as audio whose waveform fails remains in the query set.
+        last_id = 0
+        processed = 0
+        while processed < count_to_process:
+            page_size = min(PAGE_SIZE, count_to_process - processed)
+            page_audios = [
+                audio async for audio in audios.filter(id__gt=last_id)[:page_size]
+            ]
+            if not page_audios:
+                break
+
+            page = _Page(page_audios[-1].id, len(page_audios))
+            pending_pages.append(page)
+            for audio in page_audios:
+                await window.acquire()
+                job = asyncio.create_task(generate(audio, page))
+                jobs.add(job)
+                job.add_done_callback(jobs.discard)
+            last_id = page.last_id
+            processed += len(page_audios)
+            await save_finished_pages()
+
+        await asyncio.gather(*jobs)
+        await save_finished_pages()
+
+        # The session belongs to the event loop of this command.
+        await (await get_aiohttp_session()).close()
         return errored_identifiers
 
+    def _get_resume_id(self):
+        redis = django_redis.get_redis_connection("default")
+        try:
+            last_id = redis.get(PROGRESS_KEY)
+        except ConnectionError:
+            self.error("Redis connect failed, cannot resume.")
+            return None
+        return int(last_id) if last_id else None
+
     def handle(self, *args, **options):
         existing_waveform_audio_identifiers_query = AudioAddOn.objects.filter(
             waveform_peaks__isnull=False
@@ -92,6 +178,10 @@ class Command(BaseCommand):
             identifier__in=existing_waveform_audio_identifiers_query
         ).order_by("id")
 
+        if options["resume"] and (resume_id := self._get_resume_id()) is not None:
+            self.info(self.style.NOTICE(f"Resuming after ID {resume_id}"))
+            audios = audios.filter(id__gt=resume_id)
+
         max_records = options["max_records"]
         count = audios.count()
 
@@ -104,11 +194,16 @@ class Command(BaseCommand):
             self.style.NOTICE(f"Generating waveforms for {count_to_process:,} records")
         )
 
-        audio_handler = self.get_audio_handler(options)
-
-        errored_identifiers = self._process_wavelengths(
-            audios, audio_handler, count_to_process
-        )
+        with self.tqdm(total=count_to_process) as progress:
+            try:
+                errored_identifiers = async_to_sync(self._generate)(
+                    audios, count_to_process, options, progress
+                )
+            except KeyboardInterrupt:
+                self.info(
+                    self.style.WARNING("Interrupted, run with --resume to continue.")
+                )
+                return
 
         self.info(self.style.SUCCESS("Finished generating waveforms!"))
 
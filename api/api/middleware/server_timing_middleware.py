@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from asgiref.sync import iscoroutinefunction
+
+from api.utils.timing import UNRESOLVED_ROUTE, record_request, render_server_timing
+
+
+def _get_route(request) -> str:
+    if (match := request.resolver_match) is None or not match.view_name:
+        return UNRESOLVED_ROUTE
+    return match.view_name
+
+
+# Records the durations of the stages of each request, which are added to the
+# metrics of the process under the name of the view the request resolved to
+# and, if enabled, sent in the ``Server-Timing`` header.
+@sync_and_async_middleware
+def server_timing_middleware(get_response):
+    def add_header(response, timings):
+        if settings.ENABLE_SERVER_TIMING_HEADER:
+            response["Server-Timing"] = render_server_timing(timings)
+        return response
+
+    if iscoroutinefunction(get_response):
+
+        async def async_middleware(request):
+            with record_request() as timings:
+                response = await get_response(request)
+                timings.route = _get_route(request)
+            return add_header(response, timings)
+
+        return async_middleware
+
+    def middleware(request):
+        with record_request() as timings:
+            response = get_response(request)
+            timings.route = _get_route(request)
+        return add_header(response, timings)
+
+    return middleware
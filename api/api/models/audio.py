@@ -19,7 +19,7 @@ from api.models.media import (
     AbstractSensitiveMedia,
 )
 from api.models.mixins import FileMixin, ForeignIdentifierMixin, MediaMixin
-from api.utils.waveform import generate_peaks
+from api.utils.waveform import agenerate_peaks, coalesce_waveform
 
 
 class AltAudioFile(AbstractAltFile):
@@ -223,16 +223,33 @@ class Audio(AudioFileMixin, AbstractMedia):
     def audio_set(self):
         return getattr(self, "audioset")
 
-    def get_or_create_waveform(self):
-        add_on, _ = AudioAddOn.objects.get_or_create(audio_identifier=self.identifier)
+    async def aget_or_create_waveform(self, wait: bool = False):
+        """
+        Get the waveform peaks of the audio, generating them if needed.
+
+        Concurrent calls for the same audio, in this worker or in others,
+        generate the waveform only once. See ``coalesce_waveform``.
+
+        :param wait: whether to wait for a generation in another worker
+        """
+
+        add_on, _ = await AudioAddOn.objects.aget_or_create(
+            audio_identifier=self.identifier
+        )
 
         if add_on.waveform_peaks is not None:
             return add_on.waveform_peaks
 
-        add_on.waveform_peaks = generate_peaks(self)
-        add_on.save()
+        async def generate():
+            # Another worker may have generated the waveform while this one
+            # waited for the lock.
+            await add_on.arefresh_from_db(fields=["waveform_peaks"])
+            if add_on.waveform_peaks is None:
+                add_on.waveform_peaks = await agenerate_peaks(self)
+                await add_on.asave()
+            return add_on.waveform_peaks
 
-        return add_on.waveform_peaks
+        return await coalesce_waveform(self.identifier, generate, wait=wait)
 
     class Meta(AbstractMedia.Meta):
         db_table = "audio"
@@ -127,6 +127,7 @@ class AudioSerializer(AudioHyperlinksSerializer, MediaSerializer):
 
     class Meta:
         model = Audio
+        list_serializer_class = MediaSerializer.Meta.list_serializer_class
         fields = sorted(  # keep this list ordered logically
             [
                 *MediaSerializer.Meta.fields,
@@ -78,6 +78,7 @@ class ImageSerializer(ImageHyperlinksSerializer, MediaSerializer):
 
     class Meta:
         model = Image
+        list_serializer_class = MediaSerializer.Meta.list_serializer_class
         fields = sorted(  # keep this list ordered logically
             [
                 *MediaSerializer.Meta.fields,
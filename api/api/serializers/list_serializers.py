@@ -0,0 +1,129 @@
+import operator
+from collections.abc import Callable
+from types import SimpleNamespace
+
+from django.db.models.manager import BaseManager
+from rest_framework import serializers
+from rest_framework.relations import Hyperlink, PKOnlyObject
+
+
+Accessor = Callable[[object], object]
+
+# Stands in for the identifier when resolving the URL pattern of a hyperlink.
+_URL_PLACEHOLDER = "00000000-0000-0000-0000-000000000000"
+
+# Fields whose representation only depends on the value of a single attribute.
+_PLAIN_FIELDS = {
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.FloatField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+    serializers.URLField,
+}
+
+
+def _represent(field: serializers.Field, attribute) -> object:
+    # Mirrors ``Serializer.to_representation``, which skips ``to_representation``
+    # for ``None`` values.
+    check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+    if check_for_none is None:
+        return None
+    return field.to_representation(attribute)
+
+
+def _compile_hyperlink_accessor(field: serializers.HyperlinkedIdentityField):
+    request = field.context["request"]
+    format = field.context.get("format")
+    if format and field.format and field.format != format:
+        format = field.format
+
+    placeholder = SimpleNamespace(**{field.lookup_field: _URL_PLACEHOLDER})
+    template = field.get_url(placeholder, field.view_name, request, format)
+
+    def accessor(instance):
+        # Unsaved objects do not have a valid URL.
+        if hasattr(instance, "pk") and instance.pk in (None, ""):
+            return None
+
+        lookup_value = str(getattr(instance, field.lookup_field))
+        return Hyperlink(template.replace(_URL_PLACEHOLDER, lookup_value), instance)
+
+    return accessor
+
+
+def _compile_plain_accessor(field: serializers.Field):
+    get = operator.attrgetter(field.source_attrs[0])
+
+    def accessor(instance):
+        try:
+            attribute = get(instance)
+        except AttributeError:
+            # Let the field apply its default, or raise, as it normally would.
+            attribute = field.get_attribute(instance)
+        return _represent(field, attribute)
+
+    return accessor
+
+
+def _compile_accessor(field: serializers.Field) -> Accessor:
+    if isinstance(field, serializers.HyperlinkedIdentityField):
+        return _compile_hyperlink_accessor(field)
+
+    if type(field) in _PLAIN_FIELDS and len(field.source_attrs) == 1:
+        return _compile_plain_accessor(field)
+
+    def accessor(instance):
+        return _represent(field, field.get_attribute(instance))
+
+    return accessor
+
+
+def compile_accessors(serializer: serializers.Serializer) -> list[tuple[str, Accessor]]:
+    """
+    Compile an accessor for each readable field of the serializer.
+
+    An accessor returns the representation of its field for an instance, like
+    ``Serializer.to_representation`` does, and raises ``SkipField`` if the field
+    should be left out. Work that only depends on the serializer and its context,
+    like resolving the URL patterns of hyperlinks, is done here once instead of
+    for every instance.
+
+    :param serializer: the serializer, bound to its context
+    :return: the pairs of field names and accessors, in order of the fields
+    """
+
+    return [
+        (field.field_name, _compile_accessor(field))
+        for field in serializer._readable_fields
+    ]
+
+
+def represent_with_accessors(
+    instance, accessors: list[tuple[str, Accessor]]
+) -> dict[str, object]:
+    """Produce the same output as ``Serializer.to_representation`` for ``instance``."""
+
+    ret = {}
+    for field_name, accessor in accessors:
+        try:
+            ret[field_name] = accessor(instance)
+        except serializers.SkipField:
+            continue
+    return ret
+
+
+class MediaListSerializer(serializers.ListSerializer):
+    """
+    Serialize a page of media, compiling the field accessors once for the page.
+
+    The output is the same as that of serializing each item with the child
+    serializer, which must implement ``compile_accessors``, receiving the items.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, BaseManager) else data
+        items = list(iterable)
+
+        self.child.compile_accessors(items)
+        return [self.child.to_representation(item) for item in items]
@@ -6,6 +6,7 @@ from django.conf import settings
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.validators import MaxValueValidator
 from django.urls import reverse
+from django.utils.dateparse import parse_datetime
 from rest_framework import serializers
 from rest_framework.exceptions import NotAuthenticated, ValidationError
 from rest_framework.request import Request
@@ -13,7 +14,7 @@ from rest_framework.request import Request
 from adrf.serializers import Serializer
 from drf_spectacular.utils import extend_schema_serializer
 from elasticsearch_dsl.response import Hit
-from openverse_attribution.license import License
+from openverse_attribution.license import License, get_attribution_texts
 
 from api.constants import restricted_features, sensitivity
 from api.constants.licenses import LICENSE_GROUPS
@@ -33,6 +34,11 @@ from api.serializers.docs import (
     UNSTABLE_WARNING,
 )
 from api.serializers.fields import SchemableHyperlinkedIdentityField
+from api.serializers.list_serializers import (
+    MediaListSerializer,
+    compile_accessors,
+    represent_with_accessors,
+)
 from api.utils.help_text import make_comma_separated_help_text
 from api.utils.url import add_protocol
 
@@ -652,8 +658,9 @@ class TagSerializer(Serializer):
     unstable__provider = serializers.CharField(
         label="provider",
         source="provider",
-        # Provider is present in the database but not in Elasticsearch, so it may
-        # not always be present during serialization
+        # Provider is present in the database but only in Elasticsearch indexes
+        # built with the fields stored for the API, so it may not always be
+        # present during serialization
         allow_null=True,
         help_text="The source of the tag. When this field matches the provider for the "
         "record, the tag originated from the upstream provider. Otherwise, the tag "
@@ -661,6 +668,13 @@ class TagSerializer(Serializer):
     )
 
 
+def _get_license_url(license: str, license_version: str | None) -> str | None:
+    try:
+        return License(license, license_version).url
+    except ValueError:
+        return None
+
+
 @extend_schema_serializer(
     exclude_fields=[
         "unstable__sensitivity",
@@ -675,6 +689,7 @@ class MediaSerializer(BaseModelSerializer):
 
     class Meta:
         model = AbstractMedia
+        list_serializer_class = MediaListSerializer
         fields = [
             "id",
             "indexed_on",
@@ -778,6 +793,58 @@ class MediaSerializer(BaseModelSerializer):
 
         return result
 
+    _accessors = None
+
+    def compile_accessors(self, items: list):
+        """
+        Compile the field accessors used to serialize the items of a list.
+
+        See ``api.serializers.list_serializers.compile_accessors``. The
+        attribution texts of all items are generated together, upfront.
+
+        :param items: the media items that will be serialized
+        """
+
+        accessors = compile_accessors(self)
+        if "attribution" in self.fields:
+            attributions = dict(
+                zip(
+                    map(id, items),
+                    get_attribution_texts(map(self._get_attribution_record, items)),
+                )
+            )
+            accessors = [
+                (name, lambda obj: attributions[id(obj)])
+                if name == "attribution"
+                else (name, accessor)
+                for name, accessor in accessors
+            ]
+        self._accessors = accessors
+
+    @staticmethod
+    def _get_attribution_record(obj: Hit | AbstractMedia) -> dict:
+        # Hits from indexes created before the fields were stored for the API
+        # have neither of the license fields.
+        return {
+            "license": obj.license.lower(),
+            "license_version": getattr(obj, "license_version", None),
+            "title": obj.title,
+            "creator": obj.creator,
+            "license_url": getattr(obj, "license_url", None),
+        }
+
+    @staticmethod
+    def _get_hit_attribution(hit: Hit) -> str | None:
+        """Mirror ``AbstractMedia.attribution`` for an Elasticsearch ``Hit``."""
+
+        try:
+            lic = License(hit.license.lower(), hit.license_version)
+        except ValueError:
+            return None
+        return lic.get_attribution_text(
+            hit.title, hit.creator, getattr(hit, "license_url", None) or lic.url
+        )
+
     def to_representation(self, *args, **kwargs):
         # This serializer adapts both ES Hits *and* Media instances. Currently,
         # ES has a `mature` field on it which represents if maturity was present on
@@ -788,8 +855,18 @@ class MediaSerializer(BaseModelSerializer):
         obj = args[0]
         if isinstance(obj, Hit):
             obj.sensitive = obj.mature
-
-        output = super().to_representation(*args, **kwargs)
+            # Documents indexed with the fields stored for the API can be serialized
+            # without the database, given the properties the media models compute.
+            if "license_version" in obj:
+                if isinstance(obj.created_on, str):
+                    obj.created_on = parse_datetime(obj.created_on)
+                if self._accessors is None:
+                    obj.attribution = self._get_hit_attribution(obj)
+
+        if self._accessors is None:
+            output = super().to_representation(*args, **kwargs)
+        else:
+            output = represent_with_accessors(obj, self._accessors)
 
         # Ensure lists are ``[]`` instead of ``None``
         # TODO: These fields are still marked 'Nullable' in the API docs
@@ -802,11 +879,9 @@ class MediaSerializer(BaseModelSerializer):
         output["license"] = output["license"].lower()
 
         if output.get("license_url") is None:
-            try:
-                lic = License(output["license"], output["license_version"])
-                output["license_url"] = lic.url
-            except ValueError:
-                pass
+            output["license_url"] = _get_license_url(
+                output["license"], output["license_version"]
+            )
 
         # Ensure URLs have scheme
         url_fields = ["url", "creator_url", "foreign_landing_url"]
@@ -1,6 +1,7 @@
 import asyncio
 import time
 import weakref
+from collections.abc import Callable
 
 import aiohttp
 import structlog
@@ -11,7 +12,7 @@ logger = structlog.get_logger(__name__)
 
 
 _SESSIONS: weakref.WeakKeyDictionary[
-    asyncio.AbstractEventLoop, aiohttp.ClientSession
+    asyncio.AbstractEventLoop, dict[str, aiohttp.ClientSession]
 ] = weakref.WeakKeyDictionary()
 
 _LOCKS: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock] = (
@@ -26,17 +27,21 @@ async def _close_sessions(sender, **kwargs):
     closed_sessions = 0
 
     while _SESSIONS:
-        loop, session = _SESSIONS.popitem()
-        try:
-            await session.close()
-            closed_sessions += 1
-        except BaseException as exc:
-            logger.error("Error closing sessions", exc=exc, exc_info=True)
+        loop, sessions = _SESSIONS.popitem()
+        for session in sessions.values():
+            try:
+                await session.close()
+                closed_sessions += 1
+            except BaseException as exc:
+                logger.error("Error closing sessions", exc=exc, exc_info=True)
 
     logger.debug("Successfully closed %s session(s)", closed_sessions)
 
 
-async def get_aiohttp_session() -> aiohttp.ClientSession:
+async def get_aiohttp_session(
+    name: str = "default",
+    connector_factory: Callable[[], aiohttp.BaseConnector] | None = None,
+) -> aiohttp.ClientSession:
     """
     Safely retrieve a shared aiohttp session for the current event loop.
 
@@ -51,6 +56,13 @@ async def get_aiohttp_session() -> aiohttp.ClientSession:
     function assumes that it's possible for multiple loops to be present in
     the lifetime of the application and therefore we need to verify that each
     loop gets its own session.
+
+    Callers that need a differently configured connection pool can request a
+    separately named session, along with a factory for its connector. The
+    factory is only called when the named session is created.
+
+    :param name: the name of the session to retrieve
+    :param connector_factory: creates the connector for a new session
     """
 
     loop = asyncio.get_running_loop()
@@ -59,23 +71,27 @@ async def get_aiohttp_session() -> aiohttp.ClientSession:
         _LOCKS[loop] = asyncio.Lock()
 
     async with _LOCKS[loop]:
-        if loop not in _SESSIONS:
+        sessions = _SESSIONS.setdefault(loop, {})
+        if name not in sessions:
             create_session = True
             msg = "No session for loop. Creating new session."
-        elif _SESSIONS[loop].closed:
+        elif sessions[name].closed:
             create_session = True
             msg = "Loop's previous session closed. Creating new session."
         else:
             create_session = False
             msg = "Reusing existing session for loop."
 
-        logger.info(msg)
+        logger.info(msg, name=name)
 
         if create_session:
-            session = aiohttp.ClientSession(trace_configs=[LogTiming()])
-            _SESSIONS[loop] = session
+            session = aiohttp.ClientSession(
+                connector=connector_factory() if connector_factory else None,
+                trace_configs=[LogTiming()],
+            )
+            sessions[name] = session
 
-        return _SESSIONS[loop]
+        return sessions[name]
 
 
 class LogTiming(aiohttp.TraceConfig):
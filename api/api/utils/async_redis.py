@@ -0,0 +1,47 @@
+import asyncio
+import weakref
+
+from django.conf import settings
+
+import structlog
+from django_asgi_lifespan.signals import asgi_shutdown
+from redis.asyncio import Redis
+
+
+logger = structlog.get_logger(__name__)
+
+
+_CLIENTS: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, Redis]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+@asgi_shutdown.connect
+async def _close_clients(sender, **kwargs):
+    logger.debug("Closing async Redis clients on application shutdown")
+
+    while _CLIENTS:
+        loop, clients = _CLIENTS.popitem()
+        for client in clients.values():
+            try:
+                await client.aclose()
+            except BaseException as exc:
+                logger.error("Error closing async Redis client", exc=exc, exc_info=True)
+
+
+def get_async_redis_connection(alias: str = "default") -> Redis:
+    """
+    Get an async Redis client for the cache and the current event loop.
+
+    Unlike ``django_redis.get_redis_connection``, the client does not need to
+    be wrapped with ``sync_to_async``, which hops to a thread for each call.
+    The connection pools of async clients are bound to an event loop, so, like
+    ``get_aiohttp_session``, each loop gets its own client.
+
+    :param alias: the name of the cache in ``settings.CACHES``
+    """
+
+    clients = _CLIENTS.setdefault(asyncio.get_running_loop(), {})
+    if alias not in clients:
+        clients[alias] = Redis.from_url(settings.CACHES[alias]["LOCATION"])
+    return clients[alias]
@@ -1,35 +1,37 @@
 import asyncio
 import time
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
 
 from django.conf import settings
 
 import aiohttp
-import django_redis
 import structlog
-from asgiref.sync import async_to_sync
 from decouple import config
 from elasticsearch_dsl.response import Hit
 from redis.exceptions import ConnectionError
 
 from api.utils.aiohttp import get_aiohttp_session
+from api.utils.check_dead_links.circuit_breaker import breaker
 from api.utils.check_dead_links.provider_status_mappings import provider_status_mappings
+from api.utils.check_dead_links.status_cache import (
+    cache_statuses,
+    get_cached_statuses,
+)
 from api.utils.dead_link_mask import get_query_mask, save_query_mask
+from api.utils.timing import count
 
 
 logger = structlog.get_logger(__name__)
 
-CACHE_PREFIX = "valid:"
 HEADERS = {
     "User-Agent": settings.OUTBOUND_USER_AGENT_TEMPLATE.format(purpose="LinkValidation")
 }
 
 
-def _get_cached_statuses(redis, urls):
+async def _get_cached_statuses(urls):
     try:
-        cached_statuses = redis.mget([CACHE_PREFIX + url for url in urls])
-        return [
-            int(b.decode("utf-8")) if b is not None else None for b in cached_statuses
-        ]
+        return await get_cached_statuses(urls)
     except ConnectionError:
         logger.warning("Redis connect failed, validating all URLs without cache.")
         return [None] * len(urls)
@@ -42,6 +44,8 @@ def _get_expiry(status, default):
 _timeout = aiohttp.ClientTimeout(total=settings.LINK_VALIDATION_TIMEOUT_SECONDS)
 
 _ERROR_STATUS = -1
+# Not cached, and treated like an unknown status for every provider.
+_CIRCUIT_OPEN_STATUS = -3
 
 
 # Used to filter network errors during liveness checks that we believe
@@ -61,6 +65,15 @@ _NON_ACTIONABLE_NETWORK_EXCEPTIONS = (
 )
 
 
+def _create_connector() -> aiohttp.TCPConnector:
+    return aiohttp.TCPConnector(
+        limit=settings.LINK_VALIDATION_CONNECTION_LIMIT,
+        limit_per_host=settings.LINK_VALIDATION_CONNECTION_LIMIT_PER_HOST,
+        keepalive_timeout=settings.LINK_VALIDATION_KEEPALIVE_SECONDS,
+        ttl_dns_cache=settings.LINK_VALIDATION_DNS_CACHE_SECONDS,
+    )
+
+
 async def _head(
     url: str, session: aiohttp.ClientSession, provider: str
 ) -> tuple[str, int]:
@@ -107,11 +120,19 @@ async def _head(
 
         status = _ERROR_STATUS
 
+    host = urlparse(url).netloc
+    if status == _ERROR_STATUS:
+        breaker.record_failure(host)
+    else:
+        breaker.record_success(host)
+
     return url, status
 
 
-# https://stackoverflow.com/q/55259755
-@async_to_sync
+async def _short_circuit(url: str) -> tuple[str, int]:
+    return url, _CIRCUIT_OPEN_STATUS
+
+
 async def _make_head_requests(
     urls: dict[str, int], results: list[Hit]
 ) -> list[tuple[str, int]]:
@@ -123,17 +144,58 @@ async def _make_head_requests(
     :param urls: A dictionary with keys of the URLs to request, mapped to the index of that url in ``results``
     :param results: The ordered list of results, including ones not being validated.
     """
-    session = await get_aiohttp_session()
-    tasks = [
-        asyncio.ensure_future(_head(url, session, results[idx].provider))
-        for url, idx in urls.items()
-    ]
+    session = await get_aiohttp_session("link_validation", _create_connector)
+    # Hosts are checked against the circuit breaker before any request is sent,
+    # so failures within this batch only affect later ones.
+    tasks = []
+    for url, idx in urls.items():
+        if breaker.is_open(urlparse(url).netloc):
+            count("link_short_circuit")
+            tasks.append(asyncio.ensure_future(_short_circuit(url)))
+        else:
+            count("link_head_request")
+            tasks.append(
+                asyncio.ensure_future(_head(url, session, results[idx].provider))
+            )
     responses = asyncio.gather(*tasks)
     await responses
     return responses.result()
 
 
-def check_dead_links(query_hash: str, start_slice: int, results: list[Hit]) -> None:
+async def _cache_statuses(verified: list[tuple[str, int]]) -> None:
+    to_cache = {
+        url: status for url, status in verified if status != _CIRCUIT_OPEN_STATUS
+    }
+
+    for url, status in to_cache.items():
+        if status == 200:
+            logger.debug(f"healthy link url={url}")
+        elif status == _ERROR_STATUS:
+            logger.debug(f"no response from provider url={url}")
+        else:
+            logger.debug(f"broken link url={url}")
+
+    try:
+        await cache_statuses(to_cache)
+    except ConnectionError:
+        logger.warning("Redis connect failed, cannot cache link liveness.")
+
+
+async def _update_query_mask(
+    query_hash: str, start_slice: int, new_mask: list[int]
+) -> None:
+    mask = await get_query_mask(query_hash)
+    if mask:
+        # skip the leading part of the mask that represents results that come before
+        # the results we've verified this time around. Overwrite everything after
+        # with our new results validation mask.
+        new_mask = mask.to_list()[:start_slice] + new_mask
+    await save_query_mask(query_hash, new_mask)
+
+
+async def check_dead_links(
+    query_hash: str, start_slice: int, results: list[Hit]
+) -> None:
     """
     Make sure images exist before we display them.
 
@@ -153,8 +215,7 @@ def check_dead_links(query_hash: str, start_slice: int, results: list[Hit]) -> N
     start_time = time.time()
 
     # Pull matching images from the cache.
-    redis = django_redis.get_redis_connection("default")
-    cached_statuses = _get_cached_statuses(redis, urls)
+    cached_statuses = await _get_cached_statuses(urls)
     logger.debug(f"len(cached_statuses)={len(cached_statuses)}")
 
     # Anything that isn't in the cache needs to be validated via HEAD request.
@@ -163,32 +224,13 @@ def check_dead_links(query_hash: str, start_slice: int, results: list[Hit]) -> N
         if cached_statuses[idx] is None:
             to_verify[url] = idx
     logger.debug(f"len(to_verify)={len(to_verify)}")
+    count("link_cache_hit", len(urls) - len(to_verify))
+    count("link_cache_miss", len(to_verify))
 
-    verified = _make_head_requests(to_verify, results)
+    verified = await _make_head_requests(to_verify, results)
 
     # Cache newly verified image statuses.
-    to_cache = {CACHE_PREFIX + url: status for url, status in verified}
-
-    pipe = redis.pipeline()
-    if len(to_cache) > 0:
-        pipe.mset(to_cache)
-
-    for key, status in to_cache.items():
-        if status == 200:
-            logger.debug(f"healthy link key={key}")
-        elif status == _ERROR_STATUS:
-            logger.debug(f"no response from provider key={key}")
-        else:
-            logger.debug(f"broken link key={key}")
-
-        expiry = settings.LINK_VALIDATION_CACHE_EXPIRY_CONFIGURATION[status]
-        logger.debug(f"caching status={status} expiry={expiry}")
-        pipe.expire(key, expiry)
-
-    try:
-        pipe.execute()
-    except ConnectionError:
-        logger.warning("Redis connect failed, cannot cache link liveness.")
+    await _cache_statuses(verified)
 
     # Merge newly verified results with cached statuses
     for idx, url in enumerate(to_verify):
@@ -197,6 +239,7 @@ def check_dead_links(query_hash: str, start_slice: int, results: list[Hit]) -> N
 
     # Create a new dead link mask
     new_mask = [1] * len(results)
+    provider_stats: defaultdict[str, Counter] = defaultdict(Counter)
 
     # Delete broken images from the search results response.
     for idx, _ in enumerate(cached_statuses):
@@ -206,7 +249,15 @@ def check_dead_links(query_hash: str, start_slice: int, results: list[Hit]) -> N
         provider = results[del_idx]["provider"]
         status_mapping = provider_status_mappings[provider]
 
-        if status in status_mapping.unknown:
+        provider_stats[provider]["checked"] += 1
+        if urls[del_idx] not in to_verify:
+            provider_stats[provider]["cached"] += 1
+
+        if status == _CIRCUIT_OPEN_STATUS:
+            # The host is failing, so the liveness of the link is unknown.
+            provider_stats[provider]["short_circuited"] += 1
+        elif status in status_mapping.unknown:
+            provider_stats[provider]["unknown"] += 1
             logger.warning(
                 "Image validation failed due to rate limiting or blocking. "
                 f"url={urls[idx]} "
@@ -214,6 +265,7 @@ def check_dead_links(query_hash: str, start_slice: int, results: list[Hit]) -> N
                 f"provider={provider} "
             )
         elif status not in status_mapping.live:
+            provider_stats[provider]["dead"] += 1
             logger.info(
                 "Deleting broken image from results "
                 f"id={results[del_idx]['identifier']} "
@@ -224,15 +276,14 @@ def check_dead_links(query_hash: str, start_slice: int, results: list[Hit]) -> N
             del results[del_idx]
             # update the result's position in the mask to indicate it is dead
             new_mask[del_idx] = 0
+        else:
+            provider_stats[provider]["live"] += 1
+
+    for provider, stats in provider_stats.items():
+        logger.info("link_validation_provider_stats", provider=provider, **stats)
 
     # Merge and cache the new mask
-    mask = get_query_mask(query_hash)
-    if mask:
-        # skip the leading part of the mask that represents results that come before
-        # the results we've verified this time around. Overwrite everything after
-        # with our new results validation mask.
-        new_mask = mask[:start_slice] + new_mask
-    save_query_mask(query_hash, new_mask)
+    await _update_query_mask(query_hash, start_slice, new_mask)
 
     end_time = time.time()
     logger.debug(
@@ -0,0 +1,66 @@
+"""Per-host circuit breaking for link validation requests."""
+
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+import structlog
+
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class _HostState:
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+
+
+class CircuitBreaker:
+    """
+    Track failing hosts and stop sending requests to them for a while.
+
+    A host's circuit opens once ``LINK_VALIDATION_CIRCUIT_FAILURE_THRESHOLD``
+    requests to it have failed in a row, and stays open for
+    ``LINK_VALIDATION_CIRCUIT_COOLDOWN_SECONDS``. After the cooldown, requests
+    are let through again; the first failure re-opens the circuit, and the
+    first success closes it.
+
+    The state is kept in the memory of each process, so that checking it
+    never waits on the network.
+    """
+
+    def __init__(self):
+        self._hosts: dict[str, _HostState] = {}
+
+    def is_open(self, host: str) -> bool:
+        state = self._hosts.get(host)
+        return state is not None and state.open_until > time.monotonic()
+
+    def record_success(self, host: str) -> None:
+        self._hosts.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        state = self._hosts.setdefault(host, _HostState())
+        state.consecutive_failures += 1
+
+        if (
+            state.consecutive_failures
+            >= settings.LINK_VALIDATION_CIRCUIT_FAILURE_THRESHOLD
+            and not self.is_open(host)
+        ):
+            state.open_until = (
+                time.monotonic() + settings.LINK_VALIDATION_CIRCUIT_COOLDOWN_SECONDS
+            )
+            logger.warning(
+                "link_validation_circuit_opened",
+                host=host,
+                consecutive_failures=state.consecutive_failures,
+            )
+
+    def reset(self) -> None:
+        self._hosts.clear()
+
+
+breaker = CircuitBreaker()
@@ -0,0 +1,129 @@
+"""
+Compact storage of link validation statuses in Redis.
+
+Instead of one key per URL, statuses are stored as fields of Redis hashes. The
+field is a fixed-size digest of the URL and the hash, or bucket, is chosen by
+the digest as well. Small hashes are stored by Redis as compact listpacks, so
+``LINK_VALIDATION_CACHE_BUCKETS`` should be chosen such that buckets stay below
+Redis' ``hash-max-listpack-entries``.
+
+Redis can only expire whole keys, so each field stores the time its status
+expires next to the status, and buckets are rotated by generation. Each
+configured expiry has its own series of generations, which last as long as the
+expiry. Statuses are written to the bucket of the current generation of their
+expiry, which expires at the end of the following generation, so that every
+status that has not expired yet is found in the buckets of either the current
+or the previous generation, and none is kept for more than twice its expiry.
+
+Statuses cached by previous releases under ``valid:<url>`` keys are read as a
+fallback while ``LINK_VALIDATION_CACHE_READ_LEGACY_KEYS`` is enabled. They are
+not written anymore, so the setting can be disabled once the longest configured
+expiry has passed after the release.
+"""
+
+import hashlib
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from api.utils import async_redis
+
+
+HASHED_CACHE_PREFIX = "valid_digest:"
+LEGACY_CACHE_PREFIX = "valid:"
+
+
+def _digest(url: str) -> bytes:
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+
+
+def _expiries() -> set[int]:
+    expiry_configuration = settings.LINK_VALIDATION_CACHE_EXPIRY_CONFIGURATION
+    return {*expiry_configuration.values(), expiry_configuration.default_factory()}
+
+
+def _bucket_key(digest: bytes, expiry: int, generation: int) -> str:
+    buckets = settings.LINK_VALIDATION_CACHE_BUCKETS
+    bucket = int.from_bytes(digest[:4], "big") % buckets
+    return f"{HASHED_CACHE_PREFIX}{expiry}:{generation}:{bucket}"
+
+
+def _parse_entry(entry: bytes | None, now: float) -> int | None:
+    if entry is None:
+        return None
+
+    status, expires_at = entry.split(b":")
+    if int(expires_at) <= now:
+        return None
+    return int(status)
+
+
+async def get_cached_statuses(urls: list[str]) -> list[int | None]:
+    """
+    Get the cached statuses of the given URLs in a single round trip.
+
+    :param urls: the URLs to look up
+    :return: the status of each URL, or ``None`` if it is not cached
+    """
+
+    now = time.time()
+    digests = [_digest(url) for url in urls]
+
+    pipe = async_redis.get_async_redis_connection("default").pipeline()
+    lookups = []
+    for expiry in sorted(_expiries()):
+        generation = int(now // expiry)
+        for gen in (generation, generation - 1):
+            fields_by_bucket = defaultdict(list)
+            for idx, digest in enumerate(digests):
+                fields_by_bucket[_bucket_key(digest, expiry, gen)].append((idx, digest))
+            for key, fields in fields_by_bucket.items():
+                pipe.hmget(key, [digest for _, digest in fields])
+                lookups.append([idx for idx, _ in fields])
+    if settings.LINK_VALIDATION_CACHE_READ_LEGACY_KEYS:
+        pipe.mget([LEGACY_CACHE_PREFIX + url for url in urls])
+    responses = await pipe.execute()
+
+    statuses = [None] * len(urls)
+    for indices, entries in zip(lookups, responses):
+        for idx, entry in zip(indices, entries):
+            if statuses[idx] is None:
+                statuses[idx] = _parse_entry(entry, now)
+
+    if settings.LINK_VALIDATION_CACHE_READ_LEGACY_KEYS:
+        for idx, legacy_status in enumerate(responses[-1]):
+            if statuses[idx] is None and legacy_status is not None:
+                statuses[idx] = int(legacy_status)
+
+    return statuses
+
+
+async def cache_statuses(statuses: dict[str, int]) -> None:
+    """
+    Cache the given statuses, each for its configured expiry.
+
+    :param statuses: the statuses to cache, keyed by URL
+    """
+
+    if not statuses:
+        return
+
+    now = int(time.time())
+    expiry_configuration = settings.LINK_VALIDATION_CACHE_EXPIRY_CONFIGURATION
+
+    buckets = defaultdict(dict)
+    bucket_expiries = {}
+    for url, status in statuses.items():
+        digest = _digest(url)
+        expiry = expiry_configuration[status]
+        generation = now // expiry
+        key = _bucket_key(digest, expiry, generation)
+        buckets[key][digest] = f"{status}:{now + expiry}"
+        bucket_expiries[key] = (generation + 2) * expiry
+
+    pipe = async_redis.get_async_redis_connection("default").pipeline()
+    for key, entries in buckets.items():
+        pipe.hset(key, mapping=entries)
+        pipe.expireat(key, bucket_expiries[key])
+    await pipe.execute()
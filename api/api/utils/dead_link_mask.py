@@ -1,9 +1,12 @@
-import django_redis
+import hashlib
+import json
+
 import structlog
-from deepdiff import DeepHash
-from elasticsearch_dsl import Search
+from elasticsearch_dsl import AsyncSearch, Search
 from redis.exceptions import ConnectionError
 
+from api.utils import async_redis
+
 
 logger = structlog.get_logger(__name__)
 
@@ -12,55 +15,135 @@ logger = structlog.get_logger(__name__)
 DEAD_LINK_MASK_TTL = 60 * 60 * 3
 
 
-def get_query_hash(s: Search) -> str:
+def get_query_hash(s: Search | AsyncSearch) -> str:
     """
     Hash the search query using a deterministic algorithm.
 
-    Generates a deterministic Murmur3 or SHA256 hash from the serialized Search
-    object using DeepHash so that two Search objects with the same content will
-    produce the same hash.
+    Serializes the Search object to canonical JSON, with sorted keys and
+    without the pagination, and hashes it with BLAKE2 so that two Search
+    objects with the same content will produce the same hash.
+
+    The hash is memoized on the Search object. Search methods return modified
+    clones, so the memoized hash cannot go stale through them.
 
     :param s: Search object to be serialized and hashed.
     :return: Serialized Search object hash.
     """
+    if (query_hash := getattr(s, "_query_hash", None)) is not None:
+        return query_hash
+
     serialized_search_obj = s.to_dict()
     serialized_search_obj.pop("from", None)
     serialized_search_obj.pop("size", None)
-    deep_hash = DeepHash(serialized_search_obj)[serialized_search_obj]
-    return deep_hash
+    canonical_json = json.dumps(
+        serialized_search_obj, sort_keys=True, separators=(",", ":"), default=str
+    )
+    query_hash = hashlib.blake2b(canonical_json.encode(), digest_size=16).hexdigest()
+    s._query_hash = query_hash
+    return query_hash
+
 
+class QueryMask:
+    """
+    Liveness of the results of a query, packed into a bitmap.
 
-def get_query_mask(query_hash: str) -> list[int]:
+    Bit ``i`` is set if the ``i``-th result of the query is live. Bits are
+    ordered the way Redis orders them, most significant bit of the first byte
+    first, and the bitmap is padded with unset bits to a whole number of bytes.
+    """
+
+    def __init__(self, bitmap: bytes = b"", size: int = 0):
+        self.bitmap = bitmap
+        self.size = size
+        self.live_count = int.from_bytes(bitmap, "big").bit_count()
+
+    @classmethod
+    def from_list(cls, mask: list[int]) -> "QueryMask":
+        """
+        Pack a mask given as a list of integers (0 or 1) into a bitmap.
+
+        :param mask: Boolean mask as a list of integers (0 or 1).
+        :return: the packed mask
+        """
+
+        size = len(mask)
+        bits = int("".join(map(str, mask)) or "0", 2) << (-size % 8)
+        return cls(bits.to_bytes((size + 7) // 8, "big"), size)
+
+    def to_list(self) -> list[int]:
+        """Unpack the mask into a list of integers (0 or 1)."""
+
+        if not self.size:
+            return []
+        bits = int.from_bytes(self.bitmap, "big") >> (-self.size % 8)
+        return list(map(int, format(bits, f"0{self.size}b")))
+
+    def live_position(self, n: int) -> int:
+        """
+        Find the index of the ``n``-th live result, counting from 1.
+
+        :param n: the number of live results to skip to, at least 1
+        :return: the index of the ``n``-th live result in the query results
+        :raise ValueError: if the mask has fewer than ``n`` live results
+        """
+
+        remaining = n
+        for byte_idx, byte in enumerate(self.bitmap):
+            if (count := byte.bit_count()) < remaining:
+                remaining -= count
+                continue
+            for bit_idx in range(8):
+                if byte & (0x80 >> bit_idx):
+                    remaining -= 1
+                    if not remaining:
+                        return byte_idx * 8 + bit_idx
+        raise ValueError(f"Query mask has fewer than {n} live results.")
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def _mask_keys(query_hash: str) -> tuple[str, str]:
+    return f"{query_hash}:dead_link_mask", f"{query_hash}:dead_link_mask_size"
+
+
+async def get_query_mask(query_hash: str) -> QueryMask:
     """
     Fetch an existing query mask for a given query hash or returns an empty one.
 
     :param query_hash: Unique value for a particular query.
-    :return: Boolean mask as a list of integers (0 or 1).
+    :return: the query mask, empty if none is cached
     """
-    redis = django_redis.get_redis_connection("default")
-    key = f"{query_hash}:dead_link_mask"
+    redis = async_redis.get_async_redis_connection("default")
     try:
-        return list(map(int, redis.lrange(key, 0, -1)))
+        bitmap, size = await redis.mget(*_mask_keys(query_hash))
     except ConnectionError:
         logger.warning("Redis connect failed, cannot get cached query mask.")
-        return []
+        return QueryMask()
 
+    if bitmap is None or size is None:
+        return QueryMask()
+    return QueryMask(bitmap, int(size))
 
-def save_query_mask(query_hash: str, mask: list):
+
+async def save_query_mask(query_hash: str, mask: list[int]):
     """
     Save a query mask to redis.
 
+    The mask is stored as a bitmap next to its length, which cannot be derived
+    from the bitmap because of the padding.
+
     :param mask: Boolean mask as a list of integers (0 or 1).
     :param query_hash: Unique value to be used as key.
     """
-    redis_pipe = django_redis.get_redis_connection("default").pipeline()
-    key = f"{query_hash}:dead_link_mask"
+    redis_pipe = async_redis.get_async_redis_connection("default").pipeline()
+    bitmap_key, size_key = _mask_keys(query_hash)
+    query_mask = QueryMask.from_list(mask)
 
-    redis_pipe.delete(key)
-    redis_pipe.rpush(key, *mask)
-    redis_pipe.expire(key, DEAD_LINK_MASK_TTL)
+    redis_pipe.set(bitmap_key, query_mask.bitmap, ex=DEAD_LINK_MASK_TTL)
+    redis_pipe.set(size_key, query_mask.size, ex=DEAD_LINK_MASK_TTL)
 
     try:
-        redis_pipe.execute()
+        await redis_pipe.execute()
     except ConnectionError:
         logger.warning("Redis connect failed, cannot cache query mask.")
@@ -1,19 +1,20 @@
-from functools import wraps
+import time
 from typing import Literal
 from urllib.parse import urlparse
 
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.exceptions import UnsupportedMediaType
 
 import aiohttp
-import django_redis
 import structlog
-from asgiref.sync import sync_to_async
-from redis.client import Redis
-from redis.exceptions import ConnectionError
 
 from api.utils.aiohttp import get_aiohttp_session
+from api.utils.image_proxy.bookkeeping import (
+    FAILURE_CACHE_KEY_TEMPLATE,
+    ThumbnailBookkeeping,
+)
+from api.utils.image_proxy.cache import CachedThumbnail, thumbnail_cache
 from api.utils.image_proxy.dataclasses import MediaInfo, RequestConfig
 from api.utils.image_proxy.exception import UpstreamThumbnailException
 from api.utils.image_proxy.extension import get_image_extension
@@ -88,144 +89,134 @@ def get_request_params_for_extension(
     )
 
 
-@sync_to_async
-def _tally_response(
-    tallies_conn,
-    media_info: MediaInfo,
-    month: str,
-    domain: str,
-    status_code: int,
-):
-    """
-    Tally image proxy response.
+_UPSTREAM_TIMEOUT = aiohttp.ClientTimeout(settings.THUMBNAIL_UPSTREAM_TIMEOUT)
 
-    Pulled into a separate function to help reduce overload when skimming
-    the `get` function, which is complex enough as is.
-    """
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes
 
-    with tallies_conn.pipeline() as tallies:
-        tallies.incr(f"thumbnail_response_code:{month}:{status_code}")
-        tallies.incr(
-            f"thumbnail_response_code_by_domain:{domain}:{month}:{status_code}"
-        )
-        tallies.incr(
-            f"thumbnail_response_code_by_provider:{media_info.media_provider}:"
-            f"{month}:{status_code}"
-        )
-        try:
-            tallies.execute()
-        except ConnectionError:
-            logger.warning(
-                "Redis connect failed, thumbnail response codes not tallied."
-            )
 
+def _check_size(size: int | None) -> None:
+    if size is not None and size > settings.THUMBNAIL_MAX_SIZE_BYTES:
+        raise UpstreamThumbnailException(
+            f"Thumbnail exceeds the maximum size of "
+            f"{settings.THUMBNAIL_MAX_SIZE_BYTES} bytes."
+        )
 
-@sync_to_async
-def _tally_client_response_errors(tallies, month: str, domain: str, status: int):
-    try:
-        tallies.incr(f"thumbnail_http_error:{domain}:{month}:{status}")
-    except ConnectionError:
-        logger.warning("Redis connect failed, thumbnail HTTP errors not tallied.")
 
+async def _stream_upstream_response(
+    upstream_response: aiohttp.ClientResponse,
+    bookkeeping: ThumbnailBookkeeping,
+    month: str,
+    domain: str,
+    cache_key: str | None = None,
+):
+    """
+    Stream the body of the upstream response, releasing it when done.
 
-# thmbfail == THuMBnail FAILures; this key path will exist for every thumbnail
-# requested, so it needs to be space efficient
-FAILURE_CACHE_KEY_TEMPLATE = "thmbfail:{ident}"
+    The status and headers of the response have been sent by the time the body
+    fails, so the error cannot be reported to the client. Instead, the
+    exception is re-raised to abort the response, so that the client does not
+    mistake the partial body for a complete image.
 
+    The request is recorded in the bookkeeping once the body is complete or
+    has failed. Bodies abandoned by the client are not recorded.
 
-def _cache_repeated_failures(_get):
+    If a cache key is given, the complete body is added to the thumbnail cache
+    unless it is too large to be cached.
     """
-    Wrap ``image_proxy.get`` to cache repeated upstream failures
-    and avoid re-requesting images likely to fail.
-
-    Do this by incrementing a counter for each media identifier each time the inner request
-    fails. Before making thumbnail requests, check this counter. If it is above the configured
-    threshold, assume the request will fail again, and eagerly return a failed response without
-    sending the request upstream.
-
-    Additionally, if the request succeeds and the failure count is not 0, decrement the counter
-    to reflect the successful response, accounting for thumbnails that were temporarily flaky,
-    while still allowing them to get temporarily cached as a failure if additional requests fail
-    and push the counter over the threshold.
-    """
-
-    @wraps(_get)
-    async def do_cache(*args, **kwargs):
-        media_info: MediaInfo = args[0]
-        compressed_ident = str(media_info.media_identifier).replace("-", "")
-        redis_key = FAILURE_CACHE_KEY_TEMPLATE.format(ident=compressed_ident)
-        tallies: Redis = django_redis.get_redis_connection("tallies")
 
-        try:
-            cached_failure_count = await sync_to_async(tallies.get)(
-                redis_key,
-            )
-            cached_failure_count = (
-                int(cached_failure_count) if cached_failure_count is not None else 0
-            )
-        except ConnectionError:
-            # Ignore the connection error, treat it like it's never been cached
-            cached_failure_count = 0
-
-        if cached_failure_count > settings.THUMBNAIL_FAILURE_CACHE_TOLERANCE:
-            logger.info(
-                "%s thumbnail is too flaky, using cached failure response.",
-                media_info.media_identifier,
+    received = 0
+    chunks = []
+    try:
+        async for chunk in upstream_response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            received += len(chunk)
+            _check_size(received)
+            if cache_key and received <= settings.THUMBNAIL_CACHE_MAX_ENTRY_BYTES:
+                chunks.append(chunk)
+            yield chunk
+
+        if cache_key and received <= settings.THUMBNAIL_CACHE_MAX_ENTRY_BYTES:
+            await thumbnail_cache.set(
+                cache_key,
+                CachedThumbnail(
+                    content=b"".join(chunks),
+                    content_type=upstream_response.headers.get("Content-Type"),
+                    etag=upstream_response.headers.get("ETag"),
+                    last_modified=upstream_response.headers.get("Last-Modified"),
+                    fetched_at=time.time(),
+                ),
             )
-            raise UpstreamThumbnailException("Thumbnail unavailable from provider.")
-
-        try:
-            response = await _get(*args, **kwargs)
-            if cached_failure_count > 0:
-                # Decrement the key
-                # Do not delete it, because if it isn't 0, then it has failed before
-                # meaning we should continue to monitor it within the cache window
-                # in case the upstream is flaky and eventually goes over the tolerance
-                try:
-                    await sync_to_async(tallies.decr)(redis_key)
-                    await sync_to_async(tallies.expire)(
-                        redis_key, settings.THUMBNAIL_FAILURE_CACHE_WINDOW_SECONDS
-                    )
-                except ConnectionError:
-                    logger.warning(
-                        "Redis connect failed, thumbnail failure not decremented."
-                    )
-            return response
-        except:
-            try:
-                await sync_to_async(tallies.incr)(redis_key)
-                # Call expire each time the key is incremented
-                # This pushes expiration out each time a new failure is cached
-                await sync_to_async(tallies.expire)(
-                    redis_key, settings.THUMBNAIL_FAILURE_CACHE_WINDOW_SECONDS
-                )
-            except ConnectionError:
-                logger.warning(
-                    "Redis connect failed, thumbnail failure not incremented."
-                )
-            raise
-
-    return do_cache
+    except Exception as exc:
+        exception_name = f"{exc.__class__.__module__}.{exc.__class__.__name__}"
+        bookkeeping.tally(f"thumbnail_error:{exception_name}:{domain}:{month}")
+        logger.warning(
+            "thumbnail_stream_failure",
+            url=str(upstream_response.url),
+            received=received,
+            provider=bookkeeping.media_info.media_provider,
+            exc=exc,
+        )
+        await bookkeeping.record(succeeded=False)
+        raise
+    finally:
+        upstream_response.release()
 
+    await bookkeeping.record(succeeded=True)
 
-_UPSTREAM_TIMEOUT = aiohttp.ClientTimeout(settings.THUMBNAIL_UPSTREAM_TIMEOUT)
 
-
-@_cache_repeated_failures
 async def get(
     media_info: MediaInfo,
     request_config: RequestConfig = RequestConfig(),
-) -> HttpResponse:
+    is_prewarm: bool = False,
+) -> StreamingHttpResponse | HttpResponse:
     """
     Retrieve the proxied image.
 
     Proxy an image through Photon if its file type is supported, else return the
     original image if the file type is SVG. Otherwise, raise an exception.
+
+    The image is streamed to the client as it is received from upstream. Images
+    larger than ``THUMBNAIL_MAX_SIZE_BYTES`` are rejected if upstream declares
+    their size without a content encoding, and aborted once the limit is
+    reached otherwise.
+
+    If the thumbnail cache is enabled, fresh cached thumbnails are served
+    without contacting upstream, and stale ones are revalidated upstream.
+
+    Thumbnails that repeatedly fail upstream are not requested again for a
+    while, see ``ThumbnailBookkeeping``. Pre-warming requests, marked by
+    ``is_prewarm``, are not recorded there.
     """
+
+    cache_key = cached = None
+    if thumbnail_cache.is_enabled:
+        cache_key = thumbnail_cache.get_key(media_info, request_config)
+        cached = await thumbnail_cache.get(cache_key)
+        if cached is not None and cached.is_fresh:
+            return cached.to_response()
+
+    bookkeeping = ThumbnailBookkeeping(media_info, is_prewarm)
+    await bookkeeping.check_failures()
+
+    try:
+        # Successful requests are recorded by ``_get_upstream``, after their
+        # body is streamed.
+        return await _get_upstream(
+            media_info, request_config, bookkeeping, cache_key, cached
+        )
+    except Exception:
+        await bookkeeping.record(succeeded=False)
+        raise
+
+
+async def _get_upstream(
+    media_info: MediaInfo,
+    request_config: RequestConfig,
+    bookkeeping: ThumbnailBookkeeping,
+    cache_key: str | None,
+    cached: CachedThumbnail | None,
+) -> StreamingHttpResponse | HttpResponse:
     image_url = media_info.image_url
 
-    tallies = django_redis.get_redis_connection("tallies")
-    tallies_incr = sync_to_async(tallies.incr)
     month = get_monthly_timestamp()
 
     image_extension = await get_image_extension(media_info)
@@ -242,11 +233,15 @@ async def get(
         parsed_image_url,
         request_config,
     )
+    if cached is not None:
+        headers |= cached.revalidation_headers()
 
     try:
         session = await get_aiohttp_session()
 
-        async with session.get(
+        # Not used as a context manager, because the response must stay open
+        # while it is streamed. It is released by ``_stream_upstream_response``.
+        upstream_response = await session.get(
             upstream_url,
             timeout=_UPSTREAM_TIMEOUT,
             params=params,
@@ -259,35 +254,51 @@ async def get(
                     "image_extension": image_extension,
                 },
             },
-        ) as upstream_response:
-            await _tally_response(
-                tallies, media_info, month, domain, upstream_response.status
-            )
-
-            upstream_response.raise_for_status()
+        )
+        try:
+            bookkeeping.tally_response(month, domain, upstream_response.status)
 
-            status_code = upstream_response.status
-            content_type = upstream_response.headers.get("Content-Type")
+            if cached is not None and upstream_response.status == 304:
+                # The cached thumbnail is still current.
+                upstream_response.release()
+                cached = cached.revalidated()
+                await thumbnail_cache.set(cache_key, cached)
+                await bookkeeping.record(succeeded=True)
+                return cached.to_response()
 
-            content = await upstream_response.content.read()
+            upstream_response.raise_for_status()
+            # The body is decompressed as it is read, so the declared length of
+            # an encoded body is not the length served to the client. Its size
+            # is only checked while it is streamed.
+            content_length = (
+                None
+                if "Content-Encoding" in upstream_response.headers
+                else upstream_response.content_length
+            )
+            _check_size(content_length)
+        except Exception:
+            upstream_response.release()
+            raise
 
-        return HttpResponse(
-            content,
-            status=status_code,
-            content_type=content_type,
+        if upstream_response.status != 200:
+            cache_key = None
+        response = StreamingHttpResponse(
+            _stream_upstream_response(
+                upstream_response, bookkeeping, month, domain, cache_key
+            ),
+            status=upstream_response.status,
+            content_type=upstream_response.headers.get("Content-Type"),
         )
+        if content_length is not None:
+            response["Content-Length"] = content_length
+        return response
     except Exception as exc:
         exception_name = f"{exc.__class__.__module__}.{exc.__class__.__name__}"
-        key = f"thumbnail_error:{exception_name}:{domain}:{month}"
-
-        try:
-            await tallies_incr(key)
-        except ConnectionError:
-            logger.warning("Redis connect failed, thumbnail errors not tallied.")
+        bookkeeping.tally(f"thumbnail_error:{exception_name}:{domain}:{month}")
 
         if isinstance(exc, aiohttp.ClientResponseError):
             status = exc.status
-            await _tally_client_response_errors(tallies, month, domain, status)
+            bookkeeping.tally(f"thumbnail_http_error:{domain}:{month}:{status}")
             logger.warning(
                 "thumbnail_upstream_failure",
                 url=upstream_url,
@@ -0,0 +1,134 @@
+from collections import Counter
+
+from django.conf import settings
+
+import structlog
+from redis.exceptions import ConnectionError
+
+from api.utils import async_redis
+from api.utils.image_proxy.dataclasses import MediaInfo
+from api.utils.image_proxy.exception import UpstreamThumbnailException
+from api.utils.tallies import tally_buffer
+
+
+logger = structlog.get_logger(__name__)
+
+
+# thmbfail == THuMBnail FAILures; this key path will exist for every thumbnail
+# requested, so it needs to be space efficient
+FAILURE_CACHE_KEY_TEMPLATE = "thmbfail:{ident}"
+
+
+class ThumbnailBookkeeping:
+    """
+    Track the upstream failures of a thumbnail and tally its responses.
+
+    Cache repeated upstream failures to avoid re-requesting images likely to
+    fail. Do this by incrementing a counter for each media identifier each time
+    the upstream request fails. Before making thumbnail requests, check this
+    counter with ``check_failures``. If it is above the configured threshold,
+    assume the request will fail again, and eagerly fail without sending the
+    request upstream.
+
+    Additionally, if the request succeeds and the failure count is not 0,
+    decrement the counter to reflect the successful response, accounting for
+    thumbnails that were temporarily flaky, while still allowing them to get
+    temporarily cached as a failure if additional requests fail and push the
+    counter over the threshold.
+
+    Tallies are collected during the request and, unless the tally buffer
+    takes them, written by ``record`` in the same transaction as the failure
+    counter. A thumbnail request thus makes two round trips to Redis: one to
+    read the failure counter and one to update it.
+
+    Pre-warming requests read the failure counter, but do not record anything,
+    so that they neither count as failures of the thumbnail nor inflate the
+    tallies of thumbnails requested by clients.
+    """
+
+    def __init__(self, media_info: MediaInfo, is_prewarm: bool = False):
+        self.media_info = media_info
+        self.is_prewarm = is_prewarm
+        compressed_ident = str(media_info.media_identifier).replace("-", "")
+        self.failure_key = FAILURE_CACHE_KEY_TEMPLATE.format(ident=compressed_ident)
+        self.failure_count = 0
+        self.tallies: Counter[str] = Counter()
+
+    async def check_failures(self) -> None:
+        """
+        Read the failure counter of the thumbnail.
+
+        :raises UpstreamThumbnailException: if the thumbnail failed too often
+        """
+
+        redis = async_redis.get_async_redis_connection("tallies")
+        try:
+            failure_count = await redis.get(self.failure_key)
+            self.failure_count = int(failure_count) if failure_count else 0
+        except ConnectionError:
+            # Ignore the connection error, treat it like it's never been cached
+            self.failure_count = 0
+
+        if self.failure_count > settings.THUMBNAIL_FAILURE_CACHE_TOLERANCE:
+            logger.info(
+                "%s thumbnail is too flaky, using cached failure response.",
+                self.media_info.media_identifier,
+            )
+            raise UpstreamThumbnailException("Thumbnail unavailable from provider.")
+
+    def tally(self, key: str) -> None:
+        self.tallies[key] += 1
+
+    def tally_response(self, month: str, domain: str, status_code: int) -> None:
+        provider = self.media_info.media_provider
+        self.tally(f"thumbnail_response_code:{month}:{status_code}")
+        self.tally(f"thumbnail_response_code_by_domain:{domain}:{month}:{status_code}")
+        self.tally(
+            f"thumbnail_response_code_by_provider:{provider}:{month}:{status_code}"
+        )
+
+    async def record(self, succeeded: bool) -> None:
+        """
+        Update the failure counter and write the tallies of the request.
+
+        :param succeeded: whether the upstream request succeeded
+        """
+
+        if self.is_prewarm:
+            return
+
+        tallies = dict(self.tallies)
+        if tallies and tally_buffer.is_buffering:
+            tally_buffer.add(tallies)
+            tallies = {}
+
+        # Do not delete the counter after a success, because if it isn't 0, the
+        # thumbnail has failed before, meaning we should continue to monitor it
+        # within the cache window in case the upstream is flaky and eventually
+        # goes over the tolerance.
+        if not succeeded:
+            failure_increment = 1
+        elif self.failure_count > 0:
+            failure_increment = -1
+        else:
+            failure_increment = 0
+
+        if not (tallies or failure_increment):
+            return
+
+        redis = async_redis.get_async_redis_connection("tallies")
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                if failure_increment:
+                    pipe.incrby(self.failure_key, failure_increment)
+                    # Expire each time the counter changes, which pushes the
+                    # expiration out each time a new failure is cached.
+                    pipe.expire(
+                        self.failure_key,
+                        settings.THUMBNAIL_FAILURE_CACHE_WINDOW_SECONDS,
+                    )
+                for key, amount in tallies.items():
+                    pipe.incrby(key, amount)
+                await pipe.execute()
+        except ConnectionError:
+            logger.warning("Redis connect failed, thumbnail bookkeeping not recorded.")
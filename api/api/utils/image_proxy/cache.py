@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+
+import structlog
+from asgiref.sync import sync_to_async
+
+from api.utils.image_proxy.dataclasses import MediaInfo, RequestConfig
+
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class CachedThumbnail:
+    content: bytes
+    content_type: str | None
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() - self.fetched_at < settings.THUMBNAIL_CACHE_TTL_SECONDS
+
+    def revalidation_headers(self) -> dict[str, str]:
+        """Get the headers to make the upstream request conditional."""
+
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def revalidated(self) -> "CachedThumbnail":
+        return replace(self, fetched_at=time.time())
+
+    def to_response(self) -> HttpResponse:
+        return HttpResponse(self.content, content_type=self.content_type)
+
+
+class _MemoryTier:
+    def __init__(self):
+        self._entries: OrderedDict[str, CachedThumbnail] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CachedThumbnail | None:
+        with self._lock:
+            if (entry := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CachedThumbnail) -> None:
+        with self._lock:
+            if (previous := self._entries.pop(key, None)) is not None:
+                self._size -= len(previous.content)
+            self._entries[key] = entry
+            self._size += len(entry.content)
+            while self._size > settings.THUMBNAIL_CACHE_MEMORY_BYTES:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.content)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class _DiskTier:
+    """
+    Thumbnails stored as files, evicted by least recent use once too large.
+
+    Each file holds a line of JSON metadata followed by the image. The
+    modification time of the files records their last use, so that processes
+    sharing the directory evict in a similar order. Each process only tracks
+    the files that existed when it started or that it wrote itself.
+    """
+
+    def __init__(self):
+        self._index: OrderedDict[str, int] | None = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def _directory(self) -> Path:
+        return Path(settings.THUMBNAIL_CACHE_DIR)
+
+    def _load_index(self) -> OrderedDict[str, int]:
+        if self._index is None:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            stats = [
+                (path.name, path.stat())
+                for path in self._directory.glob("*.thumb")
+                if path.is_file()
+            ]
+            stats.sort(key=lambda item: item[1].st_mtime)
+            self._index = OrderedDict((name, stat.st_size) for name, stat in stats)
+            self._size = sum(self._index.values())
+        return self._index
+
+    def get(self, key: str) -> CachedThumbnail | None:
+        name = f"{key}.thumb"
+        path = self._directory / name
+        with self._lock:
+            index = self._load_index()
+            try:
+                with path.open("rb") as file:
+                    metadata = json.loads(file.readline())
+                    content = file.read()
+                os.utime(path)
+            except FileNotFoundError:
+                # Evicted by another process.
+                if (size := index.pop(name, None)) is not None:
+                    self._size -= size
+                return None
+            except (OSError, ValueError) as exc:
+                logger.warning("Could not read cached thumbnail", path=path, exc=exc)
+                return None
+
+            if name in index:
+                index.move_to_end(name)
+        return CachedThumbnail(content=content, **metadata)
+
+    def set(self, key: str, entry: CachedThumbnail) -> None:
+        name = f"{key}.thumb"
+        path = self._directory / name
+        metadata = asdict(entry)
+        del metadata["content"]
+        data = json.dumps(metadata).encode() + b"\n" + entry.content
+
+        with self._lock:
+            index = self._load_index()
+            # Written to a temporary file first, so that readers never see a
+            # partially written file.
+            temporary_path = path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                temporary_path.write_bytes(data)
+                os.replace(temporary_path, path)
+            except OSError as exc:
+                logger.warning("Could not cache thumbnail", path=path, exc=exc)
+                return
+
+            self._size += len(data) - index.pop(name, 0)
+            index[name] = len(data)
+            while self._size > settings.THUMBNAIL_CACHE_DISK_BYTES and index:
+                evicted_name, evicted_size = index.popitem(last=False)
+                self._size -= evicted_size
+                (self._directory / evicted_name).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index = None
+            self._size = 0
+
+
+class ThumbnailCache:
+    """
+    A per-process cache of thumbnails, in memory and optionally on disk.
+
+    Entries are fresh for ``THUMBNAIL_CACHE_TTL_SECONDS``. Stale entries are
+    kept, so that they can be revalidated upstream with their ``ETag`` and
+    ``Last-Modified`` headers instead of being downloaded again.
+    """
+
+    def __init__(self):
+        self._memory = _MemoryTier()
+        self._disk = _DiskTier()
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._is_memory_enabled or self._is_disk_enabled
+
+    @property
+    def _is_memory_enabled(self) -> bool:
+        return settings.THUMBNAIL_CACHE_MEMORY_BYTES > 0
+
+    @property
+    def _is_disk_enabled(self) -> bool:
+        return bool(settings.THUMBNAIL_CACHE_DIR)
+
+    @staticmethod
+    def get_key(media_info: MediaInfo, request_config: RequestConfig) -> str:
+        key = json.dumps(
+            [str(media_info.media_identifier), media_info.image_url]
+            + list(asdict(request_config).values())
+        )
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    async def get(self, key: str) -> CachedThumbnail | None:
+        if self._is_memory_enabled and (entry := self._memory.get(key)):
+            return entry
+
+        if self._is_disk_enabled:
+            entry = await sync_to_async(self._disk.get, thread_sensitive=False)(key)
+            if entry is not None and self._is_memory_enabled:
+                self._memory.set(key, entry)
+            return entry
+
+        return None
+
+    async def set(self, key: str, entry: CachedThumbnail) -> None:
+        if len(entry.content) > settings.THUMBNAIL_CACHE_MAX_ENTRY_BYTES:
+            return
+
+        if self._is_memory_enabled:
+            self._memory.set(key, entry)
+        if self._is_disk_enabled:
+            await sync_to_async(self._disk.set, thread_sensitive=False)(key, entry)
+
+    def clear(self) -> None:
+        """Forget the entries of this process, leaving files on disk in place."""
+
+        self._memory.clear()
+        self._disk.clear()
+
+
+thumbnail_cache = ThumbnailCache()
@@ -8,6 +8,8 @@ class MediaInfo:
     media_identifier: UUID
     image_url: str
     width: int | None = None
+    # The extension of the image file, if known from the catalog.
+    filetype: str | None = None
 
 
 @dataclass
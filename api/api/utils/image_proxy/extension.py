@@ -6,11 +6,10 @@ from urllib.parse import urlparse
 from django.conf import settings
 
 import aiohttp
-import django_redis
 import structlog
-from asgiref.sync import sync_to_async
 from redis.exceptions import ConnectionError
 
+from api.utils import async_redis
 from api.utils.aiohttp import get_aiohttp_session
 from api.utils.image_proxy.dataclasses import MediaInfo
 from api.utils.image_proxy.exception import UpstreamThumbnailException
@@ -44,15 +43,17 @@ _NON_ACTIONABLE_NETWORK_EXCEPTIONS = (
 async def get_image_extension(media_info: MediaInfo) -> str | None:
     image_url = media_info.image_url
 
-    cache = django_redis.get_redis_connection("default")
+    cache = async_redis.get_async_redis_connection("default")
     key = f"media:{media_info.media_identifier}:thumb_type"
 
-    ext = _get_file_extension_from_url(image_url)
+    # The file type from the catalog, or from ``backfillimagefiletypes``, saves
+    # the lookups below for images whose URL has no extension.
+    ext = _get_file_extension_from_url(image_url) or media_info.filetype
 
     if not ext:
         # If the extension is not present in the URL, try to get it from the redis cache
         try:
-            ext = await sync_to_async(cache.get)(key)
+            ext = await cache.get(key)
             ext = ext.decode("utf-8") if ext else None
         except ConnectionError:
             logger.warning("Redis connect failed, cannot get cached image extension.")
@@ -101,10 +102,9 @@ async def get_image_extension(media_info: MediaInfo) -> str | None:
     return ext
 
 
-@sync_to_async
-def _cache_extension(cache, key, ext):
+async def _cache_extension(cache, key, ext):
     try:
-        cache.set(key, ext if ext else "unknown")
+        await cache.set(key, ext if ext else "unknown")
     except ConnectionError:
         logger.warning("Redis connect failed, cannot cache image extension.")
 
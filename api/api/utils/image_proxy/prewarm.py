@@ -0,0 +1,119 @@
+import asyncio
+import contextvars
+import weakref
+from collections.abc import Iterable
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+import structlog
+from django_asgi_lifespan.signals import asgi_shutdown
+
+from api.utils import image_proxy
+from api.utils.image_proxy.dataclasses import MediaInfo, RequestConfig
+
+
+logger = structlog.get_logger(__name__)
+
+
+class ThumbnailPrewarmer:
+    """
+    Request the thumbnails of search results before the client does.
+
+    The thumbnails are queued and requested through ``image_proxy.get`` by a
+    few background tasks per event loop, which warms the image extension cache,
+    the upstream proxy and, if enabled, the thumbnail cache. Pre-warming does
+    not count towards the failure counters or the response tallies.
+    The queue is bounded, and thumbnails that do not fit are not pre-warmed.
+    """
+
+    def __init__(self):
+        self._queues: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Queue[MediaInfo]
+        ] = weakref.WeakKeyDictionary()
+        self._workers: set[asyncio.Task] = set()
+
+    @property
+    def is_enabled(self) -> bool:
+        return settings.THUMBNAIL_PREWARM_COUNT > 0
+
+    def schedule(self, media_infos: Iterable[MediaInfo]) -> None:
+        """
+        Queue the first ``THUMBNAIL_PREWARM_COUNT`` thumbnails for pre-warming.
+
+        :param media_infos: the thumbnails, in the order of the search results
+        """
+
+        queue = self._get_queue()
+        for media_info in islice(media_infos, settings.THUMBNAIL_PREWARM_COUNT):
+            try:
+                queue.put_nowait(media_info)
+            except asyncio.QueueFull:
+                logger.info("Thumbnail pre-warming queue full, skipping thumbnails.")
+                return
+
+    async def join(self) -> None:
+        """Wait for the queued thumbnails of the current event loop."""
+
+        await self._get_queue().join()
+
+    async def close(self) -> None:
+        """Stop the background tasks of the current event loop."""
+
+        loop = asyncio.get_running_loop()
+        workers = [worker for worker in self._workers if worker.get_loop() is loop]
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._queues.pop(loop, None)
+
+    def _get_queue(self) -> asyncio.Queue[MediaInfo]:
+        loop = asyncio.get_running_loop()
+        if (queue := self._queues.get(loop)) is None:
+            queue = asyncio.Queue(maxsize=settings.THUMBNAIL_PREWARM_QUEUE_SIZE)
+            self._queues[loop] = queue
+            for _ in range(settings.THUMBNAIL_PREWARM_CONCURRENCY):
+                # The workers get an empty context, as they outlive the request
+                # that starts them and must not record their timings or logs.
+                worker = loop.create_task(
+                    self._work(queue), context=contextvars.Context()
+                )
+                self._workers.add(worker)
+                worker.add_done_callback(self._workers.discard)
+        return queue
+
+    async def _work(self, queue: asyncio.Queue[MediaInfo]) -> None:
+        request_config = RequestConfig(
+            accept_header=settings.THUMBNAIL_PREWARM_ACCEPT_HEADER
+        )
+        while True:
+            media_info = await queue.get()
+            try:
+                response = await image_proxy.get(
+                    media_info, request_config, is_prewarm=True
+                )
+                if isinstance(response, StreamingHttpResponse):
+                    # Read the body, so that it is cached and the upstream
+                    # response is released.
+                    async for _ in response.streaming_content:
+                        pass
+            except Exception as exc:
+                # The client will request the thumbnail anyway, which records
+                # the failure.
+                logger.debug(
+                    "thumbnail_prewarm_failure",
+                    identifier=media_info.media_identifier,
+                    exc=exc,
+                )
+            finally:
+                queue.task_done()
+
+
+thumbnail_prewarmer = ThumbnailPrewarmer()
+
+
+@asgi_shutdown.connect
+async def _cancel_thumbnail_prewarming(sender, **kwargs):
+    logger.debug("Cancelling thumbnail pre-warming on application shutdown")
+    await thumbnail_prewarmer.close()
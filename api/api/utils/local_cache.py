@@ -0,0 +1,139 @@
+import threading
+import time
+from typing import Any
+
+from django.conf import settings
+
+import django_redis
+import structlog
+from redis.exceptions import ConnectionError, TimeoutError
+
+
+logger = structlog.get_logger(__name__)
+
+
+INVALIDATION_CHANNEL = "local_cache_invalidation"
+LISTENER_RETRY_SECONDS = 5
+
+_CACHES: dict[str, "LocalCache"] = {}
+
+_listener: threading.Thread | None = None
+_listener_lock = threading.Lock()
+
+
+class LocalCache:
+    """
+    A per-process cache for values that rarely change, kept in front of Redis.
+
+    Entries expire after ``LOCAL_CACHE_TIMEOUT`` seconds. Additionally, all
+    entries of a cache are dropped in every process of every API server when
+    an invalidation for the cache is published with ``publish_invalidation``.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._entries: dict[str, tuple[float, Any]] = {}
+        _CACHES[name] = self
+
+    def get(self, key: str) -> Any | None:
+        """
+        Get the value for the given key.
+
+        :param key: the key to look up
+        :return: the cached value, or ``None`` if absent or expired
+        """
+
+        _start_listener()
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.time():
+            self._entries.pop(key, None)
+            return None
+
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        if settings.LOCAL_CACHE_TIMEOUT <= 0:
+            return
+
+        self._entries[key] = (time.time() + settings.LOCAL_CACHE_TIMEOUT, value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def clear_local_caches() -> None:
+    """Drop all entries of all local caches in this process."""
+
+    for local_cache in _CACHES.values():
+        local_cache.clear()
+
+
+def publish_invalidation(name: str) -> None:
+    """
+    Drop all entries of the named local cache in every process.
+
+    The cache of the current process is cleared immediately, so that the
+    change is visible to it even if Redis cannot be reached.
+
+    :param name: the name of the local cache to invalidate
+    """
+
+    if local_cache := _CACHES.get(name):
+        local_cache.clear()
+
+    redis = django_redis.get_redis_connection("default")
+    try:
+        redis.publish(INVALIDATION_CHANNEL, name)
+    except ConnectionError:
+        logger.warning("Redis connect failed, cannot publish local cache invalidation.")
+
+
+def _handle_invalidation(message: dict) -> None:
+    name = message["data"]
+    if isinstance(name, bytes):
+        name = name.decode("utf-8")
+
+    if local_cache := _CACHES.get(name):
+        logger.info("Invalidating local cache", name=name)
+        local_cache.clear()
+
+
+def _listen() -> None:
+    while True:
+        try:
+            redis = django_redis.get_redis_connection("default")
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Invalidations may have been missed while not subscribed.
+            clear_local_caches()
+            for message in pubsub.listen():
+                _handle_invalidation(message)
+        except (ConnectionError, TimeoutError):
+            logger.warning(
+                "Redis connect failed, cannot listen for local cache invalidations."
+            )
+        except Exception:
+            # The listener is never restarted, so it must outlive any error.
+            logger.error("local_cache_listener_failed", exc_info=True)
+        time.sleep(LISTENER_RETRY_SECONDS)
+
+
+def _start_listener() -> None:
+    """Subscribe this process to local cache invalidations, if not yet done."""
+
+    global _listener
+
+    if _listener is not None:
+        return
+
+    with _listener_lock:
+        if _listener is None:
+            _listener = threading.Thread(
+                target=_listen, name="local_cache_invalidation", daemon=True
+            )
+            _listener.start()
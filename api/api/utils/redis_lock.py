@@ -0,0 +1,126 @@
+"""
+A lock held across workers in Redis.
+
+The lock is a key set with ``NX`` to a token of its holder, which expires after
+the lock timeout. While the locked block runs, the holder renews the expiry, so
+the lock only expires early if its holder dies. The expiry is renewed, and the
+lock released, with ``WATCH``/``MULTI`` transactions that only touch the key if
+it still holds the token, so that a holder whose lock expired does not extend
+or release the lock of the next one. Unlike ``redis.lock.Lock``, this needs no
+Lua script, which the fake Redis of the tests cannot run.
+
+Locks are advisory: if Redis is unavailable, or the lock is not acquired in
+time, the locked block runs regardless, so callers must tolerate duplicate
+work.
+"""
+
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import structlog
+from redis.exceptions import RedisError, WatchError
+
+from api.utils import async_redis
+
+
+logger = structlog.get_logger(__name__)
+
+
+POLL_INTERVAL = 0.1  # seconds
+# The fraction of the lock timeout after which its expiry is renewed.
+RENEWAL_INTERVAL = 1 / 3
+
+
+class LockHeldError(Exception):
+    """The lock is held by another holder and was not waited for."""
+
+
+async def _acquire(key: str, token: str, timeout: float, blocking: bool) -> bool:
+    redis = async_redis.get_async_redis_connection("default")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not await redis.set(key, token, nx=True, px=int(timeout * 1000)):
+        if not blocking:
+            raise LockHeldError(key)
+        if loop.time() >= deadline:
+            return False
+        await asyncio.sleep(POLL_INTERVAL)
+    return True
+
+
+async def _extend(key: str, token: str, timeout: float) -> bool:
+    redis = async_redis.get_async_redis_connection("default")
+    async with redis.pipeline(transaction=True) as pipe:
+        await pipe.watch(key)
+        if await pipe.get(key) != token.encode():
+            return False
+        pipe.multi()
+        pipe.pexpire(key, int(timeout * 1000))
+        await pipe.execute()
+    return True
+
+
+async def _renew(key: str, token: str, timeout: float) -> None:
+    while True:
+        await asyncio.sleep(timeout * RENEWAL_INTERVAL)
+        try:
+            if not await _extend(key, token, timeout):
+                # The lock expired, it must not be extended for the next holder.
+                return
+        except WatchError:
+            return
+        except RedisError as exc:
+            # The lock may expire before the next attempt.
+            logger.warning("Redis lock could not be renewed.", key=key, exc=exc)
+
+
+async def _release(key: str, token: str) -> None:
+    redis = async_redis.get_async_redis_connection("default")
+    async with redis.pipeline(transaction=True) as pipe:
+        await pipe.watch(key)
+        if await pipe.get(key) == token.encode():
+            pipe.multi()
+            pipe.delete(key)
+            await pipe.execute()
+
+
+@asynccontextmanager
+async def redis_lock(
+    key: str, timeout: float, blocking: bool = True
+) -> AsyncIterator[bool]:
+    """
+    Hold the lock with the given key for the enclosed block.
+
+    Other holders are waited for for at most ``timeout`` seconds, which is also
+    the time after which the lock expires if its holder stops renewing it.
+
+    :param key: the Redis key of the lock
+    :param timeout: the number of seconds to wait for and hold the lock
+    :param blocking: whether to wait for other holders of the lock
+    :return: whether the lock was acquired
+    :raises LockHeldError: if ``blocking`` is false and the lock is held
+    """
+
+    token = uuid.uuid4().hex
+    try:
+        acquired = await _acquire(key, token, timeout, blocking)
+    except RedisError as exc:
+        logger.warning("Redis lock could not be acquired.", key=key, exc=exc)
+        acquired = False
+
+    renewal = asyncio.create_task(_renew(key, token, timeout)) if acquired else None
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            renewal.cancel()
+            try:
+                await _release(key, token)
+            except WatchError:
+                # The lock expired and was taken by the next holder.
+                pass
+            except RedisError as exc:
+                # The lock expires by itself.
+                logger.warning("Redis lock could not be released.", key=key, exc=exc)
@@ -3,9 +3,9 @@ from typing import Self
 
 from django.conf import settings
 
-from elasticsearch_dsl import Q, Search
+from elasticsearch_dsl import AsyncSearch, Q
 
-from api.constants.media_types import OriginIndex
+from api.constants.media_types import OriginIndex, SearchIndex
 from api.controllers.elasticsearch.helpers import get_es_response
 
 
@@ -22,16 +22,35 @@ class SearchContext:
     """Subset of result identifiers for results with sensitive textual content."""
 
     @classmethod
-    def build(
-        cls, all_result_identifiers: list[str], origin_index: OriginIndex
+    async def build(
+        cls,
+        all_result_identifiers: list[str],
+        origin_index: OriginIndex,
+        searched_index: SearchIndex | None = None,
     ) -> Self:
+        """
+        Build the search context for the given results.
+
+        :param all_result_identifiers: the identifiers of the results, in order
+        :param origin_index: the origin index from which the results were drawn
+        :param searched_index: the index the results were actually retrieved
+        from, if known; used to skip the filtered index lookup where possible
+        :return: the search context for the results
+        """
+
         if not all_result_identifiers:
             return cls(list(), set())
 
         if not settings.ENABLE_FILTERED_INDEX_QUERIES:
             return cls(all_result_identifiers, set())
 
-        filtered_index_search = Search(index=f"{origin_index}-filtered")
+        if searched_index == f"{origin_index}-filtered":
+            # Every result was retrieved from the filtered index, which by
+            # definition excludes documents with sensitive text, so there is
+            # nothing to look up.
+            return cls(all_result_identifiers, set())
+
+        filtered_index_search = AsyncSearch(index=f"{origin_index}-filtered")
         filtered_index_search = filtered_index_search.query(
             # Use `identifier` rather than the document `id` due to
             # `id` instability between refreshes:
@@ -43,7 +62,7 @@ class SearchContext:
         # to change the size to be big enough to encompass all the
         # results.
         filtered_index_slice = filtered_index_search[: len(all_result_identifiers)]
-        results_in_filtered_index = get_es_response(
+        results_in_filtered_index = await get_es_response(
             filtered_index_slice, es_query="filtered_index_context"
         )
         filtered_index_identifiers = {
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+import structlog
+from elasticsearch_dsl import Q
+from redis.exceptions import ConnectionError
+
+
+logger = structlog.get_logger(__name__)
+
+
+SEARCH_RESPONSE_CACHE_VERSION = 1
+
+
+def get_cache_key(
+    media_type: str,
+    generation: str,
+    host: str,
+    validated_data: dict,
+    excluded_sources_query: Q | None = None,
+) -> str:
+    """
+    Get the key of the cached search response for the request.
+
+    :param media_type: the media type searched
+    :param generation: the concrete indexes in use, see ``get_index_generation``
+    :param host: the host of the request, which appears in the result URLs
+    :param validated_data: the validated data of the search request serializer
+    :param excluded_sources_query: the query excluding the filtered sources, so
+    that responses are not served once a source is filtered
+    :return: the cache key
+    """
+
+    excluded_sources = (
+        excluded_sources_query.to_dict() if excluded_sources_query else {}
+    )
+    canonical_json = json.dumps(
+        [validated_data, excluded_sources],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    request_hash = hashlib.blake2b(
+        f"{host}:{canonical_json}".encode(), digest_size=16
+    ).hexdigest()
+    return f"search_response:{media_type}:{generation}:{request_hash}"
+
+
+def get_response(key: str) -> tuple[dict, bool] | None:
+    """
+    Get the cached search response data.
+
+    :param key: the key of the response
+    :return: the response data and whether it is stale, or ``None`` if absent
+    """
+
+    try:
+        entry = cache.get(key=key, version=SEARCH_RESPONSE_CACHE_VERSION)
+    except ConnectionError:
+        logger.warning("Redis connect failed, cannot get cached search response.")
+        return None
+
+    if entry is None:
+        return None
+
+    fresh_until, data = entry
+    return data, fresh_until <= time.time()
+
+
+def set_response(key: str, data: dict) -> None:
+    """
+    Cache the search response data.
+
+    The response is fresh for ``SEARCH_RESPONSE_CACHE_TIMEOUT`` seconds and
+    can be served stale, while it is refreshed, for another
+    ``SEARCH_RESPONSE_CACHE_STALE_SECONDS`` seconds.
+
+    :param key: the key of the response
+    :param data: the response data
+    """
+
+    timeout = settings.SEARCH_RESPONSE_CACHE_TIMEOUT
+    # The results are copied into a plain list, as DRF's ``ReturnList`` would
+    # pickle the serializer along with them.
+    data = data | {"results": list(data["results"])}
+    try:
+        cache.set(
+            key=key,
+            version=SEARCH_RESPONSE_CACHE_VERSION,
+            timeout=timeout + settings.SEARCH_RESPONSE_CACHE_STALE_SECONDS,
+            value=(time.time() + timeout, data),
+        )
+    except ConnectionError:
+        logger.warning("Redis connect failed, cannot cache search response.")
+
+
+def claim_refresh(key: str) -> bool:
+    """
+    Claim the refresh of a stale search response, for all workers.
+
+    :param key: the key of the response
+    :return: whether the caller should refresh the response
+    """
+
+    try:
+        return cache.add(
+            key=f"{key}:refresh",
+            version=SEARCH_RESPONSE_CACHE_VERSION,
+            timeout=settings.SEARCH_RESPONSE_CACHE_TIMEOUT,
+            value=True,
+        )
+    except ConnectionError:
+        logger.warning("Redis connect failed, cannot claim search response refresh.")
+        return False
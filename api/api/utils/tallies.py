@@ -1,10 +1,16 @@
-from collections import defaultdict
+import threading
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 
+from django.conf import settings
+
 import django_redis
 import structlog
-from django_redis.client.default import Redis
-from redis.exceptions import ConnectionError
+from asgiref.sync import sync_to_async
+from django_asgi_lifespan.signals import asgi_shutdown
+from redis.exceptions import ConnectionError, RedisError
+
+from api.utils import async_redis
 
 
 logger = structlog.get_logger(__name__)
@@ -23,26 +29,145 @@ def get_monthly_timestamp() -> str:
     return now.strftime("%Y-%m")
 
 
-def count_provider_occurrences(results: list[dict], index: str) -> None:
-    # Use ``get_redis_connection`` rather than Django's caches
-    # so that we can open a pipeline rather than sending off ``n``
-    # writes and because the RedisPy client's ``incr`` method
-    # is safe by default rather than Django's handspun method which:
-    # 1. Takes two requests to execute; and
-    # 2. Raises a ``ValueError`` if the key doesn't exist rather than
-    # just initialising the key to the value like Redis's behaviour.
-    tallies: Redis = django_redis.get_redis_connection("tallies")
+class TallyBuffer:
+    """
+    Aggregate increments of tallies in memory and write them to Redis in bulk.
+
+    The buffer is flushed by a background thread every
+    ``TALLY_BUFFER_FLUSH_INTERVAL_SECONDS``, as soon as it holds
+    ``TALLY_BUFFER_MAX_KEYS`` keys, and on application shutdown. If the interval
+    is 0, increments are written to Redis immediately instead.
+    """
+
+    def __init__(self):
+        self._counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._flusher: threading.Thread | None = None
+
+    @property
+    def is_buffering(self) -> bool:
+        """Whether increments are buffered rather than written immediately."""
+
+        return settings.TALLY_BUFFER_FLUSH_INTERVAL_SECONDS > 0
+
+    def add(self, counts: dict[str, int]) -> None:
+        """
+        Increment the tallies.
+
+        :param counts: the amounts by which to increment each tally key
+        :raises ConnectionError: if Redis is unreachable and the increments are
+        written immediately
+        """
+
+        if not self.is_buffering:
+            self._write(counts)
+            return
+
+        with self._lock:
+            self._counts.update(counts)
+            is_full = len(self._counts) >= settings.TALLY_BUFFER_MAX_KEYS
+
+        self._start_flusher()
+        if is_full:
+            self._flush_requested.set()
+
+    async def aadd(self, counts: dict[str, int]) -> None:
+        """
+        Increment the tallies from the event loop.
+
+        Like ``add``, but increments written immediately go through the async
+        Redis client, so that they do not need a thread.
+
+        :param counts: the amounts by which to increment each tally key
+        :raises ConnectionError: if Redis is unreachable and the increments are
+        written immediately
+        """
+
+        if self.is_buffering:
+            self.add(counts)
+            return
+
+        pipe = async_redis.get_async_redis_connection("tallies").pipeline()
+        for key, amount in counts.items():
+            pipe.incrby(key, amount)
+        await pipe.execute()
 
+    def flush(self) -> None:
+        """Write the buffered increments to Redis."""
+
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if not counts:
+            return
+
+        try:
+            self._write(counts)
+        except Exception as exc:
+            # Keep the increments for the next flush.
+            with self._lock:
+                self._counts.update(counts)
+            if not isinstance(exc, RedisError):
+                raise
+            logger.warning("Redis connect failed, buffered tallies not flushed.")
+
+    @staticmethod
+    def _write(counts: dict[str, int]) -> None:
+        # Use ``get_redis_connection`` rather than Django's caches
+        # so that we can open a pipeline rather than sending off ``n``
+        # writes and because the RedisPy client's ``incr`` method
+        # is safe by default rather than Django's handspun method which:
+        # 1. Takes two requests to execute; and
+        # 2. Raises a ``ValueError`` if the key doesn't exist rather than
+        # just initialising the key to the value like Redis's behaviour.
+        tallies = django_redis.get_redis_connection("tallies")
+        with tallies.pipeline() as pipe:
+            for key, amount in counts.items():
+                pipe.incr(key, amount)
+            pipe.execute()
+
+    def _run(self) -> None:
+        while True:
+            self._flush_requested.wait(settings.TALLY_BUFFER_FLUSH_INTERVAL_SECONDS)
+            self._flush_requested.clear()
+            try:
+                self.flush()
+            except Exception:
+                # The flusher is never restarted, so it must outlive any error.
+                logger.error("tally_buffer_flush_failed", exc_info=True)
+
+    def _start_flusher(self) -> None:
+        if self._flusher is not None:
+            return
+
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._run, name="tally_buffer_flusher", daemon=True
+                )
+                self._flusher.start()
+
+
+tally_buffer = TallyBuffer()
+
+
+@asgi_shutdown.connect
+async def _flush_tally_buffer(sender, **kwargs):
+    logger.debug("Flushing buffered tallies on application shutdown")
+    await sync_to_async(tally_buffer.flush)()
+
+
+async def count_provider_occurrences(results: list[dict], index: str) -> None:
     provider_occurrences = defaultdict(int)
     for result in results:
         provider_occurrences[result["provider"]] += 1
 
     week = get_weekly_timestamp()
-    with tallies.pipeline() as pipe:
-        for provider, occurrences in provider_occurrences.items():
-            pipe.incr(f"provider_occurrences:{index}:{week}:{provider}", occurrences)
-            pipe.incr(f"provider_appeared_in_searches:{index}:{week}:{provider}", 1)
-        try:
-            pipe.execute()
-        except ConnectionError:
-            logger.warning("Redis connect failed, cannot increment provider tallies.")
+    counts = {}
+    for provider, occurrences in provider_occurrences.items():
+        counts[f"provider_occurrences:{index}:{week}:{provider}"] = occurrences
+        counts[f"provider_appeared_in_searches:{index}:{week}:{provider}"] = 1
+    try:
+        await tally_buffer.aadd(counts)
+    except ConnectionError:
+        logger.warning("Redis connect failed, cannot increment provider tallies.")
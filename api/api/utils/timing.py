@@ -0,0 +1,207 @@
+"""
+Per-request timing of the stages of the search pipeline.
+
+Stages are timed with ``time_stage`` and events are counted with ``count``.
+While a request is being recorded (see ``record_request``), the durations and
+counts are accumulated for the request, so that they can be sent in the
+``Server-Timing`` header of the response. At the end of the request, they are
+also added to the histograms and counters of this process, which are rendered
+in the Prometheus text format by ``render_metrics``, labelled with the route
+of the request.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+
+# Upper bounds of the duration histogram buckets, in milliseconds.
+DURATION_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# The route of requests that did not resolve to a view, e.g. of 404s.
+UNRESOLVED_ROUTE = "unresolved"
+
+
+@dataclass
+class RequestTimings:
+    """The stage durations, in milliseconds, and event counts of a request."""
+
+    route: str = UNRESOLVED_ROUTE
+
+    durations: defaultdict[str, float] = field(
+        default_factory=lambda: defaultdict(float)
+    )
+    counts: defaultdict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+
+# The timings are mutated in place, so that stages run in copies of the
+# context, e.g. through ``sync_to_async`` or in tasks, are recorded as well.
+_request_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+class Histogram:
+    """A cumulative histogram of durations, in the style of Prometheus."""
+
+    def __init__(self, buckets: tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # The last is ``+Inf``.
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+_lock = threading.Lock()
+# Keyed by the route of the request and the name of the stage or event.
+_histograms: dict[tuple[str, str], Histogram] = {}
+_counters: dict[tuple[str, str], int] = defaultdict(int)
+
+
+@contextmanager
+def time_stage(name: str) -> Iterator[None]:
+    """
+    Time the enclosed block as part of the named stage of the current request.
+
+    Durations of the same stage are summed, so a stage may be entered several
+    times per request. Outside a recorded request, this does nothing.
+
+    :param name: the name of the stage, e.g. ``"es"``
+    """
+
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[name] += (time.perf_counter() - start) * 1000
+
+
+def count(name: str, value: int = 1) -> None:
+    """
+    Count events of the current request, e.g. link validation cache hits.
+
+    :param name: the name of the event
+    :param value: the number of events
+    """
+
+    if (timings := _request_timings.get()) is not None:
+        timings.counts[name] += value
+
+
+@contextmanager
+def record_request() -> Iterator[RequestTimings]:
+    """
+    Record the stage durations and event counts of the enclosed request.
+
+    The total duration of the request is recorded as the ``total`` stage. On
+    exit, the timings are added to the metrics of this process under their
+    ``route``, which is set once the request has been resolved.
+    """
+
+    timings = RequestTimings()
+    token = _request_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        timings.durations["total"] = (time.perf_counter() - start) * 1000
+        _request_timings.reset(token)
+        _observe(timings)
+
+
+def stop_recording() -> None:
+    """
+    Stop recording timings in the current context.
+
+    Tasks copy the context they are created in, so this must be called by
+    tasks that outlive the request which started them.
+    """
+
+    _request_timings.set(None)
+
+
+def _observe(timings: RequestTimings) -> None:
+    with _lock:
+        for name, duration in timings.durations.items():
+            key = (timings.route, name)
+            if (histogram := _histograms.get(key)) is None:
+                histogram = _histograms[key] = Histogram()
+            histogram.observe(duration)
+        for name, value in timings.counts.items():
+            _counters[(timings.route, name)] += value
+
+
+def render_server_timing(timings: RequestTimings) -> str:
+    """
+    Render the timings as the value of a ``Server-Timing`` header.
+
+    Event counts are rendered as metrics without a duration, with the count as
+    the description.
+    """
+
+    metrics = [
+        f"{name};dur={duration:.1f}" for name, duration in timings.durations.items()
+    ]
+    metrics += [f'{name};desc="{value}"' for name, value in timings.counts.items()]
+    return ", ".join(metrics)
+
+
+def render_metrics() -> str:
+    """Render the metrics of this process in the Prometheus text format."""
+
+    lines = [
+        "# HELP openverse_stage_duration_milliseconds Duration of request stages.",
+        "# TYPE openverse_stage_duration_milliseconds histogram",
+    ]
+    with _lock:
+        for (route, name), histogram in sorted(_histograms.items()):
+            labels = f'route="{route}",stage="{name}"'
+            cumulative = 0
+            bounds = [str(bound) for bound in histogram.buckets] + ["+Inf"]
+            for bound, bucket_count in zip(bounds, histogram.bucket_counts):
+                cumulative += bucket_count
+                lines.append(
+                    "openverse_stage_duration_milliseconds_bucket"
+                    f'{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f"openverse_stage_duration_milliseconds_sum{{{labels}}} {histogram.sum}"
+            )
+            lines.append(
+                "openverse_stage_duration_milliseconds_count"
+                f"{{{labels}}} {histogram.count}"
+            )
+
+        lines += [
+            "# HELP openverse_stage_events_total Events counted in request stages.",
+            "# TYPE openverse_stage_events_total counter",
+        ]
+        for (route, name), value in sorted(_counters.items()):
+            lines.append(
+                "openverse_stage_events_total"
+                f'{{route="{route}",event="{name}"}} {value}'
+            )
+
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    """Drop the metrics of this process."""
+
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
@@ -1,23 +1,57 @@
-import json
+import array
+import asyncio
 import math
 import mimetypes
-import os
-import pathlib
-import shutil
-import subprocess
+import struct
+import sys
+import weakref
+from collections.abc import Awaitable, Callable
+from itertools import repeat
+from operator import truediv
 
 from django.conf import settings
 from rest_framework import status
 from rest_framework.exceptions import APIException
 
-import requests
+import aiohttp
 import structlog
 
+from api.utils.aiohttp import get_aiohttp_session
+from api.utils.redis_lock import LockHeldError, redis_lock
+
 
 logger = structlog.get_logger(__name__)
 
-TMP_DIR = pathlib.Path("/tmp").resolve()
 UA_STRING = settings.OUTBOUND_USER_AGENT_TEMPLATE.format(purpose="Waveform")
+HEADERS = {"User-Agent": UA_STRING}
+
+AUDIOWAVEFORM = "audiowaveform"
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes
+
+# The input formats of ``audiowaveform``, by file extension. When reading from
+# its standard input, ``audiowaveform`` cannot infer the format from the file.
+INPUT_FORMATS = {
+    ".mp3": "mp3",
+    ".wav": "wav",
+    ".flac": "flac",
+    ".ogg": "ogg",
+    ".oga": "ogg",
+    ".opus": "opus",
+}
+
+# The header of the binary output of ``audiowaveform``: the version, the flags,
+# the sample rate, the samples per pixel and the number of pixels. Version 2
+# adds the number of channels. All values are little-endian.
+# See https://github.com/bbc/audiowaveform/blob/master/doc/DataFormat.md
+DAT_HEADER = struct.Struct("<iIiiI")
+DAT_CHANNELS = struct.Struct("<i")
+DAT_FLAG_8_BIT = 0x1
+
+WAVEFORM_LOCK_PREFIX = "waveform_lock:"
+
+_inflight_waveforms: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, asyncio.Future]
+] = weakref.WeakKeyDictionary()
 
 
 class WaveformGenerationFailure(APIException):
@@ -26,6 +60,12 @@ class WaveformGenerationFailure(APIException):
     default_code = "waveform_generation_failure"
 
 
+class WaveformGenerationInProgress(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The waveform is being generated, try again later."
+    default_code = "waveform_generation_in_progress"
+
+
 class UpstreamWaveformException(APIException):
     status_code = status.HTTP_424_FAILED_DEPENDENCY
     default_detail = (
@@ -52,50 +92,39 @@ def ext_from_url(url):
         return None
 
 
-def download_audio(url, identifier):
+def get_input_format(url: str, mimetype: str | None) -> str:
     """
-    Download the audio from the given URL to a location on the disk.
+    Get the ``audiowaveform`` input format of the audio file.
 
-    :param url: the URL to the file being downloaded
-    :param identifier: the identifier of the media object to name the file
-    :returns: the name of the file on the disk
+    :param url: the URL to the audio file
+    :param mimetype: the content type of the audio file, if known
+    :returns: the input format
+    :raises WaveformGenerationFailure: if the format is not supported
     """
 
-    logger.debug("waveform_audio_download_start", url=url, identifier=identifier)
-
-    headers = {"User-Agent": UA_STRING}
-    try:
-        with requests.get(url, stream=True, headers=headers) as res:
-            logger.debug(f"res.status_code={res.status_code}")
-            res.raise_for_status()
-            mimetype = res.headers["content-type"]
-            logger.debug(f"mimetype={mimetype}")
-            ext = ext_from_url(url) or mimetypes.guess_extension(mimetype)
-            if ext is None:
-                raise ValueError("Could not identify media extension")
-            file_name = f"audio-{identifier}{ext}"
-            logger.debug(f"file name={file_name}")
-            with open(TMP_DIR.joinpath(file_name), "wb") as file:
-                shutil.copyfileobj(res.raw, file)
-    except (requests.RequestException, ValueError) as e:
-        logger.error("waveform_audio_download_failed", exc=e, exc_info=True)
-        if isinstance(e, requests.RequestException):
-            raise UpstreamWaveformException()
-        else:
-            raise WaveformGenerationFailure("Unknown file extension")
-
-    return file_name
+    if mimetype:
+        mimetype = mimetype.split(";")[0]
+    ext = ext_from_url(url) or (mimetype and mimetypes.guess_extension(mimetype))
+    if ext is None or (input_format := INPUT_FORMATS.get(ext.lower())) is None:
+        logger.error("waveform_unknown_extension", ext=ext, mimetype=mimetype)
+        raise WaveformGenerationFailure("Unknown file extension")
+    return input_format
 
 
-def generate_waveform(file_name: str, duration: int):
+async def generate_waveform(
+    content: aiohttp.StreamReader, input_format: str, duration: int
+) -> bytes:
     """
-    Generate the waveform for the file by invoking the ``audiowaveform`` binary.
+    Generate the waveform of the audio by invoking the ``audiowaveform`` binary.
 
-    The Python module ``subprocess`` is used to execute the binary and get the
-    results that it emits to STDOUT.
+    The audio is written to the standard input of the process as it is read,
+    so that it is neither stored on disk nor held in memory in full. The
+    waveform is read from its standard output in the binary format.
 
-    :param file_name: the name of the downloaded audio file
+    :param content: the body of the audio response
+    :param input_format: the ``audiowaveform`` input format of the audio
     :param duration: the duration of the audio to determine pixels per second
+    :returns: the binary waveform
     """
 
     logger.debug("waveform_generation_started")
@@ -111,96 +140,187 @@ def generate_waveform(file_name: str, duration: int):
     width = 1e6 if duration > 100 else 1e5
     pps = math.ceil(width / duration)  # approx 1000 points in total
     args = [
-        "audiowaveform",
         "--input-filename",
-        file_name,
+        "-",
+        "--input-format",
+        input_format,
+        "--output-filename",
+        "-",
         "--output-format",
-        "json",
+        "dat",
         "--pixels-per-second",
         str(pps),
+        "--quiet",
     ]
     logger.debug("waveform_generation_subprocess", args=args)
 
+    proc = await asyncio.create_subprocess_exec(
+        AUDIOWAVEFORM,
+        *args,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    # Both outputs are read while the audio is written, so that the process
+    # never blocks on a full pipe.
+    stdout = asyncio.create_task(proc.stdout.read())
+    stderr = asyncio.create_task(proc.stderr.read())
     try:
-        proc = subprocess.run(args, cwd=TMP_DIR, check=True, capture_output=True)
-    except subprocess.CalledProcessError as e:
+        try:
+            async for chunk in content.iter_chunked(STREAM_CHUNK_SIZE):
+                proc.stdin.write(chunk)
+                await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # The process exited early, its error is reported below.
+            pass
+        finally:
+            proc.stdin.close()
+
+        output, errors = await asyncio.gather(stdout, stderr)
+        returncode = await proc.wait()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        stdout.cancel()
+        stderr.cancel()
+
+    if returncode != 0:
+        # Do not return details of the failure; we're calling directly to a system binary, and
+        # the command output could be sensitive. Folks debugging can find details in the logs
         logger.error(
-            "waveform_generation_failed", file_name=file_name, exc=e, exc_info=True
+            "waveform_generation_failed",
+            returncode=returncode,
+            stderr=errors.decode(errors="replace"),
         )
-        # Do not return details of the exception; we're calling directly to a system binary, and
-        # the command output could be sensitive. Folks debugging can find details in the logs
         raise WaveformGenerationFailure()
 
-    logger.debug("waveform_generation_finished", returncode=proc.returncode)
-    json_out = json.loads(proc.stdout)
-    return json_out
+    logger.debug("waveform_generation_finished", returncode=returncode)
+    return output
 
 
-def process_waveform_output(json_out):
+def process_waveform_output(dat_out: bytes) -> list[float]:
     """
-    Parse the waveform output generated by the ``audiowaveform`` binary.
+    Parse the binary waveform output generated by the ``audiowaveform`` binary.
 
-    The output consists of alternating positive and negative values, that are almost
-    equal in amplitude. We discard the negative values. We also scale down the
-    amplitudes by the largest value so that they lie in the range [0, 1].
+    The output consists of pairs of minimum and maximum amplitudes, that are almost
+    equal in magnitude. We discard the minimums and, of the maximums, the negative
+    values. We also scale down the amplitudes by the largest value so that they lie
+    in the range [0, 1], and silent audio yields zeros.
 
-    :param json_out: the JSON output generated by ``audiowaveform``
+    :param dat_out: the binary output generated by ``audiowaveform``
     :returns: the list of peaks
     """
 
     logger.info("Transforming points")
 
-    data = json_out["data"]
-    logger.debug(f"initial points len(data)={len(data)}")
-
-    transformed_data = []
-    max_val = 0
-    for idx, val in enumerate(data):
-        if idx % 2 == 0:
-            continue
-        if val < 0:  # Any other odd values are negligible and can be ignored
-            val = 0
-        transformed_data.append(val)
-        if val > max_val:
-            max_val = val
-    transformed_data = [round(val / max_val, 5) for val in transformed_data]
+    version, flags, _, _, length = DAT_HEADER.unpack_from(dat_out)
+    offset = DAT_HEADER.size
+    channels = 1
+    if version == 2:
+        (channels,) = DAT_CHANNELS.unpack_from(dat_out, offset)
+        offset += DAT_CHANNELS.size
+
+    samples = array.array("b" if flags & DAT_FLAG_8_BIT else "h")
+    sample_count = 2 * channels * length
+    samples.frombytes(dat_out[offset : offset + sample_count * samples.itemsize])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    logger.debug(f"initial points len(samples)={len(samples)}")
+
+    # The maximums of the first channel, as the channels are not split.
+    peaks = samples[1 :: 2 * channels]
+    max_val = max(peaks, default=0)
+    if max_val <= 0:
+        return [0.0] * len(peaks)
+    # numpy is not a dependency of the API, so the peaks are scaled and rounded
+    # by chaining ``map`` over the array, which runs no Python code per point.
+    # Negative maximums only occur in pixels that are entirely below zero, so
+    # they are clamped separately, if there are any.
+    scaled = map(round, map(truediv, peaks, repeat(max_val)), repeat(5))
+    if min(peaks) >= 0:
+        transformed_data = list(scaled)
+    else:
+        transformed_data = [max(val, 0.0) for val in scaled]
     logger.debug(
         f"finished transformation len(transformed_data)={len(transformed_data)}"
     )
     return transformed_data
 
 
-def cleanup(file_name):
+async def agenerate_peaks(
+    audio, session: aiohttp.ClientSession | None = None
+) -> list[float]:
     """
-    Delete the audio file after it has been processed.
+    Generate the waveform peaks of the audio, streaming it from upstream.
 
-    :param file_name: the name of the file to delete
+    :param audio: the audio to generate the waveform peaks of
+    :param session: the session to download the audio with, by default the
+    shared session of the event loop
+    :returns: the list of peaks
     """
 
-    file_path = TMP_DIR.joinpath(file_name)
-    logger.debug(f"file_path={file_path}")
-    if file_path.exists():
-        logger.debug("deleting file")
-        try:
-            os.remove(file_path)
-        except (OSError, FileNotFoundError) as e:
-            # Do not raise a further exception, because this actually doesn't necessarily mean the request needs to fail
-            logger.error(
-                "waveform_cleanup_failed", exc=e, file_name=file_name, exc_info=True
-            )
-            return
-
-        logger.debug("file deleted")
-    else:
-        logger.debug("file not found, nothing deleted")
-
+    logger.debug(
+        "waveform_audio_download_start", url=audio.url, identifier=audio.identifier
+    )
 
-def generate_peaks(audio) -> list[float]:
-    file_name = None
+    session = session or await get_aiohttp_session()
     try:
-        file_name = download_audio(audio.url, audio.identifier)
-        awf_out = generate_waveform(file_name, audio.duration)
-        return process_waveform_output(awf_out)
-    finally:
-        if file_name is not None:
-            cleanup(file_name)
+        async with session.get(
+            audio.url, headers=HEADERS, raise_for_status=True
+        ) as res:
+            mimetype = res.headers.get("Content-Type")
+            logger.debug(f"mimetype={mimetype}")
+            input_format = get_input_format(audio.url, mimetype)
+            dat_out = await generate_waveform(res.content, input_format, audio.duration)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error("waveform_audio_download_failed", exc=e, exc_info=True)
+        raise UpstreamWaveformException()
+
+    return process_waveform_output(dat_out)
+
+
+async def coalesce_waveform(
+    identifier: str,
+    generate: Callable[[], Awaitable[list[float]]],
+    wait: bool = False,
+) -> list[float]:
+    """
+    Share one generation of the waveform between concurrent requests.
+
+    Within a worker, later requests await the generation in flight. Across
+    workers, the generation holds the Redis lock of the audio for as long as it
+    runs. Later generations fail instead of waiting for it, unless ``wait`` is
+    set, in which case they wait for at most ``WAVEFORM_LOCK_TIMEOUT_SECONDS``
+    and can read the waveform it saved.
+
+    :param identifier: the identifier of the audio
+    :param generate: the coroutine function generating and saving the waveform
+    :param wait: whether to wait for a generation in another worker
+    :returns: the list of peaks
+    :raises WaveformGenerationInProgress: if the waveform is being generated by
+    another worker and ``wait`` is not set
+    """
+
+    identifier = str(identifier)
+    inflight = _inflight_waveforms.setdefault(asyncio.get_running_loop(), {})
+    if (future := inflight.get(identifier)) is None:
+
+        async def run():
+            try:
+                async with redis_lock(
+                    f"{WAVEFORM_LOCK_PREFIX}{identifier}",
+                    settings.WAVEFORM_LOCK_TIMEOUT_SECONDS,
+                    blocking=wait,
+                ):
+                    return await generate()
+            except LockHeldError:
+                raise WaveformGenerationInProgress()
+
+        future = asyncio.ensure_future(run())
+        inflight[identifier] = future
+        future.add_done_callback(lambda _: inflight.pop(identifier, None))
+
+    # Shielded so that a cancelled request does not cancel the generation for
+    # the other requests sharing it.
+    return list(await asyncio.shield(future))
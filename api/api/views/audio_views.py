@@ -86,7 +86,7 @@ class AudioViewSet(MediaViewSet):
         serializer_class=AudioWaveformSerializer,
         throttle_classes=[AnonThumbnailRateThrottle, OAuth2IdThumbnailRateThrottle],
     )
-    def waveform(self, *_, **__):
+    async def waveform(self, *_, **__):
         """
         Get the waveform peaks for an audio track.
 
@@ -95,9 +95,9 @@ class AudioViewSet(MediaViewSet):
         although it can be slightly higher or lower, depending on the track's length.
         """
 
-        audio = self.get_object()
+        audio = await self.aget_object()
 
-        obj = {"points": audio.get_or_create_waveform()}
+        obj = {"points": await audio.aget_or_create_waveform()}
         serializer = self.get_serializer(obj)
 
         return Response(status=200, data=serializer.data)
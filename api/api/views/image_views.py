@@ -45,6 +45,7 @@ class ImageViewSet(MediaViewSet):
     media_type = IMAGE_TYPE
     query_serializer_class = ImageSearchRequestSerializer
     default_index = settings.MEDIA_INDEX_MAPPING[IMAGE_TYPE]
+    hits_are_serializable = True
 
     serializer_class = ImageSerializer
 
@@ -102,16 +103,34 @@ class ImageViewSet(MediaViewSet):
     async def get_image_proxy_media_info(self) -> image_proxy.MediaInfo:
         image = await self.aget_object()
         image_url = image.url
+        filetype = image.filetype
         # Hotfix to use thumbnails for SMK images
         # TODO: Remove when small thumbnail issues are resolved
         if "iip.smk.dk" in image_url and image.thumbnail:
             image_url = image.thumbnail
+            filetype = None
 
         return image_proxy.MediaInfo(
             media_identifier=image.identifier,
             media_provider=image.provider,
             image_url=image_url,
             width=image.width,
+            filetype=filetype,
+        )
+
+    def get_image_proxy_media_info_for_result(
+        self, result: dict
+    ) -> image_proxy.MediaInfo | None:
+        # SMK images use the ``thumbnail`` field of the model, see above.
+        if not result["url"] or "iip.smk.dk" in result["url"]:
+            return None
+
+        return image_proxy.MediaInfo(
+            media_identifier=result["id"],
+            media_provider=result["provider"],
+            image_url=result["url"],
+            width=result.get("width"),
+            filetype=result.get("filetype"),
         )
 
     @thumbnail_docs
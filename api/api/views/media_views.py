@@ -1,5 +1,7 @@
+import asyncio
 from typing import Union
 
+from django.conf import settings
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.exceptions import APIException, NotFound
@@ -9,16 +11,20 @@ from rest_framework.viewsets import ReadOnlyModelViewSet
 import structlog
 from adrf.generics import GenericAPIView as AsyncAPIView
 from adrf.viewsets import ViewSetMixin as AsyncViewSetMixin
+from asgiref.sync import sync_to_async
+from elasticsearch_dsl.response import Hit
 
 from api.constants.media_types import MediaType
 from api.controllers import search_controller
+from api.controllers.elasticsearch.helpers import get_index_generation
 from api.controllers.elasticsearch.related import related_media
 from api.models import ContentSource
 from api.models.base import OpenLedgerModel
 from api.models.media import AbstractMedia
 from api.serializers import media_serializers
 from api.serializers.source_serializers import SourceSerializer
-from api.utils import image_proxy
+from api.utils import image_proxy, search_response_cache
+from api.utils.image_proxy.prewarm import thumbnail_prewarmer
 from api.utils.pagination import StandardPagination
 from api.utils.search_context import SearchContext
 from api.utils.throttle import (
@@ -26,10 +32,15 @@ from api.utils.throttle import (
     OAuth2IdThumbnailRateThrottle,
     OpenverseReferrerAnonThumbnailRateThrottle,
 )
+from api.utils.timing import stop_recording, time_stage
 
 
 logger = structlog.get_logger(__name__)
 
+# References to the background refreshes of cached search responses, which
+# would otherwise be garbage collected while running.
+_refresh_tasks: set[asyncio.Task] = set()
+
 MediaListRequestSerializer = Union[
     media_serializers.PaginatedRequestSerializer,
     media_serializers.MediaSearchRequestSerializer,
@@ -56,6 +67,10 @@ class MediaViewSet(AsyncViewSetMixin, AsyncAPIView, ReadOnlyModelViewSet):
     media_type: MediaType | None = None
     query_serializer_class = None
     default_index = None
+    # Whether the Elasticsearch documents of the media type hold all the fields
+    # needed by ``serializer_class``, so that search results can be serialized
+    # without loading them from the database
+    hits_are_serializable = False
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -117,39 +132,141 @@ class MediaViewSet(AsyncViewSetMixin, AsyncAPIView, ReadOnlyModelViewSet):
         :return: the corresponding list of ORM model instances
         """
 
-        identifiers = []
-        hits = []
-        for hit in results:
-            identifiers.append(hit.identifier)
-            hits.append(hit)
+        hits = {hit.identifier: hit for hit in results}
 
-        results = list(self.get_queryset().filter(identifier__in=identifiers))
-        results.sort(key=lambda x: identifiers.index(str(x.identifier)))
-        for result, hit in zip(results, hits):
+        results = list(self.get_queryset().filter(identifier__in=list(hits)))
+        positions = {identifier: idx for idx, identifier in enumerate(hits)}
+        results.sort(key=lambda x: positions[str(x.identifier)])
+        for result in results:
+            hit = hits[str(result.identifier)]
             result.fields_matched = getattr(hit.meta, "highlight", None)
 
-        if include_addons and self.addon_model_class:
-            addons = list(self.addon_model_class.objects.filter(pk__in=identifiers))
-        else:
-            addons = []
+        return (results, self._get_addons(list(hits), include_addons))
+
+    def get_hit_results(
+        self,
+        results,
+        include_addons=False,
+    ) -> tuple[list[Hit], list[OpenLedgerModel]]:
+        """
+        Prepare ES hits to be serialized without loading them from the DB.
+
+        This is only possible when ``hits_are_serializable`` is set for the media
+        type and the index was built with the fields stored for the API.
+
+        :param results: the list of ES hits
+        :param include_addons: whether to include add-ons with results
+        :return: the list of ES hits
+        """
 
-        return (results, addons)
+        hits = list(results)
+        for hit in hits:
+            hit.fields_matched = getattr(hit.meta, "highlight", None)
+
+        identifiers = [hit.identifier for hit in hits]
+        return (hits, self._get_addons(identifiers, include_addons))
+
+    def _get_addons(self, identifiers, include_addons) -> list[OpenLedgerModel]:
+        if include_addons and self.addon_model_class:
+            return list(self.addon_model_class.objects.filter(pk__in=identifiers))
+        return []
 
     # Standard actions
 
-    def retrieve(self, request, *_, **__):
-        instance = self.get_object()
-        search_context = SearchContext.build(
+    async def retrieve(self, request, *_, **__):
+        instance = await self.aget_object()
+        search_context = await SearchContext.build(
             [str(instance.identifier)], self.default_index
-        ).asdict()
-        serializer_context = search_context | self.get_serializer_context()
+        )
+        data = await sync_to_async(self._serialize_instance)(instance, search_context)
+
+        return Response(data)
+
+    def _serialize_instance(self, instance, search_context: SearchContext):
+        serializer_context = search_context.asdict() | self.get_serializer_context()
         serializer = self.get_serializer(instance, context=serializer_context)
+        return serializer.data
+
+    async def list(self, request, *_, **__):
+        # Only this validation is timed, as ``get_serializer_context`` validates
+        # the parameters again.
+        with time_stage("validation"):
+            params = await sync_to_async(self._get_request_serializer)(request)
+        # Only anonymous searches are cached, as they make up most of the
+        # traffic and never depend on the privileges of an application.
+        if settings.SEARCH_RESPONSE_CACHE_TIMEOUT > 0 and request.auth is None:
+            response = await self._get_cached_media_results(request, params)
+        else:
+            response = await self.get_media_results(request, params)
 
-        return Response(serializer.data)
+        if thumbnail_prewarmer.is_enabled:
+            thumbnail_prewarmer.schedule(
+                media_info
+                for result in response.data["results"]
+                if (media_info := self.get_image_proxy_media_info_for_result(result))
+            )
+        return response
+
+    async def _get_cached_media_results(self, request, params):
+        """
+        Get the search response from the cache, or search and cache it.
 
-    def list(self, request, *_, **__):
-        params = self._get_request_serializer(request)
-        return self.get_media_results(request, params)
+        The cache is keyed by the concrete indexes in use and the excluded
+        sources, so responses from before a data refresh or a change of the
+        filtered sources are not served. Stale responses are served while they
+        are refreshed in the background. Responses served from the cache are
+        tallied like searches, but refreshes are not.
+        """
+
+        pref_index = params.validated_data.get("index")
+        index = pref_index or self.default_index
+        excluded_sources_query = await sync_to_async(
+            search_controller.get_excluded_sources_query
+        )()
+        key = search_response_cache.get_cache_key(
+            self.media_type,
+            await get_index_generation(index),
+            request.get_host(),
+            params.validated_data,
+            excluded_sources_query,
+        )
+
+        if cached := await sync_to_async(search_response_cache.get_response)(key):
+            data, is_stale = cached
+            if is_stale:
+                task = asyncio.create_task(
+                    self._refresh_media_results(request, params, key)
+                )
+                _refresh_tasks.add(task)
+                task.add_done_callback(_refresh_tasks.discard)
+            with time_stage("tallies"):
+                await search_controller.tally_results(
+                    search_controller.get_index(bool(pref_index), index, params),
+                    data["results"],
+                    params.data["page"],
+                    params.data["page_size"],
+                )
+            return Response(data)
+
+        response = await self.get_media_results(request, params)
+        await sync_to_async(search_response_cache.set_response)(key, response.data)
+        return response
+
+    async def _refresh_media_results(self, request, params, key):
+        # The task outlives the request it was created by.
+        stop_recording()
+        if not await sync_to_async(search_response_cache.claim_refresh)(key):
+            # Another request, possibly in another worker, is refreshing it.
+            return
+
+        try:
+            # The request that triggered the refresh was tallied already.
+            response = await self.get_media_results(request, params, tally=False)
+            await sync_to_async(search_response_cache.set_response)(key, response.data)
+        except Exception as exc:
+            # Nothing awaits this task, so failures can only be logged. The
+            # stale response is refreshed when it is next requested.
+            logger.warning("Search response refresh failed", exc=exc)
 
     def _validate_source(self, source):
         valid_sources = search_controller.get_sources(self.media_type)
@@ -173,10 +290,11 @@ class MediaViewSet(AsyncViewSetMixin, AsyncAPIView, ReadOnlyModelViewSet):
 
         return False
 
-    def get_media_results(
+    async def get_media_results(
         self,
         request,
         params: MediaListRequestSerializer,
+        tally: bool = True,
     ):
         page_size = self.paginator.page_size = params.data["page_size"]
         page = self.paginator.page = params.data["page"]
@@ -200,7 +318,7 @@ class MediaViewSet(AsyncViewSetMixin, AsyncAPIView, ReadOnlyModelViewSet):
                 num_pages,
                 num_results,
                 search_context,
-            ) = search_controller.query_media(
+            ) = await search_controller.query_media(
                 params,
                 search_index,
                 exact_index,
@@ -208,6 +326,7 @@ class MediaViewSet(AsyncViewSetMixin, AsyncAPIView, ReadOnlyModelViewSet):
                 hashed_ip,
                 filter_dead,
                 page,
+                tally=tally,
             )
             self.paginator.page_count = params.clamp_page_count(num_pages)
             self.paginator.result_count = params.clamp_result_count(num_results)
@@ -215,15 +334,38 @@ class MediaViewSet(AsyncViewSetMixin, AsyncAPIView, ReadOnlyModelViewSet):
             raise APIException(getattr(e, "message", str(e)))
 
         include_addons = self.include_addons(params)
-        results, addons = self.get_db_results(results, include_addons)
+        data = await sync_to_async(self._serialize_hits)(
+            results, include_addons, search_context
+        )
+        return self.get_paginated_response(data)
+
+    def _serialize_hits(self, results, include_addons=False, search_context=None):
+        """
+        Map ES hits to ORM model instances and serialize them.
+
+        All DB access needed for a page of results happens here, so that async
+        views can run it in a single hop to a sync thread.
+
+        :param results: the list of ES hits
+        :param include_addons: whether to include add-ons with results
+        :param search_context: the search context of the results, as a dict
+        :return: the serialized results
+        """
+
+        with time_stage("db"):
+            if settings.SERIALIZE_SEARCH_RESULTS_FROM_ES and self.hits_are_serializable:
+                results, addons = self.get_hit_results(results, include_addons)
+            else:
+                results, addons = self.get_db_results(results, include_addons)
         serializer_context = (
-            search_context
+            (search_context or {})
             | self.get_serializer_context()
             | {"addons": {addon.audio_identifier: addon for addon in addons}}
         )
 
         serializer = self.get_serializer(results, many=True, context=serializer_context)
-        return self.get_paginated_response(serializer.data)
+        with time_stage("serialization"):
+            return serializer.data
 
     # Extra actions
 
@@ -241,12 +383,21 @@ class MediaViewSet(AsyncViewSetMixin, AsyncAPIView, ReadOnlyModelViewSet):
         return Response(serializer.data)
 
     @action(detail=True)
-    def related(self, request, identifier=None, *_, **__):
+    async def related(self, request, identifier=None, *_, **__):
+        async def get_item_id():
+            # The ES documents are identified by the ID of the media in the DB.
+            return await (
+                self.model_class.objects.filter(identifier=identifier)
+                .values_list("id", flat=True)
+                .afirst()
+            )
+
         try:
-            results = related_media(
+            results = await related_media(
                 uuid=identifier,
                 index=self.default_index,
                 filter_dead=True,
+                get_item_id=get_item_id,
             )
             self.paginator.page_count = 1
             # `page_size` refers to the maximum number of related images to return.
@@ -259,12 +410,8 @@ class MediaViewSet(AsyncViewSetMixin, AsyncAPIView, ReadOnlyModelViewSet):
         except IndexError:
             raise NotFound
 
-        serializer_context = self.get_serializer_context()
-
-        results, _ = self.get_db_results(results)
-
-        serializer = self.get_serializer(results, many=True, context=serializer_context)
-        return self.get_paginated_response(serializer.data)
+        data = await sync_to_async(self._serialize_hits)(results)
+        return self.get_paginated_response(data)
 
     def report(self, request, identifier):
         serializer = self.get_serializer(data=request.data | {"identifier": identifier})
@@ -278,6 +425,20 @@ class MediaViewSet(AsyncViewSetMixin, AsyncAPIView, ReadOnlyModelViewSet):
             "Subclasses must implement `get_image_proxy_media_info`"
         )
 
+    def get_image_proxy_media_info_for_result(
+        self, result: dict
+    ) -> image_proxy.MediaInfo | None:
+        """
+        Get the media info of the thumbnail of a search result, for pre-warming.
+
+        Subclasses whose thumbnails can be pre-warmed should override this.
+
+        :param result: the serialized search result
+        :return: the media info, or ``None`` if the thumbnail is not pre-warmed
+        """
+
+        return None
+
     thumbnail_action = action(
         detail=True,
         url_path="thumb",
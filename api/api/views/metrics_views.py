@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.views import APIView
+
+from api.utils.throttle import ExemptOAuth2IdRateThrottle, HealthcheckAnonRateThrottle
+from api.utils.timing import render_metrics
+
+
+class Metrics(APIView):
+    """
+    Return the request stage metrics of the process in the Prometheus text format.
+
+    The metrics are kept in the memory of each process, so every process must be
+    scraped. This endpoint is only served if ``ENABLE_METRICS_ENDPOINT`` is set.
+    """
+
+    throttle_classes = [HealthcheckAnonRateThrottle, ExemptOAuth2IdRateThrottle]
+    schema = None  # Hide this view from the OpenAPI schema.
+
+    def get(self, request: Request):
+        if not settings.ENABLE_METRICS_ENDPOINT:
+            raise NotFound
+
+        return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4")
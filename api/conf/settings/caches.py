@@ -27,3 +27,16 @@ CACHES = {
     # for a given week), allowing historical data analysis.
     "tallies": _make_cache_config(3, TIMEOUT=None),
 }
+
+# The number of seconds for which rarely changing values, like the list of
+# excluded sources, are cached in the memory of each worker in front of Redis.
+# Set to 0 to disable the per-worker cache.
+LOCAL_CACHE_TIMEOUT = config("LOCAL_CACHE_TIMEOUT", default=60, cast=int)
+
+# Tallies are aggregated in the memory of each worker and written to Redis every
+# ``TALLY_BUFFER_FLUSH_INTERVAL_SECONDS``, or as soon as ``TALLY_BUFFER_MAX_KEYS``
+# distinct keys are buffered. Set the interval to 0 to write tallies immediately.
+TALLY_BUFFER_FLUSH_INTERVAL_SECONDS = config(
+    "TALLY_BUFFER_FLUSH_INTERVAL_SECONDS", default=10, cast=float
+)
+TALLY_BUFFER_MAX_KEYS = config("TALLY_BUFFER_MAX_KEYS", default=1000, cast=int)
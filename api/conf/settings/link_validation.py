@@ -16,6 +16,52 @@ LINK_VALIDATION_TIMEOUT_SECONDS = config(
     "LINK_VALIDATION_TIMEOUT_SECONDS", default=0.8, cast=float
 )
 
+# Connection pool of the link validation client, separate from the one used to
+# proxy thumbnails. A limit of 0 means no limit. Requests waiting for a pooled
+# connection count towards ``LINK_VALIDATION_TIMEOUT_SECONDS``, so a low per-host
+# limit can turn slow hosts into timeouts.
+LINK_VALIDATION_CONNECTION_LIMIT = config(
+    "LINK_VALIDATION_CONNECTION_LIMIT", default=100, cast=int
+)
+LINK_VALIDATION_CONNECTION_LIMIT_PER_HOST = config(
+    "LINK_VALIDATION_CONNECTION_LIMIT_PER_HOST", default=0, cast=int
+)
+LINK_VALIDATION_KEEPALIVE_SECONDS = config(
+    "LINK_VALIDATION_KEEPALIVE_SECONDS", default=30, cast=float
+)
+LINK_VALIDATION_DNS_CACHE_SECONDS = config(
+    "LINK_VALIDATION_DNS_CACHE_SECONDS", default=300, cast=int
+)
+
+# Hosts that fail this many link validation requests in a row, by timing out or
+# refusing connections, are not requested for the cooldown period. Their links
+# are treated as having an unknown status in the meantime.
+LINK_VALIDATION_CIRCUIT_FAILURE_THRESHOLD = config(
+    "LINK_VALIDATION_CIRCUIT_FAILURE_THRESHOLD", default=5, cast=int
+)
+LINK_VALIDATION_CIRCUIT_COOLDOWN_SECONDS = config(
+    "LINK_VALIDATION_CIRCUIT_COOLDOWN_SECONDS", default=60, cast=float
+)
+
+# After validating a page of search results, validate the links of the next page
+# in the background, so that its request only waits for Elasticsearch.
+LINK_VALIDATION_PREVALIDATE_NEXT_PAGE = config(
+    "LINK_VALIDATION_PREVALIDATE_NEXT_PAGE", default=False, cast=bool
+)
+
+# Link statuses are cached in Redis hashes keyed by a digest of the URL. With the
+# default ``hash-max-listpack-entries`` of 128, a million buckets keep up to about
+# 100 million cached URLs per generation in compact listpacks.
+LINK_VALIDATION_CACHE_BUCKETS = config(
+    "LINK_VALIDATION_CACHE_BUCKETS", default=2**20, cast=int
+)
+# Fall back to statuses cached by earlier releases under one key per URL. Can be
+# disabled once the longest link validation cache expiry has passed after the
+# release that introduced the hashed cache.
+LINK_VALIDATION_CACHE_READ_LEGACY_KEYS = config(
+    "LINK_VALIDATION_CACHE_READ_LEGACY_KEYS", default=True, cast=bool
+)
+
 
 class LinkValidationCacheExpiryConfiguration(defaultdict):
     """Link validation cache expiry configuration."""
@@ -13,6 +13,67 @@ ENABLE_FILTERED_INDEX_QUERIES = config(
     "ENABLE_FILTERED_INDEX_QUERIES", cast=bool, default=False
 )
 
+# Serialize search results from the Elasticsearch documents instead of loading
+# them from the database. Requires indexes built with the fields stored for the API,
+# including the providers of tags; older documents serialize tags without one.
+SERIALIZE_SEARCH_RESULTS_FROM_ES = config(
+    "SERIALIZE_SEARCH_RESULTS_FROM_ES", cast=bool, default=False
+)
+
+# Share one run of a search between concurrent identical searches in a worker. The
+# searches that share a run are not timed for Elasticsearch and link validation.
+SEARCH_COALESCING = config("SEARCH_COALESCING", cast=bool, default=False)
+# Additionally, make identical searches in other workers wait for the running one
+# with a Redis lock, for at most the lock timeout, so that they are served from
+# the link validation cache and dead link mask it fills.
+SEARCH_COALESCING_ACROSS_WORKERS = config(
+    "SEARCH_COALESCING_ACROSS_WORKERS", cast=bool, default=False
+)
+SEARCH_COALESCING_LOCK_TIMEOUT_SECONDS = config(
+    "SEARCH_COALESCING_LOCK_TIMEOUT_SECONDS", cast=float, default=5
+)
+
+# The number of seconds after which the Redis lock of a worker generating a
+# waveform expires if the worker stops renewing it, and for which the
+# ``generatewaveforms`` command waits for other workers generating the same
+# waveform. API requests do not wait for them.
+WAVEFORM_LOCK_TIMEOUT_SECONDS = config(
+    "WAVEFORM_LOCK_TIMEOUT_SECONDS", cast=float, default=60
+)
+
+# The number of seconds for which anonymous search responses are cached. Set to 0
+# to disable the cache. Entries are keyed by the indexes in use and the filtered
+# sources, so they are not served after a data refresh or a change of the sources.
+# Expired responses are served for a further ``SEARCH_RESPONSE_CACHE_STALE_SECONDS``
+# while they are refreshed. Cached responses are included in the provider tallies.
+SEARCH_RESPONSE_CACHE_TIMEOUT = config(
+    "SEARCH_RESPONSE_CACHE_TIMEOUT", cast=int, default=0
+)
+SEARCH_RESPONSE_CACHE_STALE_SECONDS = config(
+    "SEARCH_RESPONSE_CACHE_STALE_SECONDS", cast=int, default=60
+)
+
+# The number of seconds for which the related results of a media item are cached.
+# Entries are keyed by the indexes in use, so they are not reused across data
+# refreshes. Cached results are not checked for dead links again, so keep this
+# short. Set to 0 to disable the cache.
+RELATED_CACHE_TIMEOUT = config("RELATED_CACHE_TIMEOUT", cast=int, default=0)
+
+# Find related results with a single ``more_like_this`` query referencing the
+# item's document, instead of first fetching the item to build the query.
+RELATED_USE_MORE_LIKE_THIS = config(
+    "RELATED_USE_MORE_LIKE_THIS", cast=bool, default=False
+)
+
+# Send the durations of the stages of each request in the ``Server-Timing`` header.
+# They expose internals of the API to every client, so only enable it for debugging.
+ENABLE_SERVER_TIMING_HEADER = config(
+    "ENABLE_SERVER_TIMING_HEADER", cast=bool, default=False
+)
+
+# Serve the stage duration histograms of each process at ``/metrics/``.
+ENABLE_METRICS_ENDPOINT = config("ENABLE_METRICS_ENDPOINT", cast=bool, default=False)
+
 # Log full Elasticsearch response
 VERBOSE_ES_RESPONSE = config("DEBUG_SCORES", default=False, cast=bool)
 
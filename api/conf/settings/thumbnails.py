@@ -33,6 +33,34 @@ THUMBNAIL_FAILURE_CACHE_TOLERANCE = config(
 # Timeout when requesting the thumbnail from the upstream image proxy
 THUMBNAIL_UPSTREAM_TIMEOUT = config("THUMBNAIL_UPSTREAM_TIMEOUT", default=4, cast=int)
 
+# The largest thumbnail, in bytes, that is proxied to the client
+THUMBNAIL_MAX_SIZE_BYTES = config(
+    "THUMBNAIL_MAX_SIZE_BYTES", default=20 * 1024 * 1024, cast=int
+)
+
+# Thumbnails are cached in the memory of each worker, up to this many bytes. Set to
+# 0 to disable the memory cache.
+THUMBNAIL_CACHE_MEMORY_BYTES = config(
+    "THUMBNAIL_CACHE_MEMORY_BYTES", default=0, cast=int
+)
+# Thumbnails are additionally cached in this directory, if set, up to this many
+# bytes. The directory can be shared by the workers of a server.
+THUMBNAIL_CACHE_DIR = config("THUMBNAIL_CACHE_DIR", default=None)
+THUMBNAIL_CACHE_DISK_BYTES = config(
+    "THUMBNAIL_CACHE_DISK_BYTES", default=1024 * 1024 * 1024, cast=int
+)
+# Larger thumbnails are not cached
+THUMBNAIL_CACHE_MAX_ENTRY_BYTES = config(
+    "THUMBNAIL_CACHE_MAX_ENTRY_BYTES", default=1024 * 1024, cast=int
+)
+# Cached thumbnails are served without contacting upstream for this long, after
+# which they are revalidated with their ``ETag`` and ``Last-Modified`` headers
+THUMBNAIL_CACHE_TTL_SECONDS = config(
+    "THUMBNAIL_CACHE_TTL_SECONDS",
+    default=int(timedelta(hours=1).total_seconds()),
+    cast=int,
+)
+
 # Timeout when trying to determine the filetype based on a HEAD request to the upstream image provider
 THUMBNAIL_EXTENSION_REQUEST_TIMEOUT = config(
     "THUMBNAIL_EXTENSION_REQUEST_TIMEOUT", default=4, cast=int
@@ -42,3 +70,23 @@ THUMBNAIL_EXTENSION_REQUEST_TIMEOUT = config(
 USE_WIKIMEDIA_THUMBNAIL_ENDPOINT = config(
     "USE_WIKIMEDIA_THUMBNAIL_ENDPOINT", default=True, cast=bool
 )
+
+# The thumbnails of this many results of each search are requested in the
+# background, so that they are warm in the caches when the client requests them.
+# Set to 0 to disable pre-warming.
+THUMBNAIL_PREWARM_COUNT = config("THUMBNAIL_PREWARM_COUNT", default=0, cast=int)
+# The number of thumbnails pre-warmed at once by each worker
+THUMBNAIL_PREWARM_CONCURRENCY = config(
+    "THUMBNAIL_PREWARM_CONCURRENCY", default=4, cast=int
+)
+# Thumbnails are not pre-warmed if this many are already waiting in a worker
+THUMBNAIL_PREWARM_QUEUE_SIZE = config(
+    "THUMBNAIL_PREWARM_QUEUE_SIZE", default=200, cast=int
+)
+# Thumbnails are pre-warmed for this ``Accept`` header. The thumbnail cache only
+# serves them to requests with the same header, so it should match what browsers
+# send for images.
+THUMBNAIL_PREWARM_ACCEPT_HEADER = config(
+    "THUMBNAIL_PREWARM_ACCEPT_HEADER",
+    default="image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
+)
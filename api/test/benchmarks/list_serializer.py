@@ -0,0 +1,78 @@
+"""
+Compare the cost of serializing a page of search results with DRF's
+``ListSerializer`` and with ``MediaListSerializer``.
+
+Run with ``just api/benchmark list_serializer``.
+"""
+
+import os
+import timeit
+
+import django
+from django.conf import settings
+
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "conf.settings")
+django.setup()
+
+from rest_framework import serializers  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from elasticsearch_dsl.response import Hit  # noqa: E402
+
+from api.serializers.image_serializers import ImageSerializer  # noqa: E402
+from test.factory.es_http import create_mock_es_http_image_hit  # noqa: E402
+
+
+ROUNDS = 20
+PAGE_SIZE = 500  # the largest page size, available to authenticated clients
+
+
+def build_page() -> list[Hit]:
+    """Build a page of hits holding the fields stored for the API."""
+
+    return [
+        Hit(
+            create_mock_es_http_image_hit(
+                _id=idx,
+                index="image",
+                filesize=None,
+                filetype="jpg",
+                height=480,
+                width=640,
+            )
+        )
+        for idx in range(PAGE_SIZE)
+    ]
+
+
+def main():
+    hits = build_page()
+    request = Request(
+        APIRequestFactory().get("/v1/images/", HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    )
+    context = {"request": request, "validated_data": {}}
+
+    def drf_list():
+        child = ImageSerializer(context=context)
+        return serializers.ListSerializer(
+            child=child, instance=hits, context=context
+        ).data
+
+    def media_list():
+        return ImageSerializer(hits, many=True, context=context).data
+
+    assert drf_list() == media_list()
+
+    timings = {
+        "ListSerializer": timeit.timeit(drf_list, number=ROUNDS),
+        "MediaListSerializer": timeit.timeit(media_list, number=ROUNDS),
+    }
+
+    for name, seconds in timings.items():
+        print(f"{name:>20}: {seconds / ROUNDS * 1e3:8.1f} ms per page of {PAGE_SIZE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare the cost of hashing a search query with DeepHash and with
+``get_query_hash``.
+
+Run with ``just api/benchmark query_hash``.
+"""
+
+import timeit
+
+from deepdiff import DeepHash
+from elasticsearch_dsl import Q, Search
+
+from api.utils.dead_link_mask import get_query_hash
+
+
+ROUNDS = 1000
+
+
+def build_search() -> Search:
+    """Build a search shaped like a filtered keyword search of the API."""
+
+    s = Search(index="image")
+    s = s.query(
+        "bool",
+        must=[
+            Q(
+                "simple_query_string",
+                query="cat dog bird",
+                fields=["title", "description", "tags.name"],
+                default_operator="AND",
+            )
+        ],
+        should=[
+            Q("rank_feature", field="standardized_popularity", boost=10000),
+            Q("simple_query_string", query="cat dog bird", fields=["title"]),
+        ],
+        filter=[
+            Q("terms", license=["by", "by-sa", "cc0", "pdm"]),
+            Q("terms", category=["photograph", "illustration"]),
+        ],
+        must_not=[
+            Q("terms", source=["source1", "source2", "source3"]),
+            Q("term", mature=True),
+        ],
+    )
+    s = s.highlight("description", "title", "tags.name")
+    s = s.extra(track_scores=True)
+    return s
+
+
+def deep_hash(s: Search) -> str:
+    serialized_search_obj = s.to_dict()
+    serialized_search_obj.pop("from", None)
+    serialized_search_obj.pop("size", None)
+    return DeepHash(serialized_search_obj)[serialized_search_obj]
+
+
+def main():
+    s = build_search()
+
+    timings = {
+        "DeepHash": timeit.timeit(lambda: deep_hash(s), number=ROUNDS),
+        # A fresh clone per call bypasses the memoized hash.
+        "canonical JSON": timeit.timeit(
+            lambda: get_query_hash(s._clone()), number=ROUNDS
+        ),
+        "memoized": timeit.timeit(lambda: get_query_hash(s), number=ROUNDS),
+    }
+
+    for name, seconds in timings.items():
+        print(f"{name:>16}: {seconds / ROUNDS * 1e6:8.1f} µs per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,9 @@
 from test.fixtures.asynchronous import ensure_asgi_lifecycle, get_new_loop, session_loop
 from test.fixtures.cache import (
     django_cache,
+    local_caches,
     redis,
+    unbuffered_tallies,
     unreachable_django_cache,
     unreachable_redis,
 )
@@ -27,7 +29,9 @@ __all__ = [
     "get_new_loop",
     "session_loop",
     "django_cache",
+    "local_caches",
     "redis",
+    "unbuffered_tallies",
     "unreachable_django_cache",
     "unreachable_redis",
     "api_client",
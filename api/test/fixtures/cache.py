@@ -2,19 +2,34 @@ from django.core.cache import caches
 
 import pytest
 from django_redis.cache import RedisCache
-from fakeredis import FakeRedis, FakeServer
+from fakeredis import FakeAsyncRedis, FakeRedis, FakeServer
+
+from api.utils.local_cache import clear_local_caches
 
 
 @pytest.fixture(autouse=True)
 def redis(monkeypatch) -> FakeRedis:
-    """Emulate a Redis connection that does not affect the real cache."""
+    """
+    Emulate a Redis connection that does not affect the real cache.
+
+    Async clients from ``get_async_redis_connection`` share the data of the
+    fake connection.
+    """
 
-    fake_redis = FakeRedis()
+    fake_server = FakeServer()
+    fake_redis = FakeRedis(server=fake_server)
 
     def get_redis_connection(*args, **kwargs):
         return fake_redis
 
+    def get_async_redis_connection(*args, **kwargs):
+        # Async clients are bound to the event loop they are used in.
+        return FakeAsyncRedis(server=fake_server)
+
     monkeypatch.setattr("django_redis.get_redis_connection", get_redis_connection)
+    monkeypatch.setattr(
+        "api.utils.async_redis.get_async_redis_connection", get_async_redis_connection
+    )
     yield fake_redis
     fake_redis.client().close()
 
@@ -36,7 +51,13 @@ def unreachable_redis(monkeypatch) -> FakeRedis:
     def get_redis_connection(*args, **kwargs):
         return fake_redis
 
+    def get_async_redis_connection(*args, **kwargs):
+        return FakeAsyncRedis(server=fake_server)
+
     monkeypatch.setattr("django_redis.get_redis_connection", get_redis_connection)
+    monkeypatch.setattr(
+        "api.utils.async_redis.get_async_redis_connection", get_async_redis_connection
+    )
     yield fake_redis
     fake_server.connected = True
     fake_redis.client().close()
@@ -72,3 +93,29 @@ def unreachable_django_cache(unreachable_redis) -> RedisCache:
     caches["default"] = unreachable_redis
     yield cache
     caches["default"] = original_default_cache
+
+
+@pytest.fixture(autouse=True)
+def unbuffered_tallies(settings):
+    """
+    Write tallies to Redis immediately, so that tests can assert on them.
+
+    Tests of the tally buffer must enable it explicitly.
+    """
+
+    settings.TALLY_BUFFER_FLUSH_INTERVAL_SECONDS = 0
+
+
+@pytest.fixture(autouse=True)
+def local_caches(monkeypatch):
+    """
+    Start each test with empty per-process caches.
+
+    The invalidation listener is not started because it would outlive the
+    fake Redis instance of the test that started it.
+    """
+
+    monkeypatch.setattr("api.utils.local_cache._start_listener", lambda: None)
+    clear_local_caches()
+    yield
+    clear_local_caches()
@@ -19,7 +19,7 @@ def unique_query_hash(redis, monkeypatch):
 
 @pytest.fixture
 def empty_validation_cache(monkeypatch):
-    def get_empty_cached_statuses(_, image_urls):
+    async def get_empty_cached_statuses(image_urls):
         return [None] * len(image_urls)
 
     monkeypatch.setattr(
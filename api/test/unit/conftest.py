@@ -2,6 +2,8 @@ from unittest.mock import MagicMock
 
 import pytest
 
+from api.utils.check_dead_links.circuit_breaker import breaker
+
 
 @pytest.fixture(autouse=True)
 def sentry_capture_exception(monkeypatch):
@@ -9,3 +11,12 @@ def sentry_capture_exception(monkeypatch):
     monkeypatch.setattr("sentry_sdk.capture_exception", mock)
 
     yield mock
+
+
+@pytest.fixture(autouse=True)
+def link_validation_circuit_breaker():
+    """Start each test with all link validation circuits closed."""
+
+    breaker.reset()
+    yield breaker
+    breaker.reset()
@@ -2,6 +2,7 @@ from unittest import mock
 
 import pook
 import pytest
+from asgiref.sync import async_to_sync
 
 from api.controllers.elasticsearch import related
 from api.controllers.search_controller import (
@@ -49,6 +50,7 @@ def test_related_media(
     settings,
     excluded_sources_cache,
 ):
+    settings.RELATED_CACHE_TIMEOUT = 0
     image = ImageFactory.create()
 
     # Mock the ES response for the item itself
@@ -105,7 +107,7 @@ def test_related_media(
         .mock
     )
 
-    results = related.related_media(
+    results = async_to_sync(related.related_media)(
         uuid=image.identifier,
         index=image_media_type_config.origin_index,
         filter_dead=True,
@@ -113,3 +115,162 @@ def test_related_media(
     assert len(results) == 10
     assert wrapped_related_results.call_count == 1
     assert mock_related.total_matches == 1
+
+
+@pook.on
+def test_related_media_is_cached_per_index_generation(
+    image_media_type_config,
+    settings,
+    django_cache,
+    monkeypatch,
+):
+    monkeypatch.setattr("api.controllers.search_controller.cache", django_cache)
+    monkeypatch.setattr("api.controllers.elasticsearch.related.cache", django_cache)
+    settings.RELATED_CACHE_TIMEOUT = 60
+    image = ImageFactory.create()
+
+    origin_index = image_media_type_config.origin_index
+    filtered_index = image_media_type_config.filtered_index
+    # The concrete indexes behind the aliases identify the index generation.
+    pook.get(pook.regex(rf"{settings.ES_ENDPOINT}/.+/_alias")).times(1).reply(
+        200
+    ).header("x-elastic-product", "Elasticsearch").json(
+        {
+            f"{origin_index}-1": {"aliases": {origin_index: {}}},
+            f"{filtered_index}-1": {"aliases": {filtered_index: {}}},
+        }
+    )
+    mock_item = (
+        pook.post(f"{settings.ES_ENDPOINT}/{origin_index}/_search")
+        .times(1)
+        .reply(200)
+        .header("x-elastic-product", "Elasticsearch")
+        .json(
+            create_mock_es_http_image_response_with_identifier(
+                index=origin_index, identifier=image.identifier
+            )
+        )
+        .mock
+    )
+    mock_related = (
+        pook.post(f"{settings.ES_ENDPOINT}/{filtered_index}/_search")
+        .times(1)
+        .reply(200)
+        .header("x-elastic-product", "Elasticsearch")
+        .json(
+            create_mock_es_http_image_search_response(
+                index=origin_index, total_hits=20, live_hit_count=20, hit_count=10
+            )
+        )
+        .mock
+    )
+    pook.head(pook.regex(rf"{MOCK_LIVE_RESULT_URL_PREFIX}/\d")).times(20).reply(200)
+
+    results = [
+        async_to_sync(related.related_media)(
+            uuid=image.identifier, index=origin_index, filter_dead=True
+        )
+        for _ in range(2)
+    ]
+
+    assert len(results[0]) == 10
+    assert [hit.identifier for hit in results[0]] == [
+        hit.identifier for hit in results[1]
+    ]
+    assert mock_item.total_matches == 1
+    assert mock_related.total_matches == 1
+
+
+@pook.on
+def test_related_media_uses_more_like_this(
+    image_media_type_config,
+    settings,
+    django_cache,
+    monkeypatch,
+):
+    monkeypatch.setattr("api.controllers.search_controller.cache", django_cache)
+    settings.RELATED_CACHE_TIMEOUT = 0
+    settings.RELATED_USE_MORE_LIKE_THIS = True
+    image = ImageFactory.create()
+
+    origin_index = image_media_type_config.origin_index
+    es_related_query = {
+        "from": 0,
+        "query": {
+            "bool": {
+                "must": [
+                    {
+                        "more_like_this": {
+                            "fields": ["title", "tags.name"],
+                            "like": [{"_index": origin_index, "_id": image.id}],
+                            "min_term_freq": 1,
+                        }
+                    }
+                ],
+                "must_not": [
+                    {"term": {"mature": True}},
+                    {"term": {"identifier": image.identifier}},
+                ],
+            }
+        },
+        "size": 20,
+    }
+    mock_related = (
+        pook.post(
+            f"{settings.ES_ENDPOINT}/{image_media_type_config.filtered_index}/_search"
+        )
+        .json(es_related_query)
+        .times(1)
+        .reply(200)
+        .header("x-elastic-product", "Elasticsearch")
+        .json(
+            create_mock_es_http_image_search_response(
+                index=origin_index, total_hits=20, live_hit_count=20, hit_count=10
+            )
+        )
+        .mock
+    )
+    pook.head(pook.regex(rf"{MOCK_LIVE_RESULT_URL_PREFIX}/\d")).times(20).reply(200)
+
+    results = async_to_sync(related.related_media)(
+        uuid=image.identifier,
+        index=origin_index,
+        filter_dead=True,
+        get_item_id=mock.AsyncMock(return_value=image.id),
+    )
+
+    assert len(results) == 10
+    # The item itself is not fetched, so only the related query is sent.
+    assert mock_related.total_matches == 1
+
+
+def test_related_media_looks_up_item_id_after_cache_miss(settings, monkeypatch):
+    settings.RELATED_CACHE_TIMEOUT = 60
+    settings.RELATED_USE_MORE_LIKE_THIS = True
+    monkeypatch.setattr(
+        related, "get_index_generation", mock.AsyncMock(return_value="image-1")
+    )
+    monkeypatch.setattr(related, "get_excluded_sources_query", lambda: None)
+    monkeypatch.setattr(related, "_get_cached_related", lambda key: [])
+    get_item_id = mock.AsyncMock(return_value=1)
+
+    results = async_to_sync(related.related_media)(
+        uuid="abc", index="image", filter_dead=True, get_item_id=get_item_id
+    )
+
+    assert results == []
+    get_item_id.assert_not_awaited()
+
+
+def test_related_media_raises_for_missing_item(settings, monkeypatch):
+    settings.RELATED_CACHE_TIMEOUT = 0
+    settings.RELATED_USE_MORE_LIKE_THIS = True
+    monkeypatch.setattr(related, "get_excluded_sources_query", lambda: None)
+
+    with pytest.raises(IndexError):
+        async_to_sync(related.related_media)(
+            uuid="abc",
+            index="image",
+            filter_dead=True,
+            get_item_id=mock.AsyncMock(return_value=None),
+        )
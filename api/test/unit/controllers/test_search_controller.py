@@ -1,3 +1,4 @@
+import asyncio
 import random
 import re
 from collections.abc import Callable
@@ -9,8 +10,9 @@ from uuid import uuid4
 
 import pook
 import pytest
+from asgiref.sync import async_to_sync
 from django_redis import get_redis_connection
-from elasticsearch_dsl import Search
+from elasticsearch_dsl import AsyncSearch, Search
 from elasticsearch_dsl.query import Terms
 from structlog.testing import capture_logs
 
@@ -21,8 +23,11 @@ from api.controllers.search_controller import (
     FILTERED_SOURCES_CACHE_VERSION,
 )
 from api.utils import tallies
-from api.utils.dead_link_mask import get_query_hash, save_query_mask
+from api.utils.dead_link_mask import get_query_hash
+from api.utils.dead_link_mask import get_query_mask as _get_query_mask
+from api.utils.dead_link_mask import save_query_mask as _save_query_mask
 from api.utils.search_context import SearchContext
+from api.utils.timing import count, record_request
 from test.factory.es_http import (
     MOCK_DEAD_RESULT_URL_PREFIX,
     MOCK_LIVE_RESULT_URL_PREFIX,
@@ -33,6 +38,10 @@ from test.factory.models.content_source import ContentSourceFactory
 
 pytestmark = pytest.mark.django_db
 
+query_media = async_to_sync(search_controller.query_media)
+get_query_mask = async_to_sync(_get_query_mask)
+save_query_mask = async_to_sync(_save_query_mask)
+
 
 cache_availability_params = pytest.mark.parametrize(
     "is_cache_reachable, cache_name",
@@ -184,7 +193,7 @@ def test_paginate_with_dead_link_mask_new_search(
     """
     start = 0
 
-    assert es_helpers._paginate_with_dead_link_mask(
+    assert async_to_sync(es_helpers._paginate_with_dead_link_mask)(
         s=unique_search, page_size=page_size, page=page
     ) == (start, expected_end)
 
@@ -250,7 +259,10 @@ def create_mask_fixture() -> Callable[[Search, int, int], None]:
     yield create_mask
 
     with get_redis_connection("default") as redis:
-        redis.delete(*[f"{h}:dead_link_mask" for h in created_masks])
+        redis.delete(
+            *[f"{h}:dead_link_mask" for h in created_masks],
+            *[f"{h}:dead_link_mask_size" for h in created_masks],
+        )
 
 
 @pytest.mark.parametrize(
@@ -294,7 +306,7 @@ def test_paginate_with_dead_link_mask_query_mask_is_not_large_enough(
     """
     start = mask_size
     create_mask(s=unique_search, mask_size=mask_size, liveness_count=liveness_count)
-    assert es_helpers._paginate_with_dead_link_mask(
+    assert async_to_sync(es_helpers._paginate_with_dead_link_mask)(
         s=unique_search, page_size=page_size, page=page
     ) == (start, expected_end)
 
@@ -417,7 +429,7 @@ def test_paginate_with_dead_link_mask_query_mask_overlaps_query_window(
         create_mask_kwargs.update(mask=mask_or_mask_size)
 
     create_mask(**create_mask_kwargs)
-    actual_range = es_helpers._paginate_with_dead_link_mask(
+    actual_range = async_to_sync(es_helpers._paginate_with_dead_link_mask)(
         s=unique_search, page_size=page_size, page=page
     )
     assert actual_range == expected_range, (
@@ -491,7 +503,7 @@ def test_search_tallies_pages_less_than_5(
     )
     serializer.is_valid()
 
-    search_controller.query_media(
+    query_media(
         search_params=serializer,
         ip=0,
         origin_index=media_type_config.origin_index,
@@ -532,7 +544,7 @@ def test_search_tallies_handles_empty_page(
     )
     serializer.is_valid()
 
-    search_controller.query_media(
+    query_media(
         search_params=serializer,
         ip=0,
         origin_index=media_type_config.origin_index,
@@ -576,7 +588,7 @@ def test_resolves_index(
     )
     serializer.is_valid()
 
-    search_controller.query_media(
+    query_media(
         search_params=serializer,
         ip=0,
         origin_index=origin_index,
@@ -607,7 +619,7 @@ def test_no_post_process_results_recursion(
 ):
     # Search context does not matter for this test, so we can mock it
     # to avoid needing to account for additional ES requests
-    mock_search_context.build.return_value = SearchContext(set(), set())
+    mock_search_context.build = mock.AsyncMock(return_value=SearchContext(set(), set()))
 
     hit_count = 5
     mock_es_response = create_mock_es_http_image_search_response(
@@ -642,7 +654,7 @@ def test_no_post_process_results_recursion(
         context={"media_type": image_media_type_config.media_type},
     )
     serializer.is_valid()
-    results, _, _, _ = search_controller.query_media(
+    results, _, _, _ = query_media(
         search_params=serializer,
         ip=0,
         origin_index=image_media_type_config.origin_index,
@@ -661,30 +673,29 @@ def test_no_post_process_results_recursion(
 
 
 @pytest.mark.parametrize(
-    # both scenarios force `post_process_results`
-    # to recurse to fill the page due to the dead link
+    # all scenarios force `post_process_results`
+    # to backfill the page due to the dead link
     # configuration present in the test body
-    "page, page_size, mock_total_hits",
+    "page, page_size, mock_total_hits, backfill_slice",
     # Note the following
     # - DEAD_LINK_RATIO causes all query sizes to start at double the page size
     # - The test function is configured so that each request only returns 2 live
     #   results
     # - We clear the redis cache between each test, meaning there is no query-based
-    #   dead link mask. This forces `from` to 0 for each case.
-    # - Recursion should only continue while results still exist that could fulfill
-    #   the requested page size. Once the available hits are exhausted, the function
-    #   should stop recursing. This is why exceeding  or matching the available
-    #   hits is significant.
+    #   dead link mask. This forces `from` to 0 for the first request.
+    # - The backfill request only fetches hits after the ones already fetched,
+    #   sized to twice the number of missing results, and clamped to the number
+    #   of available hits.
     (
         # First request: from: 0, size: 10
-        # Second request: from: 0, size: 15, exceeds max results
-        pytest.param(1, 5, 12, id="first_page"),
-        # First request: from: 0, size: 22
-        # Second request: from 0, size: 33, exceeds max results
-        pytest.param(3, 4, 32, id="last_page"),
-        # First request: from: 0, size: 22
-        # Second request: from 0, size: 33, matches max results
-        pytest.param(3, 4, 33, id="last_page_with_exact_max_results"),
+        # Second request: from: 10, size: 2, clamped to max results
+        pytest.param(1, 5, 12, (10, 12), id="first_page"),
+        # First request: from: 0, size: 24
+        # Second request: from 24, size: 4
+        pytest.param(3, 4, 32, (24, 28), id="last_page"),
+        # First request: from: 0, size: 24
+        # Second request: from 24, size: 2, clamped to max results
+        pytest.param(3, 4, 26, (24, 26), id="last_page_with_exact_max_results"),
     ),
 )
 @mock.patch(
@@ -693,7 +704,7 @@ def test_no_post_process_results_recursion(
 )
 @mock.patch("api.controllers.search_controller.SearchContext")
 @pook.on
-def test_post_process_results_recurses_as_needed(
+def test_post_process_results_backfills_as_needed(
     mock_search_context,
     wrapped_post_process_results,
     image_media_type_config,
@@ -701,6 +712,7 @@ def test_post_process_results_recurses_as_needed(
     page,
     page_size,
     mock_total_hits,
+    backfill_slice,
     # request the redis mock to auto-clean Redis between each test run
     # otherwise the dead link query mask causes test details to leak
     # between each run
@@ -708,22 +720,28 @@ def test_post_process_results_recurses_as_needed(
 ):
     # Search context does not matter for this test, so we can mock it
     # to avoid needing to account for additional ES requests
-    mock_search_context.build.return_value = SearchContext(set(), set())
+    mock_search_context.build = mock.AsyncMock(return_value=SearchContext(set(), set()))
+
+    first_size = (page_size * page) * 2
+    backfill_from, backfill_to = backfill_slice
+    backfill_size = backfill_to - backfill_from
 
     mock_es_response_1 = create_mock_es_http_image_search_response(
         index=image_media_type_config.origin_index,
         total_hits=mock_total_hits,
-        hit_count=10,
+        hit_count=first_size,
         live_hit_count=2,
     )
 
     mock_es_response_2 = create_mock_es_http_image_search_response(
         index=image_media_type_config.origin_index,
         total_hits=mock_total_hits,
-        hit_count=4,
+        hit_count=backfill_size,
         live_hit_count=2,
         base_hits=mock_es_response_1["hits"]["hits"],
     )
+    # The backfill response only contains the unseen hits
+    mock_es_response_2["hits"]["hits"] = mock_es_response_2["hits"]["hits"][first_size:]
 
     # `origin_index` enforced by passing `exact_index=True` below.
     es_endpoint = (
@@ -734,12 +752,10 @@ def test_post_process_results_recurses_as_needed(
     # see `_paginate_with_dead_link_mask` branch 1
     # Testing this with a query mask would introduce far more complexity
     # with no significant benefit
-    re.compile('from":0')
-
     mock_first_es_request = (
         pook.post(es_endpoint)
         # The dead link ratio causes the initial query size to double
-        .body(re.compile(f'size":{(page_size * page) * 2}'))
+        .body(re.compile(f'size":{first_size}'))
         .body(re.compile('from":0'))
         .times(1)
         .reply(200)
@@ -750,9 +766,8 @@ def test_post_process_results_recurses_as_needed(
 
     mock_second_es_request = (
         pook.post(es_endpoint)
-        # Size is clamped to the total number of available hits
-        .body(re.compile(f'size":{mock_total_hits}'))
-        .body(re.compile('from":0'))
+        .body(re.compile(f'size":{backfill_size}'))
+        .body(re.compile(f'from":{backfill_from}'))
         .times(1)
         .reply(200)
         .header("x-elastic-product", "Elasticsearch")
@@ -760,9 +775,10 @@ def test_post_process_results_recurses_as_needed(
         .mock
     )
 
+    all_hits = mock_es_response_1["hits"]["hits"] + mock_es_response_2["hits"]["hits"]
     live_results = [
         r
-        for r in mock_es_response_2["hits"]["hits"]
+        for r in all_hits
         if r["_source"]["url"].startswith(MOCK_LIVE_RESULT_URL_PREFIX)
     ]
 
@@ -771,7 +787,7 @@ def test_post_process_results_recurses_as_needed(
     ).reply(200)
 
     pook.head(pook.regex(rf"{MOCK_DEAD_RESULT_URL_PREFIX}/\d")).times(
-        len(mock_es_response_2["hits"]["hits"]) - len(live_results)
+        len(all_hits) - len(live_results)
     ).reply(400)
 
     serializer = image_media_type_config.search_request_serializer(
@@ -781,7 +797,7 @@ def test_post_process_results_recurses_as_needed(
         context={"media_type": image_media_type_config.media_type},
     )
     serializer.is_valid()
-    results, _, _, _ = search_controller.query_media(
+    results, _, _, _ = query_media(
         search_params=serializer,
         ip=0,
         origin_index=image_media_type_config.origin_index,
@@ -794,48 +810,293 @@ def test_post_process_results_recurses_as_needed(
     assert mock_first_es_request.total_matches == 1
     assert mock_second_es_request.total_matches == 1
 
-    assert {r["_source"]["identifier"] for r in live_results} == {
+    assert [r["_source"]["identifier"] for r in live_results] == [
         r.identifier for r in results
-    }
+    ]
 
-    assert wrapped_post_process_results.call_count == 2
+    assert wrapped_post_process_results.call_count == 1
+
+
+@pytest.mark.parametrize(
+    "end, live_count, page_size, total_hits, expected",
+    (
+        # Twice the number of missing results
+        (40, 10, 20, 1000, (40, 60)),
+        # Clamped to the number of available hits
+        (40, 10, 20, 50, (40, 50)),
+        # Clamped to the maximum result window
+        (9990, 0, 20, 20000, (9990, 10000)),
+        # Available hits exhausted
+        (50, 10, 20, 50, None),
+        # Maximum result window exhausted
+        (10000, 10, 20, 20000, None),
+    ),
+)
+def test_next_backfill_slice(end, live_count, page_size, total_hits, expected):
+    assert (
+        search_controller._next_backfill_slice(end, live_count, page_size, total_hits)
+        == expected
+    )
 
 
 @mock.patch(
     "api.controllers.search_controller.check_dead_links",
 )
-def test_excessive_recursion_in_post_process(
+def test_backfill_round_limit_in_post_process(
     mock_check_dead_links,
     image_media_type_config,
     redis,
     caplog,
+    settings,
 ):
-    def _delete_all_results_but_first(*args):
+    def _delete_all_results(*args):
         results = args[2]
-        results[1:] = []
+        results[:] = []
 
-    mock_check_dead_links.side_effect = _delete_all_results_but_first
+    mock_check_dead_links.side_effect = _delete_all_results
 
-    serializer = image_media_type_config.search_request_serializer(
-        # This query string does not matter, ultimately, as pook is mocking
-        # the ES response regardless of the input
-        data={"q": "bird perched"},
-        context={"media_type": image_media_type_config.media_type},
+    mock_es_response = create_mock_es_http_image_search_response(
+        index=image_media_type_config.origin_index,
+        total_hits=1000,
+        hit_count=4,
     )
-    serializer.is_valid()
 
-    with capture_logs() as cap_logs:
-        results, _, _, _ = search_controller.query_media(
-            search_params=serializer,
-            ip=0,
-            origin_index=image_media_type_config.origin_index,
-            exact_index=True,
+    es_endpoint = (
+        f"{settings.ES_ENDPOINT}/{image_media_type_config.origin_index}/_search"
+    )
+
+    with pook.use():
+        mock_search = (
+            pook.post(es_endpoint)
+            .persist()
+            .reply(200)
+            .header("x-elastic-product", "Elasticsearch")
+            .json(mock_es_response)
+            .mock
+        )
+
+        serializer = image_media_type_config.search_request_serializer(
+            # This query string does not matter, ultimately, as pook is mocking
+            # the ES response regardless of the input
+            data={"q": "bird perched"},
+            context={"media_type": image_media_type_config.media_type},
+        )
+        serializer.is_valid()
+
+        with capture_logs() as cap_logs:
+            results, _, _, _ = query_media(
+                search_params=serializer,
+                ip=0,
+                origin_index=image_media_type_config.origin_index,
+                exact_index=True,
+                page=1,
+                page_size=2,
+                filter_dead=True,
+            )
+
+    messages = [record["event"] for record in cap_logs]
+    assert "Backfill round limit reached" in messages
+    assert results == []
+    # The initial request followed by one request per backfill round
+    assert mock_search.total_matches == 1 + search_controller.BACKFILL_ROUND_LIMIT
+
+
+def test_post_process_results_cancels_prefetch_on_failure(monkeypatch):
+    prefetches = []
+
+    async def get_es_response(s, es_query):
+        if es_query == "postprocess_search" and prefetches == []:
+            # The first backfill slice is fetched without speculation.
+            prefetches.append(None)
+            return ["hit"] * 4
+        prefetches.append(asyncio.current_task())
+        await asyncio.sleep(10)
+
+    async def check_dead_links(query_hash, start, results):
+        if start == 0:
+            results[:] = []
+        else:
+            raise ValueError("Link validation failed")
+
+    monkeypatch.setattr(search_controller, "get_query_hash", lambda s: "hash")
+    monkeypatch.setattr(search_controller, "check_dead_links", check_dead_links)
+    monkeypatch.setattr(search_controller, "get_es_response", get_es_response)
+    search_results = mock.MagicMock()
+    search_results.__iter__.return_value = iter(["hit"] * 4)
+    search_results.hits.total.value = 1000
+
+    async def post_process():
+        with pytest.raises(ValueError):
+            await search_controller._post_process_results(
+                mock.MagicMock(), 0, 4, 2, search_results, True
+            )
+        # Let the cancellation of the speculative request go through.
+        await asyncio.sleep(0)
+        return prefetches[-1]
+
+    prefetch = async_to_sync(post_process)()
+
+    assert len(prefetches) == 2
+    assert prefetch.cancelled()
+
+
+def test_post_process_results_does_not_record_prefetch_timings(monkeypatch):
+    async def get_es_response(s, es_query):
+        count("es_query")
+        return ["hit"] * 4
+
+    validated_slices = []
+
+    async def check_dead_links(query_hash, start, results):
+        validated_slices.append(start)
+        # The initial slice and the first backfill slice are all dead, so the
+        # slice prefetched during the first backfill round is needed.
+        if len(validated_slices) <= 2:
+            results[:] = []
+
+    monkeypatch.setattr(search_controller, "get_query_hash", lambda s: "hash")
+    monkeypatch.setattr(search_controller, "check_dead_links", check_dead_links)
+    monkeypatch.setattr(search_controller, "get_es_response", get_es_response)
+    search_results = mock.MagicMock()
+    search_results.__iter__.return_value = iter(["hit"] * 4)
+    search_results.hits.total.value = 1000
+
+    with record_request() as timings:
+        async_to_sync(search_controller._post_process_results)(
+            mock.MagicMock(), 0, 4, 2, search_results, True
+        )
+
+    # Only the first backfill slice is fetched by the request itself; the
+    # wait for the prefetched slice is recorded as its ``es`` time instead.
+    assert len(validated_slices) == 3
+    assert timings.counts == {"es_query": 1}
+    assert "es" in timings.durations
+
+
+@pytest.mark.parametrize(
+    "enabled, page_hit_count, expected",
+    (
+        (True, 20, True),
+        (False, 20, False),
+        # A short page is the last one
+        (True, 12, False),
+    ),
+)
+@mock.patch("api.controllers.search_controller._prevalidate_page")
+@mock.patch("api.controllers.search_controller._post_process_results")
+def test_execute_search_schedules_next_page_prevalidation(
+    mock_post_process_results,
+    mock_prevalidate_page,
+    enabled,
+    page_hit_count,
+    expected,
+    media_type_config,
+    settings,
+    monkeypatch,
+):
+    settings.LINK_VALIDATION_PREVALIDATE_NEXT_PAGE = enabled
+    monkeypatch.setattr(search_controller, "_prevalidation_tasks", {})
+    media_with_hits = media_type_config.model_factory.create_batch(
+        size=page_hit_count, with_hit=True
+    )
+    mock_post_process_results.return_value = [hit for _, hit in media_with_hits]
+    # The search response must report more hits than fit on the first page.
+    search_response = mock.MagicMock()
+    search_response.hits.total.value = 1000
+
+    mock_get_es_response = mock.AsyncMock(return_value=search_response)
+
+    with mock.patch.object(search_controller, "get_es_response", mock_get_es_response):
+        async_to_sync(search_controller.execute_search)(
+            AsyncSearch(index=media_type_config.origin_index),
             page=1,
-            page_size=2,
+            page_size=20,
             filter_dead=True,
+            index=media_type_config.origin_index,
+            es_query="search",
         )
-    messages = [record["event"] for record in cap_logs]
-    assert "Nesting threshold breached" in messages
+
+    if expected:
+        mock_prevalidate_page.assert_called_once_with(mock.ANY, 2, 20)
+    else:
+        mock_prevalidate_page.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "enabled, other_index, expected_runs",
+    (
+        (True, False, 1),
+        # The index is part of the key.
+        (True, True, 2),
+        (False, False, 2),
+    ),
+)
+@mock.patch("api.controllers.search_controller.tally_results")
+def test_execute_search_coalesces_identical_searches(
+    mock_tally_results, enabled, other_index, expected_runs, settings, monkeypatch
+):
+    settings.SEARCH_COALESCING = enabled
+    monkeypatch.setattr(search_controller, "_inflight_searches", {})
+    runs = []
+
+    async def run_search(s, page, page_size, filter_dead, es_query):
+        runs.append(s)
+        await asyncio.sleep(0.01)
+        return 1, 1, ["hit"]
+
+    async def search_twice():
+        return await asyncio.gather(
+            *(
+                search_controller.execute_search(
+                    AsyncSearch(index=index).query("match", title="bird"),
+                    page=1,
+                    page_size=20,
+                    filter_dead=True,
+                    index=index,
+                    es_query="search",
+                )
+                for index in ("image", "audio" if other_index else "image")
+            )
+        )
+
+    with mock.patch.object(search_controller, "_run_search", run_search):
+        responses = async_to_sync(search_twice)()
+
+    assert len(runs) == expected_runs
+    assert responses == [(1, 1, ["hit"])] * 2
+    # Each request tallies its results.
+    assert mock_tally_results.call_count == 2
+    assert search_controller._inflight_searches == {}
+
+
+@pook.on
+def test_prevalidate_page_extends_query_mask(image_media_type_config, settings, redis):
+    hit_count = 10
+    live_hit_count = 7
+    mock_es_response = create_mock_es_http_image_search_response(
+        index=image_media_type_config.origin_index,
+        total_hits=45,
+        hit_count=hit_count,
+        live_hit_count=live_hit_count,
+    )
+    pook.post(
+        f"{settings.ES_ENDPOINT}/{image_media_type_config.origin_index}/_search"
+    ).times(1).reply(200).header("x-elastic-product", "Elasticsearch").json(
+        mock_es_response
+    )
+    pook.head(pook.regex(rf"{MOCK_LIVE_RESULT_URL_PREFIX}/\d")).times(
+        live_hit_count
+    ).reply(200)
+    pook.head(pook.regex(rf"{MOCK_DEAD_RESULT_URL_PREFIX}/\d")).times(
+        hit_count - live_hit_count
+    ).reply(404)
+
+    s = AsyncSearch(index=image_media_type_config.origin_index)
+    async_to_sync(search_controller._prevalidate_page)(s, 2, 5)
+
+    query_mask = get_query_mask(get_query_hash(s))
+    assert len(query_mask) == hit_count
+    assert query_mask.live_count == live_hit_count
 
 
 @pytest.mark.django_db
@@ -879,6 +1140,56 @@ def test_get_excluded_sources_query_returns_excluded(
         )
 
 
+@pytest.mark.django_db
+def test_get_excluded_sources_query_uses_local_cache(search_con_cache):
+    ContentSourceFactory.create(
+        created_on=datetime.now(tz=timezone.utc),
+        source_identifier="source1",
+        source_name="Source 1",
+        filter_content=True,
+    )
+    assert search_controller.get_excluded_sources_query() == Terms(source=["source1"])
+
+    # Served from the worker's memory without consulting Redis
+    search_con_cache.delete(
+        key=FILTERED_SOURCES_CACHE_KEY, version=FILTERED_SOURCES_CACHE_VERSION
+    )
+    with mock.patch.object(search_con_cache, "get") as mock_get:
+        assert search_controller.get_excluded_sources_query() == Terms(
+            source=["source1"]
+        )
+    mock_get.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_content_source_change_invalidates_excluded_sources(
+    search_con_cache, django_capture_on_commit_callbacks
+):
+    source = ContentSourceFactory.create(
+        created_on=datetime.now(tz=timezone.utc),
+        source_identifier="source1",
+        source_name="Source 1",
+        filter_content=True,
+    )
+    assert search_controller.get_excluded_sources_query() == Terms(source=["source1"])
+
+    source.filter_content = False
+    with django_capture_on_commit_callbacks(execute=True):
+        source.save()
+        # The sources are only invalidated once the change is committed.
+        assert search_controller.get_excluded_sources_query() == Terms(
+            source=["source1"]
+        )
+
+    assert (
+        search_con_cache.get(
+            key=FILTERED_SOURCES_CACHE_KEY, version=FILTERED_SOURCES_CACHE_VERSION
+        )
+        is None
+    )
+    assert search_controller.get_excluded_sources_query() is None
+
+
 @cache_availability_params
 def test_get_sources_returns_stats(is_cache_reachable, cache_name, request, caplog):
     cache = request.getfixturevalue(cache_name)
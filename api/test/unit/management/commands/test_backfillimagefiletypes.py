@@ -0,0 +1,65 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+import pook
+import pytest
+
+from api.models import Image
+from test.factory.models.image import ImageFactory
+
+
+pytestmark = pytest.mark.django_db
+
+
+def call_backfillimagefiletypes(**options) -> tuple[str, str]:
+    out = StringIO()
+    err = StringIO()
+    call_command("backfillimagefiletypes", stdout=out, stderr=err, **options)
+
+    return out.getvalue(), err.getvalue()
+
+
+@pytest.mark.pook
+def test_saves_file_types_from_content_type():
+    image = ImageFactory.create(url="https://example.com/image")
+    pook.head(image.url).reply(200).header("Content-Type", "image/png")
+
+    out, _ = call_backfillimagefiletypes()
+
+    assert "Resolving file types for 1 records" in out
+    image.refresh_from_db()
+    assert image.filetype == "png"
+
+
+@pytest.mark.pook
+def test_saves_file_types_from_url():
+    image = ImageFactory.create(url="https://example.com/image.jpg")
+
+    call_backfillimagefiletypes()
+
+    image.refresh_from_db()
+    assert image.filetype == "jpg"
+
+
+def test_does_not_reprocess_known_file_types():
+    ImageFactory.create(url="https://example.com/image", filetype="gif")
+
+    out, _ = call_backfillimagefiletypes()
+
+    assert "Resolving file types for 0 records" in out
+
+
+@pytest.mark.pook
+def test_reports_images_that_cannot_be_processed():
+    failing_image = ImageFactory.create(url="https://example.com/failing")
+    image = ImageFactory.create(url="https://example.com/image")
+    pook.head(failing_image.url).reply(500)
+    pook.head(image.url).reply(200).header("Content-Type", "image/jpeg")
+
+    out, err = call_backfillimagefiletypes()
+
+    assert f"Unable to process {failing_image.identifier}" in err
+    assert str(failing_image.identifier) in out
+    assert Image.objects.get(identifier=failing_image.identifier).filetype is None
+    assert Image.objects.get(identifier=image.identifier).filetype == "jpg"
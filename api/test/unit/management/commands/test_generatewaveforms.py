@@ -1,4 +1,4 @@
-import subprocess
+import asyncio
 from io import StringIO
 from unittest import mock
 
@@ -7,9 +7,17 @@ from django.db import connections
 from django.test.utils import CaptureQueriesContext
 
 import pytest
+from asgiref.sync import async_to_sync
 from psycopg.errors import NotNullViolation
 
+from api.management.commands import generatewaveforms
+from api.management.commands.generatewaveforms import (
+    PAGE_SIZE,
+    PROGRESS_KEY,
+    HostRateLimiter,
+)
 from api.models.audio import Audio, AudioAddOn
+from api.utils.waveform import WaveformGenerationFailure
 from test.factory.faker import WaveformProvider
 from test.factory.models.audio import AudioAddOnFactory, AudioFactory
 
@@ -17,12 +25,16 @@ from test.factory.models.audio import AudioAddOnFactory, AudioFactory
 pytestmark = pytest.mark.django_db
 
 
-@mock.patch("api.models.audio.generate_peaks")
-def call_generatewaveforms(mock_generate_peaks: mock.MagicMock) -> tuple[str, str]:
+@mock.patch("api.models.audio.agenerate_peaks")
+def call_generatewaveforms(
+    mock_generate_peaks: mock.AsyncMock, **options
+) -> tuple[str, str]:
     mock_generate_peaks.side_effect = lambda _: WaveformProvider.generate_waveform()
     out = StringIO()
     err = StringIO()
-    call_command("generatewaveforms", no_rate_limit=True, stdout=out, stderr=err)
+    call_command(
+        "generatewaveforms", no_rate_limit=True, stdout=out, stderr=err, **options
+    )
 
     return out.getvalue(), err.getvalue()
 
@@ -67,30 +79,30 @@ def test_does_not_reprocess_existing_waveforms():
     assert_all_audio_have_waveforms()
 
 
-@mock.patch("api.models.audio.generate_peaks")
+@mock.patch("api.models.audio.agenerate_peaks")
 def test_paginates_audio_waveforms_to_generate(
     mock_generate_peaks, django_assert_num_queries
 ):
     mock_generate_peaks.return_value = WaveformProvider.generate_waveform()
 
-    audio_count = 53  # 6 pages
-    pages = 6
+    pages = 3
+    audio_count = PAGE_SIZE * (pages - 1) + 3
     AudioFactory.create_batch(audio_count)
 
     test_audio = AudioFactory.create()
     with CaptureQueriesContext(connections["default"]) as capture:
-        test_audio.get_or_create_waveform()
+        async_to_sync(test_audio.aget_or_create_waveform)()
     test_audio.delete()
 
     queries_per_iteration = len(capture.captured_queries)
 
-    # 1 per page + the final empty page's query
-    pagination_queries = pages + 1
+    # 1 per page, the last page being known from the count
+    pagination_queries = pages
 
     # initializes the count for tqdm
     count_queries = 1
 
-    # queries inside get_or_create_waveform
+    # queries inside aget_or_create_waveform
     interation_queries = queries_per_iteration * audio_count
 
     expected_queries = interation_queries + pagination_queries + count_queries
@@ -105,9 +117,9 @@ def test_paginates_audio_waveforms_to_generate(
     ("exception_class", "exception_args", "exception_kwargs"),
     (
         (
-            subprocess.CalledProcessError,
-            (1, "audiowaveform"),
-            {"stderr": b"This is an error string"},
+            WaveformGenerationFailure,
+            tuple(),
+            dict(),
         ),
         (
             NotNullViolation,
@@ -116,7 +128,7 @@ def test_paginates_audio_waveforms_to_generate(
         ),
     ),
 )
-@mock.patch("api.models.audio.generate_peaks")
+@mock.patch("api.models.audio.agenerate_peaks")
 def test_logs_and_continues_if_waveform_generation_fails(
     mock_generate_peaks, exception_class, exception_args, exception_kwargs
 ):
@@ -149,7 +161,7 @@ def test_logs_and_continues_if_waveform_generation_fails(
     )
 
 
-@mock.patch("api.models.audio.generate_peaks")
+@mock.patch("api.models.audio.agenerate_peaks")
 def test_keyboard_interrupt_should_halt_processing(mock_generate_peaks):
     audio_count = 23
     interrupt_at = 9
@@ -165,7 +177,9 @@ def test_keyboard_interrupt_should_halt_processing(mock_generate_peaks):
 
     out = StringIO()
     err = StringIO()
-    call_command("generatewaveforms", no_rate_limit=True, stdout=out, stderr=err)
+    call_command(
+        "generatewaveforms", no_rate_limit=True, concurrency=1, stdout=out, stderr=err
+    )
 
     failed_audio = Audio.objects.exclude(
         identifier__in=AudioAddOn.objects.filter(
@@ -178,3 +192,72 @@ def test_keyboard_interrupt_should_halt_processing(mock_generate_peaks):
     assert (
         AudioAddOn.objects.filter(waveform_peaks__isnull=False).count() == interrupt_at
     )
+    assert "run with --resume to continue" in out.getvalue()
+
+
+def test_resumes_after_last_processed_page(redis):
+    audios = AudioFactory.create_batch(5)
+
+    call_generatewaveforms(max_records=2)
+    assert int(redis.get(PROGRESS_KEY)) == audios[1].id
+
+    # Without a waveform, the audio before the saved progress is skipped.
+    AudioAddOn.objects.filter(audio_identifier=audios[0].identifier).update(
+        waveform_peaks=None
+    )
+    out, _ = call_generatewaveforms(resume=True)
+
+    assert f"Resuming after ID {audios[1].id}" in out
+    assert "Generating waveforms for 3 records" in out
+    assert not AudioAddOn.objects.filter(
+        audio_identifier=audios[0].identifier, waveform_peaks__isnull=False
+    ).exists()
+    assert AudioAddOn.objects.filter(waveform_peaks__isnull=False).count() == 4
+
+
+@mock.patch("api.models.audio.agenerate_peaks")
+def test_keeps_concurrency_across_pages(mock_generate_peaks, monkeypatch):
+    monkeypatch.setattr(generatewaveforms, "PAGE_SIZE", 2)
+    running = []
+    peak_concurrency = 0
+
+    async def generate_peaks(audio):
+        nonlocal peak_concurrency
+        running.append(audio)
+        peak_concurrency = max(peak_concurrency, len(running))
+        await asyncio.sleep(0.1)
+        running.remove(audio)
+        return WaveformProvider.generate_waveform()
+
+    mock_generate_peaks.side_effect = generate_peaks
+    AudioFactory.create_batch(6)
+
+    call_command("generatewaveforms", no_rate_limit=True, concurrency=3)
+
+    assert peak_concurrency == 3
+    assert_all_audio_have_waveforms()
+
+
+def test_host_rate_limiter_spaces_out_requests_per_host():
+    interval = 0.2
+
+    async def wait_all():
+        rate_limiter = HostRateLimiter(interval)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        async def wait(url):
+            await rate_limiter.wait(url)
+            return loop.time() - start
+
+        return await asyncio.gather(
+            wait("https://a.example/1.mp3"),
+            wait("https://a.example/2.mp3"),
+            wait("https://b.example/1.mp3"),
+        )
+
+    first, second, other_host = async_to_sync(wait_all)()
+
+    assert first < interval / 2
+    assert second >= interval * 0.9
+    assert other_host < interval / 2
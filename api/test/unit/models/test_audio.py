@@ -1,9 +1,12 @@
+import asyncio
 import uuid
 from unittest import mock
 
 import pytest
+from asgiref.sync import async_to_sync
 
 from api.models.audio import Audio, AudioAddOn
+from api.utils.waveform import WaveformGenerationInProgress
 from test.factory.faker import WaveformProvider
 
 
@@ -20,24 +23,92 @@ def audio_fixture():
 
 
 @pytest.mark.django_db
-@mock.patch("api.models.audio.generate_peaks")
+@mock.patch("api.models.audio.agenerate_peaks")
 def test_audio_waveform_caches(generate_peaks_mock, audio_fixture):
     mock_waveform = WaveformProvider.generate_waveform()
     generate_peaks_mock.return_value = mock_waveform
 
+    async def get_waveforms():
+        first = await audio_fixture.aget_or_create_waveform()
+        # Ensure the waveform was saved
+        addon = await AudioAddOn.objects.aget(audio_identifier=audio_fixture.identifier)
+        assert addon.waveform_peaks == mock_waveform
+        return first, await audio_fixture.aget_or_create_waveform()
+
     assert AudioAddOn.objects.count() == 0
-    assert audio_fixture.get_or_create_waveform() == mock_waveform
+    assert async_to_sync(get_waveforms)() == (mock_waveform, mock_waveform)
     assert AudioAddOn.objects.count() == 1
-    # Ensure the waveform was saved
-    assert (
-        AudioAddOn.objects.get(audio_identifier=audio_fixture.identifier).waveform_peaks
-        == mock_waveform
-    )
-    assert audio_fixture.get_or_create_waveform() == mock_waveform
-    # Should only be called once if Audio.get_or_create_waveform is using the DB value on subsequent calls
+    # Should only be called once if Audio.aget_or_create_waveform is using the DB value on subsequent calls
     generate_peaks_mock.assert_called_once()
 
     # Ensure there are no foreign constraints on the AudioAddOn that would cause failures during refresh
     audio_fixture.delete()
 
     assert AudioAddOn.objects.count() == 1
+
+
+@pytest.mark.django_db
+@mock.patch("api.models.audio.agenerate_peaks")
+def test_audio_waveform_is_generated_once_for_concurrent_requests(
+    generate_peaks_mock, audio_fixture
+):
+    mock_waveform = WaveformProvider.generate_waveform()
+
+    async def generate_peaks(_):
+        await asyncio.sleep(0.1)
+        return mock_waveform
+
+    generate_peaks_mock.side_effect = generate_peaks
+
+    async def get_waveforms():
+        return await asyncio.gather(
+            audio_fixture.aget_or_create_waveform(),
+            audio_fixture.aget_or_create_waveform(),
+        )
+
+    assert async_to_sync(get_waveforms)() == [mock_waveform, mock_waveform]
+    generate_peaks_mock.assert_called_once()
+
+
+@pytest.mark.django_db
+@mock.patch("api.models.audio.agenerate_peaks")
+def test_audio_waveform_waits_for_other_workers(
+    generate_peaks_mock, audio_fixture, redis, settings
+):
+    settings.WAVEFORM_LOCK_TIMEOUT_SECONDS = 5
+    mock_waveform = WaveformProvider.generate_waveform()
+    lock_key = f"waveform_lock:{audio_fixture.identifier}"
+    redis.set(lock_key, "other-worker")
+
+    async def generate_in_other_worker():
+        await asyncio.sleep(0.2)
+        await AudioAddOn.objects.filter(
+            audio_identifier=audio_fixture.identifier
+        ).aupdate(waveform_peaks=mock_waveform)
+        redis.delete(lock_key)
+
+    async def get_waveform():
+        waveform, _ = await asyncio.gather(
+            audio_fixture.aget_or_create_waveform(wait=True),
+            generate_in_other_worker(),
+        )
+        return waveform
+
+    assert async_to_sync(get_waveform)() == mock_waveform
+    generate_peaks_mock.assert_not_called()
+    assert redis.get(lock_key) is None
+
+
+@pytest.mark.django_db
+@mock.patch("api.models.audio.agenerate_peaks")
+def test_audio_waveform_does_not_wait_for_other_workers_by_default(
+    generate_peaks_mock, audio_fixture, redis
+):
+    lock_key = f"waveform_lock:{audio_fixture.identifier}"
+    redis.set(lock_key, "other-worker")
+
+    with pytest.raises(WaveformGenerationInProgress):
+        async_to_sync(audio_fixture.aget_or_create_waveform)()
+
+    generate_peaks_mock.assert_not_called()
+    assert redis.get(lock_key) == b"other-worker"
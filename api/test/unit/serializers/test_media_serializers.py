@@ -3,11 +3,15 @@ import uuid
 from unittest.mock import MagicMock, patch
 
 import pytest
+from elasticsearch_dsl.response import Hit
 
 from api.constants import sensitivity
 from api.serializers.audio_serializers import AudioSearchRequestSerializer
 from api.serializers.image_serializers import ImageSearchRequestSerializer
-from api.serializers.media_serializers import MediaSearchRequestSerializer
+from api.serializers.media_serializers import (
+    MediaSearchRequestSerializer,
+    MediaSerializer,
+)
 
 
 @pytest.fixture
@@ -240,3 +244,38 @@ def test_report_serializer_accepts_mature_reason(media_type_config):
     serializer.is_valid(raise_exception=True)
 
     assert serializer.validated_data["reason"] == "mature"
+
+
+@pytest.mark.django_db
+def test_list_serializer_matches_item_serializer(media_type_config, anon_request):
+    media_type_config.model_factory.create(meta_data={})
+    media_type_config.model_factory.create(creator_url="example.com/creator")
+    media_type_config.model_factory.create_batch(size=3)
+    items = list(media_type_config.model_class.objects.all())
+
+    serializer_class = media_type_config.model_serializer
+    context = {"request": anon_request, "validated_data": {}}
+    expected = [serializer_class(item, context=context).data for item in items]
+
+    serializer = serializer_class(items, many=True, context=context)
+    assert serializer.data == expected
+    # The fast path was taken.
+    assert serializer.child._accessors is not None
+
+
+@pytest.mark.parametrize(
+    "source",
+    (
+        {"license": "BY", "license_version": "4.0"},
+        # Hits from indexes created before the license fields were stored
+        {"license": "BY"},
+    ),
+)
+def test_attribution_record_of_hit_without_license_url(source):
+    hit = Hit({"_source": {"title": "Title", "creator": "Creator", **source}})
+
+    record = MediaSerializer._get_attribution_record(hit)
+
+    assert record["license"] == "by"
+    assert record["license_version"] == source.get("license_version")
+    assert record["license_url"] is None
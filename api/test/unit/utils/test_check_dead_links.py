@@ -1,16 +1,33 @@
+import time
 from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
 import aiohttp
 import pook
 import pytest
+from asgiref.sync import async_to_sync
 from elasticsearch_dsl.response import Hit
+from freezegun import freeze_time
 from structlog.testing import capture_logs
 
-from api.utils.check_dead_links import HEADERS, check_dead_links
+from api.utils.check_dead_links import HEADERS
+from api.utils.check_dead_links import check_dead_links as _check_dead_links
+from api.utils.check_dead_links.circuit_breaker import CircuitBreaker
+from api.utils.check_dead_links.status_cache import (
+    cache_statuses as _cache_statuses,
+)
+from api.utils.check_dead_links.status_cache import (
+    get_cached_statuses as _get_cached_statuses,
+)
 from test.factory.es_http import create_mock_es_http_image_hit
 
 
+check_dead_links = async_to_sync(_check_dead_links)
+cache_statuses = async_to_sync(_cache_statuses)
+get_cached_statuses = async_to_sync(_get_cached_statuses)
+
+
 def _make_hits(
     count: int, gen_fields: Callable[[int], dict[str, Any]] = lambda _: dict()
 ):
@@ -118,7 +135,7 @@ def test_403_considered_dead(provider):
     [(True, "redis"), (False, "unreachable_redis")],
 )
 def test_mset_and_expire_for_responses(is_cache_reachable, cache_name, request):
-    cache = request.getfixturevalue(cache_name)
+    request.getfixturevalue(cache_name)
 
     query_hash = "test_mset_and_expiry_for_responses"
     results = _make_hits(40)
@@ -135,10 +152,8 @@ def test_mset_and_expire_for_responses(is_cache_reachable, cache_name, request):
         check_dead_links(query_hash, start_slice, results)
 
     if is_cache_reachable:
-        for result in results:
-            assert cache.get(f"valid:{result.url}") == b"200"
-            # TTL is 30 days for 2xx responses
-            assert cache.ttl(f"valid:{result.url}") == 2592000
+        urls = [result.url for result in results]
+        assert get_cached_statuses(urls) == [200] * len(results)
     else:
         messages = [record["event"] for record in cap_logs]
         assert all(
@@ -148,3 +163,97 @@ def test_mset_and_expire_for_responses(is_cache_reachable, cache_name, request):
                 "Redis connect failed, cannot cache link liveness.",
             ]
         )
+
+
+def test_cached_statuses_expire(redis):
+    generation_seconds = int(timedelta(days=120).total_seconds())
+    next_generation = (time.time() // generation_seconds + 1) * generation_seconds
+    urls = ["https://example.com/live", "https://example.com/dead"]
+
+    with freeze_time(datetime.fromtimestamp(next_generation - 1, UTC)) as frozen_time:
+        cache_statuses({urls[0]: 200, urls[1]: 404})
+        assert get_cached_statuses(urls) == [200, 404]
+
+        # Statuses cached in the previous generation are still found...
+        frozen_time.tick(timedelta(days=1))
+        assert get_cached_statuses(urls) == [200, 404]
+
+        # ...until they expire. TTL is 30 days for 2xx responses.
+        frozen_time.tick(timedelta(days=30))
+        assert get_cached_statuses(urls) == [None, 404]
+
+
+def test_buckets_expire_with_their_statuses(redis):
+    cache_statuses({"https://example.com/timeout": -1})
+
+    (key,) = redis.keys("valid_digest:*")
+    # Statuses that time out are cached for 30 minutes.
+    assert 0 < redis.ttl(key) <= 2 * timedelta(minutes=30).total_seconds()
+
+
+@pytest.mark.parametrize("read_legacy_keys", (True, False))
+def test_reads_legacy_cached_statuses(read_legacy_keys, settings, redis):
+    settings.LINK_VALIDATION_CACHE_READ_LEGACY_KEYS = read_legacy_keys
+    urls = ["https://example.com/hashed", "https://example.com/legacy"]
+    cache_statuses({urls[0]: 200})
+    redis.set(f"valid:{urls[1]}", 404)
+
+    expected = [200, 404] if read_legacy_keys else [200, None]
+    assert get_cached_statuses(urls) == expected
+
+
+@pook.on
+def test_short_circuits_failing_hosts(monkeypatch, settings, redis):
+    settings.LINK_VALIDATION_CIRCUIT_FAILURE_THRESHOLD = 5
+    results = _make_hits(40)
+
+    async def raise_timeout_error(*args, **kwargs):
+        raise aiohttp.ServerTimeoutError()
+
+    with monkeypatch.context() as m:
+        m.setattr(aiohttp.ClientSession, "_request", raise_timeout_error)
+        check_dead_links("test_short_circuits_failing_hosts", 0, results)
+
+    # The failures of the first batch open the circuit for the host...
+    assert len(results) == 0
+
+    # Forget the cached statuses of the first batch.
+    redis.flushall()
+    results = _make_hits(40)
+    head_mock = (
+        pook.head(pook.regex(r"https://example.com/openverse-live-image-result-url/\d"))
+        .times(len(results))
+        .reply(200)
+        .mock
+    )
+    with capture_logs() as logs:
+        check_dead_links("test_short_circuits_failing_hosts_2", 0, results)
+
+    # ...so the next batch is not requested, but the results are kept as their
+    # status is unknown.
+    assert head_mock.calls == 0
+    assert len(results) == 40
+
+    stats = next(
+        log for log in logs if log["event"] == "link_validation_provider_stats"
+    )
+    assert stats["short_circuited"] == 40
+
+
+def test_circuit_closes_after_cooldown(settings):
+    settings.LINK_VALIDATION_CIRCUIT_FAILURE_THRESHOLD = 2
+    settings.LINK_VALIDATION_CIRCUIT_COOLDOWN_SECONDS = 60
+    breaker = CircuitBreaker()
+
+    with freeze_time() as frozen_time:
+        breaker.record_failure("example.com")
+        assert not breaker.is_open("example.com")
+        breaker.record_failure("example.com")
+        assert breaker.is_open("example.com")
+
+        frozen_time.tick(61)
+        assert not breaker.is_open("example.com")
+
+        breaker.record_success("example.com")
+        breaker.record_failure("example.com")
+        assert not breaker.is_open("example.com")
@@ -0,0 +1,67 @@
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from elasticsearch_dsl import Search
+
+from api.utils.dead_link_mask import QueryMask, get_query_hash
+from api.utils.dead_link_mask import get_query_mask as _get_query_mask
+from api.utils.dead_link_mask import save_query_mask as _save_query_mask
+
+
+get_query_mask = async_to_sync(_get_query_mask)
+save_query_mask = async_to_sync(_save_query_mask)
+
+
+def test_query_hash_ignores_pagination():
+    s = Search(index="image").query("match", title="cat")
+
+    assert get_query_hash(s[0:20]) == get_query_hash(s[40:60])
+    assert get_query_hash(s) != get_query_hash(s.query("match", title="dog"))
+
+
+def test_query_hash_is_memoized():
+    s = Search(index="image").query("match", title="cat")
+    query_hash = get_query_hash(s)
+
+    with mock.patch.object(Search, "to_dict") as mock_to_dict:
+        assert get_query_hash(s) == query_hash
+    mock_to_dict.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "mask",
+    [[], [1], [0], [1, 0, 1, 1, 0, 0, 1, 0], [0, 1, 1, 0, 1, 0, 0, 1, 1]],
+)
+def test_query_mask_round_trip(mask):
+    query_mask = QueryMask.from_list(mask)
+
+    assert query_mask.to_list() == mask
+    assert len(query_mask) == len(mask)
+    assert query_mask.live_count == sum(mask)
+
+
+def test_query_mask_live_position():
+    query_mask = QueryMask.from_list([0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1])
+
+    assert query_mask.live_position(1) == 1
+    assert query_mask.live_position(2) == 9
+    assert query_mask.live_position(3) == 10
+    with pytest.raises(ValueError):
+        query_mask.live_position(4)
+
+
+def test_save_query_mask_stores_bitmap(redis):
+    save_query_mask("hash", [1, 0, 1, 1, 0, 0, 0, 0, 1])
+
+    assert redis.get("hash:dead_link_mask") == b"\xb0\x80"
+    assert redis.bitcount("hash:dead_link_mask") == 4
+    assert get_query_mask("hash").to_list() == [1, 0, 1, 1, 0, 0, 0, 0, 1]
+
+
+def test_get_query_mask_returns_empty_mask_if_absent():
+    assert not get_query_mask("hash")
+
+
+def test_get_query_mask_returns_empty_mask_if_redis_unavailable(unreachable_redis):
+    assert not get_query_mask("hash")
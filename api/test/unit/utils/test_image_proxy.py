@@ -1,10 +1,13 @@
 import asyncio
 import contextlib
+import gzip
 from dataclasses import replace
+from unittest import mock
 from urllib.parse import urlencode
 from uuid import uuid4
 
 from django.conf import settings
+from django.http import HttpResponse
 from rest_framework.exceptions import UnsupportedMediaType
 
 import aiohttp
@@ -23,8 +26,10 @@ from api.utils.image_proxy import (
     UpstreamThumbnailException,
     extension,
 )
+from api.utils.image_proxy import cache as image_proxy_cache
 from api.utils.image_proxy import get as _photon_get
-from api.utils.tallies import get_monthly_timestamp
+from api.utils.image_proxy.prewarm import ThumbnailPrewarmer
+from api.utils.tallies import TallyBuffer, get_monthly_timestamp
 from test.factory.models.image import ImageFactory
 
 
@@ -83,7 +88,14 @@ def auth_key():
 # While the transaction workaround technically works, it is
 # tedious, easy to forget, and just wrapping tested functions
 # with async_to_sync is much easier
-photon_get = async_to_sync(_photon_get)
+async def _photon_get_and_read(*args, **kwargs) -> HttpResponse:
+    response = await _photon_get(*args, **kwargs)
+    # Read the streamed body in the loop of the upstream response.
+    content = b"".join([chunk async for chunk in response.streaming_content])
+    return HttpResponse(content, status=response.status_code)
+
+
+photon_get = async_to_sync(_photon_get_and_read)
 
 
 @pytest.mark.pook
@@ -309,7 +321,7 @@ def test_get_successful_records_response_code(
             assert cache.get(key) == b"1"
     else:
         messages = [record["event"] for record in cap_logs]
-        assert "Redis connect failed, thumbnail response codes not tallied." in messages
+        assert "Redis connect failed, thumbnail bookkeeping not recorded." in messages
 
 
 alert_count_params = pytest.mark.parametrize(
@@ -379,7 +391,7 @@ def test_get_exception_handles_error(
         assert cache.get(key) == str(count_start + 1).encode()
     else:
         messages = [record["event"] for record in cap_logs]
-        assert "Redis connect failed, thumbnail errors not tallied." in messages
+        assert "Redis connect failed, thumbnail bookkeeping not recorded." in messages
 
 
 @cache_availability_params
@@ -424,13 +436,7 @@ def test_get_http_exception_handles_error(
         )
     else:
         messages = [record["event"] for record in cap_logs]
-        assert all(
-            message in messages
-            for message in [
-                "Redis connect failed, thumbnail HTTP errors not tallied.",
-                "Redis connect failed, thumbnail errors not tallied.",
-            ]
-        )
+        assert "Redis connect failed, thumbnail bookkeeping not recorded." in messages
 
 
 @pytest.mark.pook
@@ -516,6 +522,32 @@ def test_caches_failures_with_successes_extending_tolerance(
         photon_get(TEST_MEDIA_INFO)
 
 
+@pytest.mark.pook
+def test_get_buffers_tallies_but_not_failures(
+    mock_image_data, settings, redis, monkeypatch
+):
+    settings.TALLY_BUFFER_FLUSH_INTERVAL_SECONDS = 60
+    buffer = TallyBuffer()
+    monkeypatch.setattr(buffer, "_start_flusher", lambda: None)
+    monkeypatch.setattr("api.utils.image_proxy.bookkeeping.tally_buffer", buffer)
+    pook.get(PHOTON_URL_FOR_TEST_IMAGE).reply(401)
+
+    with pytest.raises(UpstreamThumbnailException):
+        photon_get(TEST_MEDIA_INFO)
+
+    month = get_monthly_timestamp()
+    tally_key = f"thumbnail_http_error:{TEST_IMAGE_DOMAIN}:{month}:401"
+    failure_key = FAILURE_CACHE_KEY_TEMPLATE.format(
+        ident=str(TEST_MEDIA_INFO.media_identifier).replace("-", "")
+    )
+    # The failure counter must be current for the next request.
+    assert redis.get(failure_key) == b"1"
+    assert redis.get(tally_key) is None
+
+    buffer.flush()
+    assert redis.get(tally_key) == b"1"
+
+
 @pytest.mark.pook
 def test_get_successful_https_image_url_sends_ssl_parameter(mock_image_data):
     https_url = TEST_IMAGE_URL.replace("http://", "https://")
@@ -593,6 +625,18 @@ def test_get_extension_from_content_type(content_type, expected_ext):
     assert extension._get_file_extension_from_content_type(content_type) == expected_ext
 
 
+@pytest.mark.pook
+def test_get_image_extension_uses_known_filetype():
+    media_info = replace(
+        TEST_MEDIA_INFO,
+        image_url=TEST_IMAGE_URL.replace(".jpg", ""),
+        filetype="png",
+    )
+
+    # No ``HEAD`` request is mocked, so it would fail if it were sent.
+    assert async_to_sync(extension.get_image_extension)(media_info) == "png"
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize("image_type", ["apng", "tiff", "bmp"])
 def test_photon_get_raises_by_not_allowed_types(image_type):
@@ -897,3 +941,188 @@ def test_wikimedia_thumbnail_unknown_url_format():
             width=image.width,
         ),
     )
+
+
+@pytest.mark.pook
+def test_get_rejects_thumbnails_declared_too_large(mock_image_data, settings):
+    settings.THUMBNAIL_MAX_SIZE_BYTES = len(MOCK_BODY) - 1
+    (
+        pook.get(PHOTON_URL_FOR_TEST_IMAGE)
+        .reply(200)
+        .header("Content-Length", str(len(MOCK_BODY)))
+        .body(MOCK_BODY)
+    )
+
+    with pytest.raises(UpstreamThumbnailException, match="exceeds the maximum size"):
+        photon_get(TEST_MEDIA_INFO)
+
+
+@pytest.mark.pook
+def test_get_aborts_stream_of_thumbnails_too_large(mock_image_data, settings, redis):
+    settings.THUMBNAIL_MAX_SIZE_BYTES = len(MOCK_BODY) - 1
+    pook.get(PHOTON_URL_FOR_TEST_IMAGE).reply(200).body(MOCK_BODY)
+
+    async def stream():
+        response = await _photon_get(TEST_MEDIA_INFO)
+        return [chunk async for chunk in response.streaming_content]
+
+    # Without a declared size, the response is only aborted while streaming.
+    with (
+        mock.patch(
+            "aiohttp.ClientResponse.content_length",
+            new_callable=mock.PropertyMock,
+            return_value=None,
+        ),
+        pytest.raises(UpstreamThumbnailException, match="exceeds the maximum size"),
+    ):
+        async_to_sync(stream)()
+
+    month = get_monthly_timestamp()
+    key = (
+        "thumbnail_error:api.utils.image_proxy.exception.UpstreamThumbnailException:"
+        f"{TEST_IMAGE_DOMAIN}:{month}"
+    )
+    assert redis.get(key) == b"1"
+    failure_key = FAILURE_CACHE_KEY_TEMPLATE.format(
+        ident=str(TEST_MEDIA_INFO.media_identifier).replace("-", "")
+    )
+    assert redis.get(failure_key) == b"1"
+
+
+@pytest.mark.pook
+def test_get_does_not_forward_length_of_encoded_thumbnails(mock_image_data):
+    body = gzip.compress(MOCK_BODY.encode())
+    (
+        pook.get(PHOTON_URL_FOR_TEST_IMAGE)
+        .reply(200)
+        .header("Content-Encoding", "gzip")
+        .header("Content-Length", str(len(body)))
+        .body(body)
+    )
+
+    async def get():
+        response = await _photon_get(TEST_MEDIA_INFO)
+        async for _ in response.streaming_content:
+            pass
+        return response
+
+    # The length of the compressed body does not match the decompressed body
+    # served to the client.
+    response = async_to_sync(get)()
+    assert response.status_code == 200
+    assert not response.has_header("Content-Length")
+
+
+@pytest.fixture
+def thumbnail_cache(settings):
+    settings.THUMBNAIL_CACHE_MEMORY_BYTES = 1024 * 1024
+    settings.THUMBNAIL_CACHE_DIR = None
+    settings.THUMBNAIL_CACHE_TTL_SECONDS = 60
+    image_proxy_cache.thumbnail_cache.clear()
+    yield image_proxy_cache.thumbnail_cache
+    image_proxy_cache.thumbnail_cache.clear()
+
+
+@pytest.mark.pook
+def test_get_serves_fresh_thumbnails_from_cache(mock_image_data, thumbnail_cache):
+    upstream = pook.get(PHOTON_URL_FOR_TEST_IMAGE).times(1).reply(200).body(MOCK_BODY)
+
+    responses = [photon_get(TEST_MEDIA_INFO) for _ in range(2)]
+
+    assert [res.content for res in responses] == [MOCK_BODY.encode()] * 2
+    assert upstream.mock.total_matches == 1
+
+
+@pytest.mark.pook
+def test_get_revalidates_stale_thumbnails(mock_image_data, thumbnail_cache, settings):
+    pook.get(PHOTON_URL_FOR_TEST_IMAGE).reply(200).header("ETag", '"v1"').body(
+        MOCK_BODY
+    )
+    photon_get(TEST_MEDIA_INFO)
+
+    settings.THUMBNAIL_CACHE_TTL_SECONDS = 0
+    revalidation = (
+        pook.get(PHOTON_URL_FOR_TEST_IMAGE).header("If-None-Match", '"v1"').reply(304)
+    )
+    res = photon_get(TEST_MEDIA_INFO)
+
+    assert res.content == MOCK_BODY.encode()
+    assert revalidation.mock.total_matches == 1
+
+
+def test_disk_tier_evicts_least_recently_used(settings, tmp_path):
+    settings.THUMBNAIL_CACHE_DIR = str(tmp_path)
+    settings.THUMBNAIL_CACHE_DISK_BYTES = 400
+    disk = image_proxy_cache._DiskTier()
+
+    def entry(content):
+        return image_proxy_cache.CachedThumbnail(
+            content=content,
+            content_type="image/jpeg",
+            etag=None,
+            last_modified=None,
+            fetched_at=0,
+        )
+
+    disk.set("a", entry(b"a" * 100))
+    disk.set("b", entry(b"b" * 100))
+    assert disk.get("a").content == b"a" * 100
+    # Evicts ``b``, as ``a`` was used more recently.
+    disk.set("c", entry(b"c" * 100))
+
+    assert disk.get("b") is None
+    assert disk.get("a") == entry(b"a" * 100)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.thumb", "c.thumb"]
+
+
+@pytest.mark.pook
+def test_prewarmer_requests_first_thumbnails(mock_image_data, settings):
+    settings.THUMBNAIL_PREWARM_COUNT = 1
+    upstream = pook.get(PHOTON_URL_FOR_TEST_IMAGE).reply(200).body(MOCK_BODY)
+    prewarmer = ThumbnailPrewarmer()
+    other_media_info = replace(TEST_MEDIA_INFO, media_identifier=uuid4())
+
+    async def prewarm():
+        # Only the first thumbnail is requested, the other is not mocked.
+        prewarmer.schedule([TEST_MEDIA_INFO, other_media_info])
+        await prewarmer.join()
+        await prewarmer.close()
+
+    async_to_sync(prewarm)()
+
+    assert upstream.mock.total_matches == 1
+
+
+@pytest.mark.pook
+def test_prewarmer_does_not_record_failures(mock_image_data, settings, redis):
+    settings.THUMBNAIL_PREWARM_COUNT = 1
+    upstream = pook.get(PHOTON_URL_FOR_TEST_IMAGE).reply(500)
+    prewarmer = ThumbnailPrewarmer()
+
+    async def prewarm():
+        prewarmer.schedule([TEST_MEDIA_INFO])
+        await prewarmer.join()
+        await prewarmer.close()
+
+    async_to_sync(prewarm)()
+
+    assert upstream.mock.total_matches == 1
+    failure_key = FAILURE_CACHE_KEY_TEMPLATE.format(
+        ident=str(TEST_MEDIA_INFO.media_identifier).replace("-", "")
+    )
+    assert redis.get(failure_key) is None
+    month = get_monthly_timestamp()
+    assert redis.get(f"thumbnail_response_code:{month}:500") is None
+
+
+def test_prewarmer_skips_thumbnails_when_queue_is_full(settings):
+    settings.THUMBNAIL_PREWARM_COUNT = 3
+    settings.THUMBNAIL_PREWARM_QUEUE_SIZE = 2
+    settings.THUMBNAIL_PREWARM_CONCURRENCY = 0
+    prewarmer = ThumbnailPrewarmer()
+
+    async def schedule():
+        prewarmer.schedule([TEST_MEDIA_INFO] * 3)
+        return prewarmer._get_queue().qsize()
+
+    assert async_to_sync(schedule)() == 2
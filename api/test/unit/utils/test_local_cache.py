@@ -0,0 +1,91 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from freezegun import freeze_time
+
+from api.utils import local_cache
+from api.utils.local_cache import LocalCache, publish_invalidation
+
+
+@pytest.fixture
+def cache(settings):
+    settings.LOCAL_CACHE_TIMEOUT = 60
+    return LocalCache("test_cache")
+
+
+def test_get_returns_set_value(cache):
+    cache.set("key", ["value"])
+
+    assert cache.get("key") == ["value"]
+
+
+def test_get_returns_none_for_missing_key(cache):
+    assert cache.get("missing") is None
+
+
+def test_entries_expire(cache):
+    with freeze_time() as frozen_time:
+        cache.set("key", "value")
+
+        frozen_time.tick(timedelta(seconds=59))
+        assert cache.get("key") == "value"
+
+        frozen_time.tick(timedelta(seconds=1))
+        assert cache.get("key") is None
+
+
+def test_set_is_noop_when_disabled(cache, settings):
+    settings.LOCAL_CACHE_TIMEOUT = 0
+    cache.set("key", "value")
+
+    assert cache.get("key") is None
+
+
+@pytest.mark.parametrize(
+    "is_cache_reachable, cache_name",
+    [(True, "redis"), (False, "unreachable_redis")],
+)
+def test_publish_invalidation_clears_local_cache(
+    cache, is_cache_reachable, cache_name, request
+):
+    request.getfixturevalue(cache_name)
+    cache.set("key", "value")
+
+    publish_invalidation(cache.name)
+
+    assert cache.get("key") is None
+
+
+def test_published_invalidation_is_received(cache, redis):
+    other_cache = LocalCache("other_test_cache")
+    cache.set("key", "value")
+    other_cache.set("key", "value")
+
+    pubsub = redis.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(local_cache.INVALIDATION_CHANNEL)
+    redis.publish(local_cache.INVALIDATION_CHANNEL, cache.name)
+    # The first call may only consume the ignored subscription confirmation
+    message = pubsub.get_message(timeout=1) or pubsub.get_message(timeout=1)
+
+    local_cache._handle_invalidation(message)
+
+    assert cache.get("key") is None
+    assert other_cache.get("key") == "value"
+
+
+def test_listener_survives_errors(monkeypatch):
+    monkeypatch.setattr(local_cache, "LISTENER_RETRY_SECONDS", 0)
+    connect = mock.Mock(
+        side_effect=[
+            ValueError("Unexpected error"),
+            # Stop the listener once it retried after the error.
+            SystemExit,
+        ]
+    )
+    monkeypatch.setattr("django_redis.get_redis_connection", connect)
+
+    with pytest.raises(SystemExit):
+        local_cache._listen()
+
+    assert connect.call_count == 2
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from api.utils import redis_lock as redis_lock_module
+from api.utils.redis_lock import LockHeldError, redis_lock
+
+
+def test_redis_lock_is_held_for_the_block(redis):
+    async def hold():
+        async with redis_lock("test_lock", 5) as acquired:
+            return acquired, redis.get("test_lock")
+
+    acquired, token = async_to_sync(hold)()
+    assert acquired
+    assert token is not None
+    assert redis.get("test_lock") is None
+
+
+def test_redis_lock_waits_for_other_holder(redis):
+    redis.set("test_lock", "other-worker")
+
+    async def release_in_other_worker():
+        await asyncio.sleep(0.2)
+        redis.delete("test_lock")
+
+    async def hold():
+        async with redis_lock("test_lock", 5) as acquired:
+            return acquired
+
+    async def run():
+        acquired, _ = await asyncio.gather(hold(), release_in_other_worker())
+        return acquired
+
+    assert async_to_sync(run)()
+    assert redis.get("test_lock") is None
+
+
+def test_redis_lock_times_out(redis):
+    redis.set("test_lock", "other-worker")
+
+    async def hold():
+        async with redis_lock("test_lock", 0.2) as acquired:
+            return acquired
+
+    assert not async_to_sync(hold)()
+    assert redis.get("test_lock") == b"other-worker"
+
+
+def test_redis_lock_fails_without_blocking(redis):
+    redis.set("test_lock", "other-worker")
+
+    async def hold():
+        async with redis_lock("test_lock", 5, blocking=False):
+            pass
+
+    with pytest.raises(LockHeldError):
+        async_to_sync(hold)()
+    assert redis.get("test_lock") == b"other-worker"
+
+
+def test_redis_lock_is_renewed_while_held(redis, monkeypatch):
+    monkeypatch.setattr(redis_lock_module, "RENEWAL_INTERVAL", 0.1)
+
+    async def hold():
+        async with redis_lock("test_lock", 0.5):
+            await asyncio.sleep(1)
+            return redis.get("test_lock")
+
+    assert async_to_sync(hold)() is not None
+    assert redis.get("test_lock") is None
+
+
+def test_redis_lock_does_not_renew_lock_of_next_holder(redis, monkeypatch):
+    monkeypatch.setattr(redis_lock_module, "RENEWAL_INTERVAL", 0.1)
+
+    async def hold():
+        async with redis_lock("test_lock", 5):
+            # The lock expired and another worker acquired it.
+            redis.set("test_lock", "other-worker", px=2000)
+            await asyncio.sleep(1)
+
+    async_to_sync(hold)()
+    assert redis.get("test_lock") == b"other-worker"
+    assert redis.pttl("test_lock") <= 2000
+
+
+def test_redis_lock_does_not_release_lock_of_next_holder(redis):
+    async def hold():
+        async with redis_lock("test_lock", 5):
+            # The lock expired and another worker acquired it.
+            redis.set("test_lock", "other-worker")
+
+    async_to_sync(hold)()
+    assert redis.get("test_lock") == b"other-worker"
+
+
+def test_redis_lock_runs_block_without_redis(unreachable_redis):
+    async def hold():
+        async with redis_lock("test_lock", 5) as acquired:
+            return acquired
+
+    assert not async_to_sync(hold)()
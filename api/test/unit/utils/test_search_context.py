@@ -1,14 +1,17 @@
 import pook
 import pytest
+from asgiref.sync import async_to_sync
 
 from api.utils.search_context import SearchContext
 
 
 pytestmark = pytest.mark.django_db
 
+build_search_context = async_to_sync(SearchContext.build)
+
 
 def test_no_results(media_type_config):
-    search_context = SearchContext.build([], media_type_config.origin_index)
+    search_context = build_search_context([], media_type_config.origin_index)
 
     assert search_context == SearchContext(list(), set())
 
@@ -55,7 +58,7 @@ def test_sensitive_text(
             f"{settings.ES_ENDPOINT}/{media_type_config.filtered_index}/_search",
             reply=500,
         ) as mock:
-            search_context = SearchContext.build(
+            search_context = build_search_context(
                 result_ids, media_type_config.origin_index
             )
             assert mock.total_matches == 0, (
@@ -63,7 +66,9 @@ def test_sensitive_text(
             )
         pook.off()
     else:
-        search_context = SearchContext.build(result_ids, media_type_config.origin_index)
+        search_context = build_search_context(
+            result_ids, media_type_config.origin_index
+        )
 
     assert search_context == SearchContext(
         [r.identifier for r in results],
@@ -71,3 +76,35 @@ def test_sensitive_text(
         if has_sensitive_text and setting_enabled
         else set(),
     )
+
+
+def test_skips_lookup_for_filtered_index_results(media_type_config, settings):
+    settings.ENABLE_FILTERED_INDEX_QUERIES = True
+
+    results = [
+        hit
+        for _, hit in media_type_config.model_factory.create_batch(
+            size=5,
+            mature_reported=False,
+            provider_marked_mature=False,
+            sensitive_text=False,
+            with_hit=True,
+        )
+    ]
+    result_ids = [result.identifier for result in results]
+
+    with pook.post(
+        f"{settings.ES_ENDPOINT}/{media_type_config.filtered_index}/_search",
+        reply=500,
+    ) as mock:
+        search_context = build_search_context(
+            result_ids,
+            media_type_config.origin_index,
+            media_type_config.filtered_index,
+        )
+        assert mock.total_matches == 0, (
+            "There should be zero requests to ES for results from the filtered index"
+        )
+    pook.off()
+
+    assert search_context == SearchContext(result_ids, set())
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+import pytest
+from elasticsearch_dsl import Q
+from freezegun import freeze_time
+
+from api.utils import search_response_cache
+
+
+@pytest.fixture(autouse=True)
+def response_cache(django_cache, monkeypatch, settings):
+    settings.SEARCH_RESPONSE_CACHE_TIMEOUT = 60
+    settings.SEARCH_RESPONSE_CACHE_STALE_SECONDS = 30
+    monkeypatch.setattr("api.utils.search_response_cache.cache", django_cache)
+
+
+def test_cache_key_ignores_parameter_order():
+    key = search_response_cache.get_cache_key(
+        "image", "image-1", "api.test", {"q": "bird", "page": 1}
+    )
+
+    assert key == search_response_cache.get_cache_key(
+        "image", "image-1", "api.test", {"page": 1, "q": "bird"}
+    )
+    assert key != search_response_cache.get_cache_key(
+        "image", "image-2", "api.test", {"page": 1, "q": "bird"}
+    )
+
+
+def test_cache_key_depends_on_excluded_sources():
+    key = search_response_cache.get_cache_key(
+        "image", "image-1", "api.test", {"q": "bird"}
+    )
+
+    assert key != search_response_cache.get_cache_key(
+        "image", "image-1", "api.test", {"q": "bird"}, Q("terms", source=["flickr"])
+    )
+
+
+def test_responses_become_stale_before_expiring():
+    data = {"result_count": 1, "results": [{"id": "a"}]}
+
+    with freeze_time() as frozen_time:
+        search_response_cache.set_response("key", data)
+        assert search_response_cache.get_response("key") == (data, False)
+
+        frozen_time.tick(timedelta(seconds=60))
+        assert search_response_cache.get_response("key") == (data, True)
+
+
+def test_refresh_is_claimed_once():
+    assert search_response_cache.claim_refresh("key")
+    assert not search_response_cache.claim_refresh("key")
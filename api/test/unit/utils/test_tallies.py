@@ -1,7 +1,11 @@
+import threading
 from datetime import datetime
+from unittest import mock
 
 import pytest
+from asgiref.sync import async_to_sync
 from freezegun import freeze_time
+from redis.exceptions import TimeoutError as RedisTimeoutError
 from structlog.testing import capture_logs
 
 from api.utils import tallies
@@ -24,7 +28,7 @@ def test_count_provider_occurrences_uses_week_timestamp(now, expected_timestamp,
         {"provider": "stocksnap"} for _ in range(6)
     ]
     with freeze_time(now):
-        tallies.count_provider_occurrences(results, FAKE_MEDIA_TYPE)
+        async_to_sync(tallies.count_provider_occurrences)(results, FAKE_MEDIA_TYPE)
 
     assert (
         redis.get(f"provider_occurrences:{FAKE_MEDIA_TYPE}:{expected_timestamp}:flickr")
@@ -62,7 +66,7 @@ def test_count_provider_occurrences_increments_existing_tallies(redis):
     now = datetime(2023, 1, 19)  # 16th is start of week
     timestamp = "2023-01-16"
     with freeze_time(now):
-        tallies.count_provider_occurrences(results_1, FAKE_MEDIA_TYPE)
+        async_to_sync(tallies.count_provider_occurrences)(results_1, FAKE_MEDIA_TYPE)
 
     assert (
         redis.get(f"provider_occurrences:{FAKE_MEDIA_TYPE}:{timestamp}:flickr") == b"4"
@@ -83,7 +87,7 @@ def test_count_provider_occurrences_increments_existing_tallies(redis):
     )
 
     with freeze_time(now):
-        tallies.count_provider_occurrences(results_2, FAKE_MEDIA_TYPE)
+        async_to_sync(tallies.count_provider_occurrences)(results_2, FAKE_MEDIA_TYPE)
 
     assert (
         redis.get(f"provider_occurrences:{FAKE_MEDIA_TYPE}:{timestamp}:flickr") == b"7"
@@ -124,7 +128,88 @@ def test_writes_error_logs_for_redis_connection_errors(unreachable_redis):
     ]
     now = datetime(2023, 1, 19)  # 16th is start of week
     with capture_logs() as cap_logs, freeze_time(now):
-        tallies.count_provider_occurrences(results, FAKE_MEDIA_TYPE)
+        async_to_sync(tallies.count_provider_occurrences)(results, FAKE_MEDIA_TYPE)
 
     messages = [record["event"] for record in cap_logs]
     assert "Redis connect failed, cannot increment provider tallies." in messages
+
+
+@pytest.fixture
+def tally_buffer(settings, monkeypatch):
+    settings.TALLY_BUFFER_FLUSH_INTERVAL_SECONDS = 60
+    settings.TALLY_BUFFER_MAX_KEYS = 1000
+    buffer = tallies.TallyBuffer()
+    # The flusher thread would flush at unpredictable times.
+    monkeypatch.setattr(buffer, "_start_flusher", lambda: None)
+    monkeypatch.setattr(tallies, "tally_buffer", buffer)
+    return buffer
+
+
+def test_count_provider_occurrences_buffers_tallies(tally_buffer, redis):
+    results = [{"provider": "flickr"} for _ in range(4)]
+
+    now = datetime(2023, 1, 19)  # 16th is start of week
+    timestamp = "2023-01-16"
+    with freeze_time(now):
+        async_to_sync(tallies.count_provider_occurrences)(results, FAKE_MEDIA_TYPE)
+        async_to_sync(tallies.count_provider_occurrences)(results, FAKE_MEDIA_TYPE)
+
+    occurrences_key = f"provider_occurrences:{FAKE_MEDIA_TYPE}:{timestamp}:flickr"
+    searches_key = f"provider_appeared_in_searches:{FAKE_MEDIA_TYPE}:{timestamp}:flickr"
+    assert redis.get(occurrences_key) is None
+
+    tally_buffer.flush()
+
+    assert redis.get(occurrences_key) == b"8"
+    assert redis.get(searches_key) == b"2"
+
+
+def test_tally_buffer_requests_flush_when_full(tally_buffer, settings):
+    settings.TALLY_BUFFER_MAX_KEYS = 2
+
+    tally_buffer.add({"a": 1})
+    assert not tally_buffer._flush_requested.is_set()
+
+    tally_buffer.add({"b": 1})
+    assert tally_buffer._flush_requested.is_set()
+
+
+def test_tally_buffer_keeps_tallies_if_flush_fails(tally_buffer, unreachable_redis):
+    tally_buffer.add({"a": 1})
+
+    with capture_logs() as cap_logs:
+        tally_buffer.flush()
+
+    messages = [record["event"] for record in cap_logs]
+    assert "Redis connect failed, buffered tallies not flushed." in messages
+    assert tally_buffer._counts == {"a": 1}
+
+
+def test_tally_buffer_keeps_tallies_if_flush_times_out(tally_buffer, monkeypatch):
+    monkeypatch.setattr(
+        tally_buffer, "_write", mock.Mock(side_effect=RedisTimeoutError)
+    )
+    tally_buffer.add({"a": 1})
+
+    tally_buffer.flush()
+
+    assert tally_buffer._counts == {"a": 1}
+
+
+def test_tally_buffer_flusher_survives_errors(tally_buffer, settings, monkeypatch):
+    settings.TALLY_BUFFER_FLUSH_INTERVAL_SECONDS = 0.01
+    flushes = []
+
+    def flush():
+        flushes.append(None)
+        if len(flushes) == 1:
+            raise ValueError("Unexpected error")
+        # Stop the flusher once it flushed again after the error.
+        raise SystemExit
+
+    monkeypatch.setattr(tally_buffer, "flush", flush)
+    flusher = threading.Thread(target=tally_buffer._run, daemon=True)
+    flusher.start()
+    flusher.join(timeout=5)
+
+    assert len(flushes) == 2
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+
+from api.utils import timing
+from api.utils.timing import (
+    count,
+    record_request,
+    render_metrics,
+    render_server_timing,
+    stop_recording,
+    time_stage,
+)
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    timing.reset_metrics()
+    yield
+    timing.reset_metrics()
+
+
+def test_stages_are_summed_per_request():
+    with record_request() as timings:
+        with time_stage("es"):
+            pass
+        with time_stage("es"):
+            pass
+        count("link_cache_hit", 3)
+        count("link_cache_hit")
+
+    assert set(timings.durations) == {"es", "total"}
+    assert timings.counts == {"link_cache_hit": 4}
+
+
+def test_stages_are_ignored_outside_requests():
+    with time_stage("es"):
+        count("link_cache_hit")
+
+    assert "stage=" not in render_metrics()
+
+
+def test_stages_are_recorded_across_context_copies():
+    def sync_stage():
+        with time_stage("db"):
+            pass
+
+    async def request():
+        await sync_to_async(sync_stage)()
+        await asyncio.create_task(sync_to_async(count)("link_head_request"))
+
+    with record_request() as timings:
+        async_to_sync(request)()
+
+    assert "db" in timings.durations
+    assert timings.counts == {"link_head_request": 1}
+
+
+def test_stop_recording_only_affects_the_current_context():
+    async def background():
+        stop_recording()
+        count("link_head_request")
+
+    async def request():
+        await asyncio.create_task(background())
+        count("link_cache_miss")
+
+    with record_request() as timings:
+        async_to_sync(request)()
+
+    assert timings.counts == {"link_cache_miss": 1}
+
+
+def test_render_server_timing():
+    timings = timing.RequestTimings()
+    timings.durations["es"] = 12.345
+    timings.counts["link_cache_hit"] = 7
+
+    assert render_server_timing(timings) == 'es;dur=12.3, link_cache_hit;desc="7"'
+
+
+def test_render_metrics_has_cumulative_buckets():
+    for duration in (0.5, 7, 20000):
+        timings = timing.RequestTimings(route="image-list")
+        timings.durations["es"] = duration
+        timings.counts["link_head_request"] = 2
+        timing._observe(timings)
+
+    metrics = render_metrics()
+
+    bucket = "openverse_stage_duration_milliseconds_bucket"
+    labels = 'route="image-list",stage="es"'
+    assert f'{bucket}{{{labels},le="1"}} 1' in metrics
+    assert f'{bucket}{{{labels},le="10"}} 2' in metrics
+    assert f'{bucket}{{{labels},le="+Inf"}} 3' in metrics
+    assert f"openverse_stage_duration_milliseconds_count{{{labels}}} 3" in metrics
+    assert (
+        'openverse_stage_events_total{route="image-list",event="link_head_request"} 6'
+        in metrics
+    )
+
+
+def test_render_metrics_separates_routes():
+    for route, duration in (("image-list", 0.5), ("audio-detail", 7)):
+        timings = timing.RequestTimings(route=route)
+        timings.durations["es"] = duration
+        timing._observe(timings)
+
+    metrics = render_metrics()
+
+    metric = "openverse_stage_duration_milliseconds_count"
+    assert f'{metric}{{route="image-list",stage="es"}} 1' in metrics
+    assert f'{metric}{{route="audio-detail",stage="es"}} 1' in metrics
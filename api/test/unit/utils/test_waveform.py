@@ -1,10 +1,19 @@
 import json
+import struct
 from pathlib import Path
+from types import SimpleNamespace
 
 import pook
 import pytest
+from asgiref.sync import async_to_sync
 
-from api.utils.waveform import UA_STRING, download_audio, generate_waveform
+from api.utils.waveform import (
+    UA_STRING,
+    WaveformGenerationFailure,
+    agenerate_peaks,
+    get_input_format,
+    process_waveform_output,
+)
 
 
 _MOCK_AUDIO_PATH = Path(__file__).parent / ".." / ".." / "factory"
@@ -26,10 +35,17 @@ def mock_request():
         yield mock
 
 
-def test_download_audio_sends_ua_header(mock_request):
-    download_audio("http://example.org", "abcd-1234")
+def test_generate_peaks_sends_ua_header(mock_request):
+    audio = SimpleNamespace(
+        url="http://example.org/", identifier="abcd-1234", duration=26000
+    )
+
+    peaks = async_to_sync(agenerate_peaks)(audio)
+
     # ``pook`` will only match if UA header is sent.
     assert mock_request.total_matches > 0
+    assert len(peaks) > 0
+    assert max(peaks) == 1
 
 
 @pytest.mark.parametrize(
@@ -39,8 +55,65 @@ def test_download_audio_sends_ua_header(mock_request):
         ("sample-short-audio.mp3", 45),
     ],
 )
-def test_generate_waveform(audio, duration):
-    file_name = str(_MOCK_AUDIO_PATH.joinpath(audio))
+def test_generate_peaks(audio, duration):
+    url = f"http://example.org/{audio}"
+    with pook.use():
+        pook.get(url).reply(200).body((_MOCK_AUDIO_PATH / audio).read_bytes())
+        audio = SimpleNamespace(url=url, identifier="abcd-1234", duration=duration)
+
+        peaks = async_to_sync(agenerate_peaks)(audio)
+
+    assert len(peaks) > 0
+    assert all(0 <= peak <= 1 for peak in peaks)
+
+
+@pytest.mark.parametrize(
+    "url, mimetype, expected_format",
+    [
+        ("http://example.org/audio.mp3", None, "mp3"),
+        ("http://example.org/audio.OGA", None, "ogg"),
+        ("http://example.org/audio", "audio/mpeg", "mp3"),
+        ("http://example.org/audio", "audio/flac; charset=binary", "flac"),
+    ],
+)
+def test_get_input_format(url, mimetype, expected_format):
+    assert get_input_format(url, mimetype) == expected_format
+
+
+@pytest.mark.parametrize(
+    "url, mimetype",
+    [
+        ("http://example.org/audio", None),
+        ("http://example.org/audio.mid", "audio/midi"),
+    ],
+)
+def test_get_input_format_raises_for_unsupported_formats(url, mimetype):
+    with pytest.raises(WaveformGenerationFailure):
+        get_input_format(url, mimetype)
+
+
+def _make_dat(version: int, samples: list[int], channels: int = 1) -> bytes:
+    length = len(samples) // (2 * channels)
+    header = struct.pack("<iIiiI", version, 0, 44100, 256, length)
+    if version == 2:
+        header += struct.pack("<i", channels)
+    return header + struct.pack(f"<{len(samples)}h", *samples)
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_process_waveform_output(version):
+    dat_out = _make_dat(version, [-10, 10, -20, 20, -5, -1, -40, 40])
+
+    assert process_waveform_output(dat_out) == [0.25, 0.5, 0, 1]
+
+
+def test_process_waveform_output_uses_first_channel():
+    dat_out = _make_dat(2, [-10, 10, -99, 99, -20, 20, -99, 99], channels=2)
+
+    assert process_waveform_output(dat_out) == [0.5, 1]
+
+
+def test_process_waveform_output_handles_silence():
+    dat_out = _make_dat(1, [0, 0, 0, 0])
 
-    json_out = generate_waveform(file_name, duration)
-    assert len(json_out) > 0
+    assert process_waveform_output(dat_out) == [0, 0]
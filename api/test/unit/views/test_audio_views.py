@@ -1,4 +1,4 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 import pytest_django.asserts
@@ -26,7 +26,7 @@ def test_peaks_param_determines_addons(api_client, peaks, query_count):
     with (
         patch(
             "api.views.media_views.search_controller",
-            query_media=MagicMock(return_value=controller_ret),
+            query_media=AsyncMock(return_value=controller_ret),
         ),
         patch(
             "api.serializers.media_serializers.search_controller",
@@ -1,10 +1,14 @@
 import json
 from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pook
 import pytest
+import pytest_django.asserts
+from elasticsearch_dsl.response import Hit
 
 from api.views.image_views import ImageViewSet
+from test.factory.es_http import create_mock_es_http_image_hit
 from test.factory.models.image import ImageFactory
 
 
@@ -31,6 +35,50 @@ def test_oembed_sends_ua_header(api_client):
     assert res.status_code == 200
 
 
+@pytest.mark.django_db
+def test_list_serializes_hits_without_db(api_client, settings):
+    settings.SERIALIZE_SEARCH_RESULTS_FROM_ES = True
+    hit = Hit(
+        create_mock_es_http_image_hit(
+            _id=1,
+            index="image",
+            filesize=None,
+            filetype="jpg",
+            height=480,
+            width=640,
+            tags=[{"name": "bird", "provider": "example"}],
+        )
+    )
+    controller_ret = (
+        [hit],
+        1,  # num_pages
+        1,  # num_results
+        {},  # search_context
+    )
+    with (
+        patch(
+            "api.views.media_views.search_controller",
+            query_media=AsyncMock(return_value=controller_ret),
+        ),
+        patch(
+            "api.serializers.media_serializers.search_controller",
+            get_sources=MagicMock(return_value={}),
+        ),
+        pytest_django.asserts.assertNumQueries(0),
+    ):
+        res = api_client.get("/v1/images/")
+
+    assert res.status_code == 200
+    result = res.json()["results"][0]
+    assert result["id"] == hit.identifier
+    assert result["indexed_on"] == "2022-02-26T08:48:33Z"
+    assert result["height"] == 480
+    assert result["tags"] == [
+        {"name": "bird", "accuracy": None, "unstable__provider": "example"}
+    ]
+    assert result["attribution"].startswith('"Bird Nature Photo" by Nature\'s Beauty')
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize(
     "smk_has_thumb, expected_thumb_url",
@@ -1,11 +1,12 @@
 from datetime import datetime, timezone
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
 import pytest
 import pytest_django.asserts
 
 from api.models.models import ContentSource
+from api.utils import timing
 
 
 @pytest.mark.django_db
@@ -27,7 +28,7 @@ def test_list_query_count(api_client, media_type_config):
     with (
         patch(
             "api.views.media_views.search_controller",
-            query_media=MagicMock(return_value=controller_ret),
+            query_media=AsyncMock(return_value=controller_ret),
         ),
         patch(
             "api.serializers.media_serializers.search_controller",
@@ -91,3 +92,113 @@ def test_get_queryset_does_not_exclude_works_without_contentsource_entry(
     res = api_client.get(f"/v1/{media_type_config.url_prefix}/{media.identifier}/")
 
     assert res.status_code == 200
+
+
+@pytest.mark.parametrize(
+    "generations, expected_searches",
+    (
+        (["image-1", "image-1"], 1),
+        # A data refresh points the aliases to new indexes.
+        (["image-1", "image-2"], 2),
+    ),
+)
+@pytest.mark.django_db
+def test_list_serves_cached_responses(
+    api_client,
+    media_type_config,
+    settings,
+    django_cache,
+    monkeypatch,
+    generations,
+    expected_searches,
+):
+    settings.SEARCH_RESPONSE_CACHE_TIMEOUT = 60
+    monkeypatch.setattr("api.utils.search_response_cache.cache", django_cache)
+
+    results = media_type_config.model_factory.create_batch(size=2)
+    for result in results:
+        result.meta = None
+    query_media = AsyncMock(return_value=(results, 1, 2, {}))
+    tally_results = AsyncMock()
+
+    with (
+        patch(
+            "api.views.media_views.search_controller",
+            query_media=query_media,
+            tally_results=tally_results,
+            get_excluded_sources_query=MagicMock(return_value=None),
+            get_index=MagicMock(return_value=media_type_config.filtered_index),
+        ),
+        patch(
+            "api.serializers.media_serializers.search_controller",
+            get_sources=MagicMock(return_value={}),
+        ),
+        patch(
+            "api.views.media_views.get_index_generation",
+            AsyncMock(side_effect=generations),
+        ),
+    ):
+        responses = [
+            api_client.get(f"/v1/{media_type_config.url_prefix}/", {"q": "bird"})
+            for _ in generations
+        ]
+
+    assert query_media.await_count == expected_searches
+    # Responses served from the cache are tallied as well.
+    assert tally_results.await_count == len(generations) - expected_searches
+    assert responses[0].json() == responses[1].json()
+
+
+@pytest.mark.django_db
+def test_list_schedules_thumbnail_prewarming(api_client, media_type_config):
+    results = media_type_config.model_factory.create_batch(size=3)
+    for result in results:
+        result.meta = None
+
+    scheduled = []
+    prewarmer = MagicMock(is_enabled=True)
+    prewarmer.schedule.side_effect = lambda media_infos: scheduled.extend(media_infos)
+
+    with (
+        patch(
+            "api.views.media_views.search_controller",
+            query_media=AsyncMock(return_value=(results, 1, 3, {})),
+        ),
+        patch(
+            "api.serializers.media_serializers.search_controller",
+            get_sources=MagicMock(return_value={}),
+        ),
+        patch("api.views.media_views.thumbnail_prewarmer", prewarmer),
+    ):
+        res = api_client.get(f"/v1/{media_type_config.url_prefix}/")
+
+    assert res.status_code == 200
+    if media_type_config.media_type == "image":
+        assert [str(info.media_identifier) for info in scheduled] == [
+            str(result.identifier) for result in results
+        ]
+        assert [info.image_url for info in scheduled] == [
+            result.url for result in results
+        ]
+    else:
+        # Audio thumbnails are not part of the search results.
+        assert scheduled == []
+
+
+@pytest.mark.django_db
+def test_list_times_validation_once(api_client, media_type_config):
+    controller_ret = ([], 1, 0, {})
+    with (
+        patch(
+            "api.views.media_views.search_controller",
+            query_media=AsyncMock(return_value=controller_ret),
+        ),
+        patch(
+            "api.views.media_views.time_stage", wraps=timing.time_stage
+        ) as mock_time_stage,
+    ):
+        res = api_client.get(f"/v1/{media_type_config.url_prefix}/")
+
+    assert res.status_code == 200
+    stages = [call.args[0] for call in mock_time_stage.call_args_list]
+    assert stages.count("validation") == 1
@@ -0,0 +1,63 @@
+import pytest
+
+from api.utils import timing
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    timing.reset_metrics()
+    yield
+    timing.reset_metrics()
+
+
+@pytest.mark.django_db
+def test_responses_have_server_timing_header(api_client, settings):
+    settings.ENABLE_SERVER_TIMING_HEADER = True
+
+    res = api_client.get("/healthcheck/")
+
+    assert "total;dur=" in res.headers["Server-Timing"]
+
+
+@pytest.mark.django_db
+def test_server_timing_header_can_be_disabled(api_client, settings):
+    settings.ENABLE_SERVER_TIMING_HEADER = False
+
+    res = api_client.get("/healthcheck/")
+
+    assert "Server-Timing" not in res.headers
+
+
+def test_metrics_are_not_served_by_default(api_client, settings):
+    settings.ENABLE_METRICS_ENDPOINT = False
+
+    res = api_client.get("/metrics/")
+
+    assert res.status_code == 404
+
+
+@pytest.mark.django_db
+def test_metrics_include_previous_requests(api_client, settings):
+    settings.ENABLE_METRICS_ENDPOINT = True
+    api_client.get("/healthcheck/")
+
+    res = api_client.get("/metrics/")
+
+    assert res.status_code == 200
+    assert (
+        'openverse_stage_duration_milliseconds_count{route="health",stage="total"} 1'
+        in res.content.decode()
+    )
+
+
+@pytest.mark.django_db
+def test_metrics_label_unresolved_requests(api_client, settings):
+    settings.ENABLE_METRICS_ENDPOINT = True
+    api_client.get("/not-a-route/")
+
+    res = api_client.get("/metrics/")
+
+    assert (
+        'openverse_stage_duration_milliseconds_count{route="unresolved",stage="total"} 1'
+        in res.content.decode()
+    )
@@ -44,3 +44,23 @@ class TestImage:
         # Default to not flagged
         sfw = create_mock_image()
         assert not sfw["mature"]
+
+    @staticmethod
+    def test_stores_fields_for_api_serialization():
+        image = create_mock_image()
+        assert image.height == 500
+        assert image.width == 500
+        assert image.license_version == "4.0"
+        assert image.license_url == (
+            "https://creativecommons.org/licenses/by/2.0/fr/legalcode"
+        )
+        assert image.creator_url == "https://creativecommons.org"
+        assert image.foreign_landing_url == "https://creativecommons.org"
+
+    @staticmethod
+    def test_stores_tag_providers_for_api_serialization():
+        tags = [
+            {"name": "cat", "accuracy": 0.9, "provider": "clarifai"},
+            {"name": "dog", "provider": "flickr"},
+        ]
+        assert Image.parse_detailed_tags(tags) == tags
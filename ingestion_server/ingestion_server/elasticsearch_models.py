@@ -97,6 +97,9 @@ class Media(SyncableDocType):
         # cleanup tests in CI: test/unit_tests/test_cleanup.py
         category = row[schema["category"]] if "category" in schema else None
 
+        filesize = row[schema["filesize"]] if "filesize" in schema else None
+        filetype = row[schema["filetype"]] if "filetype" in schema else None
+
         provider = row[schema["provider"]]
         authority_boost = Media.get_authority_boost(meta, provider)
 
@@ -125,6 +128,13 @@ class Media(SyncableDocType):
             "tags": Media.parse_detailed_tags(row[schema["tags"]]),
             # Extra fields, not indexed
             "url": row[schema["url"]],
+            # Stored for the API to serialize search results without the database
+            "foreign_landing_url": row[schema["foreign_landing_url"]],
+            "creator_url": row[schema["creator_url"]],
+            "license_version": row[schema["license_version"]],
+            "license_url": Media.get_license_url(meta),
+            "filesize": filesize,
+            "filetype": filetype,
         }
 
     @staticmethod
@@ -202,6 +212,9 @@ class Media(SyncableDocType):
                 parsed_tag = {"name": tag["name"]}
                 if "accuracy" in tag:
                     parsed_tag["accuracy"] = tag["accuracy"]
+                # Stored, not indexed, for the API to serialize search results
+                if "provider" in tag:
+                    parsed_tag["provider"] = tag["provider"]
                 parsed_tags.append(parsed_tag)
         return parsed_tags
 
@@ -248,6 +261,8 @@ class Image(Media):
             aspect_ratio=aspect_ratio,
             extension=extension,
             size=size,
+            height=height,
+            width=width,
             **attrs,
         )
 
@@ -313,14 +328,12 @@ class Audio(Media):
     @staticmethod
     def database_row_to_elasticsearch_doc(row, schema):
         alt_files = row[schema["alt_files"]]
-        filetype = row[schema["filetype"]]
-        extension = Audio.get_extensions(filetype, alt_files)
         attrs = Audio.get_instance_attrs(row, schema)
+        extension = Audio.get_extensions(attrs["filetype"], alt_files)
         length = Audio.get_length(row[schema["duration"]])
 
         return Audio(
             length=length,
-            filetype=filetype,
             extension=extension,
             **attrs,
         )
@@ -1,5 +1,7 @@
 import re
-from dataclasses import dataclass
+from collections.abc import Iterable, Mapping
+from dataclasses import FrozenInstanceError, dataclass
+from functools import cached_property
 
 from openverse_attribution.data.all_licenses import all_licenses
 from openverse_attribution.license_name import LicenseName
@@ -10,9 +12,51 @@ KNOWN_ALIASES = {
     "mark": "pdm",
 }
 
+WHITESPACE = re.compile(r"\s{2,}")
+
+ALL_JURISDICTIONS = {jur for jurs in all_licenses.values() for jur in jurs}
+
+# Bounds the memory used by arguments that do not name a valid license.
+MAX_REGISTRY_SIZE = 4096
+
+
+class LicenseRegistry(type):
+    """
+    Intern ``License`` instances by the arguments used to create them.
+
+    Each combination of arguments is validated once, and later calls with the
+    same arguments return the same, immutable, instance. Invalid arguments are
+    remembered as well, and raise the same ``ValueError`` again.
+    """
+
+    def __init__(cls, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        cls._registry: dict[tuple, License | ValueError] = {}
+
+    def __call__(
+        cls,
+        slug: str,
+        version: str | None = None,
+        jurisdiction: str | None = None,
+    ):
+        key = (slug, version, jurisdiction)
+        lic = cls._registry.get(key)
+        if lic is None:
+            try:
+                lic = super().__call__(slug, version, jurisdiction)
+                lic._frozen = True
+            except ValueError as err:
+                lic = err
+            if len(cls._registry) < MAX_REGISTRY_SIZE:
+                cls._registry[key] = lic
+
+        if isinstance(lic, ValueError):
+            raise ValueError(*lic.args)
+        return lic
+
 
 @dataclass
-class License:
+class License(metaclass=LicenseRegistry):
     name: LicenseName
     ver: str | None
     jur: str | None
@@ -38,6 +82,7 @@ class License:
         :param slug: the slug for the license, from the ``LicenseName`` enum
         :param version: the version of the license
         :param jurisdiction: the jurisdiction of the license
+        :raise ValueError: if the license, version or jurisdiction are invalid
         """
 
         # Shorten long variable names
@@ -66,7 +111,7 @@ class License:
 
         # Validate jurisdiction against known jurisdictions.
         if jur is not None:
-            if all(jur not in item for item in all_licenses.values()):
+            if jur not in ALL_JURISDICTIONS:
                 raise ValueError(f"Jurisdiction `{jur}` does not exist.")
 
             if ver and jur not in all_licenses[ver].keys():
@@ -91,6 +136,11 @@ class License:
                     f"License `{slug}` does not accept version `{ver}` and jurisdiction `{jur}`."
                 )
 
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise FrozenInstanceError(f"cannot assign to field '{name}'")
+        super().__setattr__(name, value)
+
     def _deduce_ver(self) -> str | None:
         """
         Deduce version from slug and jurisdiction.
@@ -164,7 +214,7 @@ class License:
         else:
             raise ValueError(f"No version and jurisdiction match slug `{self.slug}`.")
 
-    @property
+    @cached_property
     def full_name(self) -> str:
         """
         Get the full name of the license.
@@ -182,7 +232,7 @@ class License:
             name = f"{name} {self.jur.upper()}"
         return name
 
-    @property
+    @cached_property
     def url(self) -> str:
         """
         Get the URL to the deed of this license.
@@ -238,39 +288,113 @@ class License:
         :return: the plain-text English language attribution
         """
 
-        title = f'"{title}"' if title else "This work"
+        return _format_attribution(
+            *self.attribution_parts, self.url, title, creator, url
+        )
+
+    @cached_property
+    def attribution_parts(self) -> tuple[str, str]:
+        """
+        Get the parts of the attribution text that only depend on the license.
 
-        attribution_template = (
-            "{title} {creator} {marked-licensed} {license}. {view-legal}"
+        :return: the statement of the license, and the start of the sentence
+            for viewing the legal text, which is followed by the URL
+        """
+
+        if self.name.is_pd:
+            return f"is marked with {self.full_name}.", "To view the terms, visit "
+        return (
+            f"is licensed under {self.full_name}.",
+            "To view a copy of this license, visit ",
         )
-        attribution_parts = {
-            "title": title,
-            "marked-licensed": "is marked with"
-            if self.name.is_pd
-            else "is licensed under",
-            "license": self.full_name,
-            "view-legal": "",
-            "creator": "",
-        }
-
-        if url is not False:
-            license_url = url or self.url
-            view_legal_template = "To view {terms-copy}, visit {url}."
-            view_legal_parts = {
-                "terms-copy": "the terms"
-                if self.name.is_pd
-                else "a copy of this license",
-                "url": license_url,
-            }
-            attribution_parts["view-legal"] = view_legal_template.format(
-                **view_legal_parts
-            )
 
-        if creator:
-            creator_template = "by {creator-name}"
-            creator_parts = {"creator-name": creator}
-            attribution_parts["creator"] = creator_template.format(**creator_parts)
 
-        attribution = attribution_template.format(**attribution_parts)
+def get_attribution_texts(records: Iterable[Mapping]) -> list[str | None]:
+    """
+    Get the attribution texts for many media items at once.
+
+    This produces the same text as ``License.get_attribution_text`` for each
+    record, but resolves every distinct license only once and fills in
+    templates prepared for the license, so the per-record cost stays low for
+    large batches.
+
+    Each record is a mapping with the ``license`` slug and the optional
+    ``license_version``, ``title``, ``creator`` and ``license_url`` keys. The
+    ``license_url`` is passed to ``get_attribution_text`` as ``url``.
+
+    :param records: the media items to attribute
+    :return: the attribution text of each record, or ``None`` if its license is
+        invalid
+    """
+
+    parts_by_license: dict[tuple, tuple[str, str, str] | None] = {}
+    texts = []
+    for record in records:
+        key = (record["license"], record.get("license_version"))
+        if key in parts_by_license:
+            license_parts = parts_by_license[key]
+        else:
+            try:
+                lic = License(*key)
+                license_parts = (*lic.attribution_parts, lic.url)
+            except ValueError:
+                license_parts = None
+            parts_by_license[key] = license_parts
+
+        if license_parts is None:
+            texts.append(None)
+            continue
+
+        texts.append(
+            _format_attribution(
+                *license_parts,
+                record.get("title"),
+                record.get("creator"),
+                record.get("license_url"),
+            )
+        )
 
-        return re.sub(r"\s{2,}", " ", attribution).strip()
+    return texts
+
+
+def _format_attribution(
+    statement: str,
+    view_legal: str,
+    default_url: str,
+    title: str | None,
+    creator: str | None,
+    url: str | bool | None,
+) -> str:
+    """
+    Fill in the attribution text with the parts prepared for the license.
+
+    :param statement: the statement of the license, from ``attribution_parts``
+    :param view_legal: the start of the sentence for viewing the legal text
+    :param default_url: the URL to the license deed
+    :param title: the name of the work, if known
+    :param creator: the name of the work's creator, if known
+    :param url: the URL to the license, to override the default, or ``False``
+        to remove the sentence for viewing the legal text
+    :return: the plain-text English language attribution
+    """
+
+    text = f'"{title}"' if title else "This work"
+    if creator:
+        text = f"{text} by {creator}"
+    text = f"{text} {statement}"
+    if url is not False:
+        text = f"{text} {view_legal}{url or default_url}."
+    return WHITESPACE.sub(" ", text).strip()
+
+
+def _register_all_licenses():
+    """Create every valid license once, along with its name and URL."""
+
+    for ver, jurs in all_licenses.items():
+        for jur, slugs in jurs.items():
+            for slug in slugs:
+                lic = License(slug, ver, jur)
+                lic.full_name, lic.url  # noqa: B018
+
+
+_register_all_licenses()
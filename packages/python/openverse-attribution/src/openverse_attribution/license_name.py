@@ -118,9 +118,24 @@ class LicenseName(StrEnum):
         :return: a list of allowed versions and jurisdictions
         """
 
-        return [
-            (ver, jur)
-            for ver in all_licenses.keys()
-            for jur in all_licenses[ver].keys()
-            if self.value in all_licenses[ver][jur]
-        ]
+        return list(_ALLOWED_VERSIONS_JURISDICTIONS.get(self.value, ()))
+
+
+def _index_versions_jurisdictions() -> dict[str, tuple[tuple[str, str], ...]]:
+    """
+    Index the versions and jurisdictions of ``all_licenses`` by slug.
+
+    The order of ``all_licenses`` is preserved, latest version first.
+
+    :return: a mapping of license slugs to their versions and jurisdictions
+    """
+
+    allowed: dict[str, list[tuple[str, str]]] = {}
+    for ver, jurs in all_licenses.items():
+        for jur, slugs in jurs.items():
+            for slug in slugs:
+                allowed.setdefault(slug, []).append((ver, jur))
+    return {slug: tuple(ver_jurs) for slug, ver_jurs in allowed.items()}
+
+
+_ALLOWED_VERSIONS_JURISDICTIONS = _index_versions_jurisdictions()
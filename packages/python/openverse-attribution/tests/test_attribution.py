@@ -1,5 +1,5 @@
 import pytest
-from openverse_attribution.license import License
+from openverse_attribution.license import License, get_attribution_texts
 
 
 BLANK = object()
@@ -86,3 +86,29 @@ def test_attribution_text_differentiates_license_and_other_tools(
     attribution: str,
 ):
     assert License(slug).get_attribution_text() == attribution
+
+
+def test_attribution_texts_match_attribution_text():
+    records = [
+        {"license": "by", "license_version": "4.0", "title": "A", "creator": "B"},
+        {"license": "by", "license_version": "2.0", "title": "", "creator": "C"},
+        {"license": "by", "license_url": "https://license/url", "creator": None},
+        {"license": "by-nc", "title": "D", "license_url": False},
+        {"license": "pdm", "title": "E", "creator": "F"},
+        {"license": "cc0"},
+    ]
+    expected = [
+        License(record["license"], record.get("license_version")).get_attribution_text(
+            record.get("title"), record.get("creator"), record.get("license_url")
+        )
+        for record in records
+    ]
+    assert get_attribution_texts(records) == expected
+
+
+def test_attribution_texts_skips_invalid_licenses():
+    records = [{"license": "by", "title": "A"}, {"license": "invalid", "title": "B"}]
+    assert get_attribution_texts(records) == [
+        License("by").get_attribution_text("A"),
+        None,
+    ]
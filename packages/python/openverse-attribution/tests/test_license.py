@@ -1,3 +1,5 @@
+from dataclasses import FrozenInstanceError
+
 import pytest
 import requests
 from openverse_attribution.license import License
@@ -91,6 +93,24 @@ def test_license_validation_fails_if_contradictory_info(
         License(slug, version, jurisdiction)
 
 
+def test_license_instances_are_shared():
+    assert License("by", "4.0") is License("by", "4.0")
+    assert License("by", "4.0") is License(slug="by", version="4.0")
+    assert License("by", "4.0") == License("by", "4.0", "")
+
+
+def test_license_instances_are_immutable():
+    lic = License("by", "4.0")
+    with pytest.raises(FrozenInstanceError):
+        lic.ver = "3.0"
+
+
+def test_license_validation_errors_are_raised_every_time():
+    for _ in range(2):
+        with pytest.raises(ValueError, match="Version `5.0` does not exist."):
+            License("by", "5.0")
+
+
 @pytest.mark.parametrize(
     "slug",
     [lic.value for lic in LicenseName],
@@ -4,9 +4,14 @@ Retrieves dead link tallies from Openverse API Redis.
 This script assumes that the API Redis instance you care about is present
 on localhost (usually via tunneling). It will run through the link validation
 entries in Redis.
+
+Link statuses cached in the hashed format are stored by digest of the URL, so
+they can only be tallied by status, not by hostname. Per-provider statistics are
+logged by the API as ``link_validation_provider_stats`` events instead.
 """
 
 import pprint
+import time
 from collections import defaultdict
 from urllib.parse import urlparse
 
@@ -38,6 +43,44 @@ def handle_matches(redis, matches, tallies, errors):
             errors[value] = e
 
 
+def _decode(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def handle_hashed_matches(redis, matches, tallies):
+    """
+    Tally the statuses in buckets that share a bucket number.
+
+    The bucket number is derived from the digest of the URL, so all entries of
+    a URL are in buckets with the same number, but possibly in those of both
+    the current and the previous generation, or of several expiries if its
+    status changed. Only the most recently cached unexpired entry of each URL
+    is tallied.
+    """
+
+    now = time.time()
+    pipe = redis.pipeline()
+    for match in matches:
+        pipe.hgetall(match)
+
+    latest = {}
+    for match, entries in zip(matches, pipe.execute()):
+        # Keys are ``valid_digest:<expiry>:<generation>:<bucket>``.
+        expiry = int(_decode(match).split(":")[1])
+        for digest, entry in entries.items():
+            status, expires_at = _decode(entry).split(":")
+            if int(expires_at) <= now:
+                continue
+
+            cached_at = int(expires_at) - expiry
+            if digest not in latest or latest[digest][0] < cached_at:
+                latest[digest] = (cached_at, status)
+
+    for _, status in latest.values():
+        status = "alive" if status.startswith("2") else "dead"
+        tallies[status] = tallies.get(status, 0) + 1
+
+
 @click.command()
 @click.option(
     "--host",
@@ -88,9 +131,24 @@ def main(host: str, port: int | None):
                 tqdm.write(
                     pprint.pformat(dict(cursor=cursor, **tallies), compact=True) + "\n"
                 )
+
+    # The fields of the hashed buckets are binary digests, which cannot be
+    # decoded, so they are read with a connection that does not decode them.
+    binary_redis = Redis(**{**redis_params, "decode_responses": False})
+    buckets = defaultdict(list)
+    for key in binary_redis.scan_iter(match="valid_digest:*", count=250):
+        buckets[_decode(key).rsplit(":", 1)[1]].append(key)
+
+    hashed_tallies = dict()
+    for matches in tqdm(buckets.values()):
+        handle_hashed_matches(binary_redis, matches, hashed_tallies)
+
     print("\n\n\n\n============= FINAL RESULTS ============= \n\n")
     pprint.pprint(tallies)
 
+    print("\n\n\n============= HASHED CACHE RESULTS ========\n\n")
+    pprint.pprint(hashed_tallies)
+
     print("\n\n\n==================== ERRORS ===============\n\n")
     pprint.pprint(errors)
 